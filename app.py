@@ -1,196 +1,424 @@
+import time
+start_time = time.monotonic()
+
+import sys
 import gi
-import psutil
 import os
+import signal
 import subprocess
-import distro
-from gi.repository import Gtk, Gdk, GdkPixbuf, Gio, GLib
+import threading
 
 gi.require_version('Gtk', '4.0')
 
+from gi.repository import Gtk, Gdk, GLib, Pango
+from profiler import StallProfiler
+
+# Must wrap GLib and GObject before any handler is connected
+profiler = StallProfiler()
+if os.environ.get("SYS_MAIN_PROFILE") == "1":
+    profiler.install()
+
+import assets
+import backlight
+import controls
+import dialogs
+import maintenance
+import pacmandb
+import pkgcache
+import power
+import swap
+import sysinfo
+import updates
+from audio import AudioBackend
+from capabilities import get_capabilities
+from jobs import JobCancelled, JobRunner
+from privhelper import HelperClient, HelperError
+from scheduler import Scheduler, CHECK_INTERVAL
+from sensors import format_temp, format_fan
+from startup_trace import StartupTrace
+from telemetry import Sampler
+from history import HistoryStore
+from sparkline import WINDOW as HISTORY_WINDOW, Sparkline
+from diskusage import DiskUsageIndex
+from processes import ProcessTable, renice_processes, signal_processes
+from tmpclean import TempCleaner
+
+trace = StartupTrace(start_time)
+trace.enabled = "--trace-startup" in sys.argv[1:]
+trace.add("imports", time.monotonic() - start_time)
+
+
+sampler = Sampler()
+history = HistoryStore()
+sampler.subscribe(history.record)
+
+def update_battery_status(percentage_label, health_label, state):
+    if state is None:
+        percentage_label.set_text("No battery")
+        health_label.set_text("")
+        return
+    charging_icon = "⚡" if state.plugged else ""
+    percentage_label.set_text(f"{state.percent}% {charging_icon}")
+    health_label.set_text(f"Health: {power.health_label(state)}")
+
+def mark_active_profile(profile, buttons):
+    # Sampling pauses while the power-saver profile is active
+    sampler.set_battery_saver(profile == "power-saver")
+    for button in buttons:
+        if button.get_label().startswith(profile.capitalize()):
+            button.set_label(f"{profile.capitalize()} ✅")
+        else:
+            button.set_label(button.get_label().replace(" ✅", ""))
 
-def prepare():
-    if not isZenityInstalled():
-        messageZen("Warning", "Zenity is not installed and could not be installed.")
-        return False
-
-    try:
-        result = subprocess.run(["pgrep", "-x", "zenity"], capture_output=True, text=True)
-        if result.returncode == 0:
-            messageZen("Warning", "Zenity is already running.")
-            return False
-    except subprocess.CalledProcessError as e:
-        messageZen("Error", f"Failed to check if Zenity is running: {e}")
-        return False
-
-    return True
-
-def messageZen(title, message):
-    if prepare():
-        try:
-            subprocess.run(["zenity", "--info", "--title", title, "--text", message], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to show message: {e}")
+control_client = controls.get_client()
 
-def errorZen(title, message):
-    if prepare():
-        try:
-            subprocess.run(["zenity", "--error", "--title", title, "--text", message], check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to show error: {e}")
+def report_control_error(action):
+    def report(value, error):
+        if error:
+            print(f"Failed to {action}: {error}")
+    return report
 
-def update_battery_status(percentage_label, health_label):
-    battery = psutil.sensors_battery()
-    battery_percentage = int(battery.percent) if battery else None
-    battery_health = "Good"
-    is_charging = battery.power_plugged if battery else False
+def change_power_profile(profile, buttons):
+    # The buttons follow the daemon's PropertiesChanged signal, see create_main_page
+    control_client.set(controls.POWER_PROFILE, profile, report_control_error("change power profile"))
 
-    charging_icon = "⚡" if is_charging else ""
-    percentage_label.set_text(f"{battery_percentage}% {charging_icon}")
-    health_label.set_text(f"Health: {battery_health}")
+helper = None
+helper_lock = threading.Lock()
 
-    return True  # Continue calling this function
+def get_helper():
+    # Authenticates once per session; later jobs reuse the running helper
+    global helper
+    with helper_lock:
+        if helper is not None and helper.connected:
+            return helper
 
-def change_power_profile(profile, buttons):
-    try:
-        subprocess.run(["powerprofilesctl", "set", profile], check=True)
-        print(f"Power profile changed to: {profile}")
-        for button in buttons:
-            if button.get_label().startswith(profile.capitalize()):
-                button.set_label(f"{profile.capitalize()} ✅")
+        client = HelperClient()
+        try:
+            if get_capabilities().has("pkexec"):
+                client.start()
             else:
-                button.set_label(button.get_label().replace(" ✅", ""))
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to change power profile: {e}")
+                password = dialogs.ask_password_blocking("Authentication Required", "Enter your password to run system maintenance tasks.")
+                if password is None:
+                    return None
+                client.start(password=password)
+        except HelperError as e:
+            dialogs.error("Error", f"Failed to get administrator privileges: {e}")
+            return None
 
-def get_active_power_profile():
-    try:
-        result = subprocess.run(["powerprofilesctl", "get"], capture_output=True, text=True, check=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to get active power profile: {e}")
-        return None
+        helper = client
+        return helper
 
-def isZenityInstalled():
-    try:
-        subprocess.run(["zenity", "--version"], check=True, capture_output=True, text=True)
-        return True
-    except subprocess.CalledProcessError:
-        subprocess.run(["sudo", "apt", "install", "-y", "zenity"], check=True)
+def run_privileged(job, ops):
+    client = get_helper()
+    if client is None:
+        job.log("No administrator privileges granted")
         return False
 
-def sudoPasswordPrompt():
-    if isZenityInstalled():
-        try:
-            result = subprocess.run("zenity --password | sudo -S echo 'Sudo password accepted.'", shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                print("Failed to get sudo password")
-                return None
-        except subprocess.CalledProcessError as e:
-            print(f"Failed to get sudo password: {e}")
-            return None
-    else:
-        print("Zenity is not installed")
-        return None
+    job.on_cancel(client.cancel)
+    client.batch(ops, on_line=job.log)
+    job.done_steps += len(ops)
+    job.progress(min(job.done_steps / job.steps, 1.0))
+    return True
 
-def killAllProcess(_):
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        print("No sudo password provided")
-        return
+def run_on_main(func, *args):
+    def callback():
+        func(*args)
+        return False
+    GLib.idle_add(callback)
 
-    try:
-        subprocess.run(["sudo", "pkill", "-9", "-u", os.getlogin()], input=sudo_password + "\n", text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to kill all process: {e}")
+def run_in_background(func, callback, on_error=None):
+    # Loads page data off the main loop, then hands the result (or the
+    # exception, to on_error) back to it
+    def worker():
+        try:
+            result = func()
+        except Exception as e:
+            print(f"Failed to load data: {e}")
+            if on_error is not None:
+                run_on_main(on_error, e)
+            return
+        run_on_main(callback, result)
+    threading.Thread(target=worker, daemon=True).start()
+
+def subscribe_while_visible(stack, page_name, callback):
+    # Widgets on a hidden page stop receiving telemetry snapshots
+    subscribed = False
+
+    def update(*_):
+        nonlocal subscribed
+        visible = stack.get_visible_child_name() == page_name
+        if visible and not subscribed:
+            sampler.subscribe(callback)
+            subscribed = True
+        elif not visible and subscribed:
+            sampler.unsubscribe(callback)
+            subscribed = False
+
+    stack.connect("notify::visible-child-name", update)
+    update()
+
+def add_lazy_page(stack, name, title, builder):
+    # The page is built the first time the stack switches to it
+    holder = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+    holder.set_vexpand(True)
+    spinner = Gtk.Spinner()
+    spinner.set_vexpand(True)
+    spinner.start()
+    holder.append(spinner)
+    stack.add_titled(holder, name, title)
+
+    def on_visible_child(stack, _):
+        if stack.get_visible_child_name() != name:
+            return
+        stack.disconnect(handler_id)
+        page = builder(stack)
+        page.set_vexpand(True)
+        holder.remove(spinner)
+        holder.append(page)
+
+    handler_id = stack.connect("notify::visible-child-name", on_visible_child)
+    return holder
+
+job_runner = JobRunner(dispatch=run_on_main)
+# Idle-time maintenance; privileged tasks wait until the user has
+# authenticated the helper for a job of their own
+scheduler = Scheduler(helper=lambda: helper if helper is not None and helper.connected else None,
+                      busy=lambda: bool(job_runner.active_jobs())).load()
+
+def run_steps_job(job, steps):
+    job.steps = max(sum(len(payload) if kind == "privileged" else 1 for kind, payload in steps), 1)
+    job.done_steps = 0
+    for kind, payload in steps:
+        if kind == "privileged":
+            if not run_privileged(job, payload):
+                return False
+        elif kind == "call":
+            payload[1](job.log, lambda: job.cancelled)
+            if job.cancelled:
+                raise JobCancelled(job.name)
+            job.done_steps += 1
+            job.progress(min(job.done_steps / job.steps, 1.0))
+        else:
+            job.run(payload)
+    return True
 
 def clearSessionManagement(_):
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        print("No sudo password provided")
+    job_runner.submit("Clear Session Management", clear_temp_files_job)
+
+def clear_temp_files_job(job):
+    cleaner = TempCleaner()
+    report = cleaner.scan(on_progress=lambda report: job.progress(0.0, f"found {report.files} old files"))
+    if not report.files and not report.directories:
+        dialogs.info("Temporary Files", "No old temporary files to remove.")
         return
 
-    try:
-        subprocess.run(["sudo", "rm", "-rf", "/tmp/*"], input=sudo_password + "\n", text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to clear session management: {e}")
+    message = (f"{report.files} files older than the tmpfiles limits can be removed, freeing {updates.format_size(report.bytes)}. "
+               f"{report.open} files held open by running programs are kept.")
+    if not dialogs.confirm_blocking("Clear Temporary Files", message, accept_label="Remove"):
+        job.log("Temporary file cleanup cancelled")
+        return
+    run_steps_job(job, maintenance.clean_tmp_steps(cleaner))
 
 def clearSwapFile(_):
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        print("No sudo password provided")
+    job_runner.submit("Clear Swap file", clear_swap_job)
+
+def clear_swap_job(job):
+    plan = swap.plan_reclaim()
+    warnings = "\n".join(plan.warnings)
+    if not plan.devices:
+        if not plan.skipped:
+            dialogs.info("Swap", "No swap is in use.")
+            return
+        # Reclaiming would not fit in RAM; dropping clean caches is the safe alternative
+        message = "Swap cannot be moved back into memory safely. Drop clean file caches instead?"
+        if dialogs.confirm_blocking("Clear Swap", message, accept_label="Drop Caches", details=warnings):
+            run_steps_job(job, maintenance.drop_caches_steps())
         return
 
-    try:
-        subprocess.run(["sudo", "swapoff", "-a"], input=sudo_password + "\n", text=True, check=True)
-        subprocess.run(["sudo", "swapon", "-a"], input=sudo_password + "\n", text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to clear swap file: {e}")
+    used = sum(device.used for device in plan.devices) * 1024
+    message = f"Move {updates.format_size(used)} from {len(plan.devices)} swap devices back into memory? This can take a few minutes."
+    details = "\n".join([f"{device.path} (priority {device.priority}): {updates.format_size(device.used * 1024)}" for device in plan.devices] + plan.warnings)
+    if not dialogs.confirm_blocking("Clear Swap", message, accept_label="Reclaim", details=details):
+        job.log("Swap reclaim cancelled")
+        return
+
+    client = get_helper()
+    if client is None:
+        job.log("No administrator privileges granted")
+        return
+    job.on_cancel(client.cancel)
+    swap.reclaim(client, plan, job.log, job.progress)
+    dialogs.info("Swap", f"Moved {updates.format_size(used)} back into memory.")
 
 def clearCache(_):
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        print("No sudo password provided")
+    job_runner.submit("Clear Pacman Cache", clear_cache_job)
+
+def clear_cache_job(job):
+    job.log("Scanning package caches...")
+    plan = pkgcache.analyse(on_progress=lambda count, fraction: job.progress(fraction, f"scanned {count} packages"))
+    if not plan.remove:
+        dialogs.info("Package Cache", f"Nothing to remove; {len(plan.keep)} cached packages are kept.")
         return
 
-    try:
-        subprocess.run(["sudo", "-S", "rm", "-rf", "/var/cache/pacman/pkg/"], input=sudo_password + "\n", text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to clear cache: {e}")
+    message = (f"{len(plan.remove)} old packages can be removed, freeing {updates.format_size(plan.reclaimable)}. "
+               f"The {pkgcache.KEEP_VERSIONS} newest versions and installed versions of every package are kept.")
+    details = "\n".join(sorted(f"{entry.name} {entry.version}" for entry in plan.remove))
+    if not dialogs.confirm_blocking("Clear Package Cache", message, accept_label="Remove", details=details):
+        job.log("Cache cleanup cancelled")
+        return
+    if run_steps_job(job, maintenance.clean_cache_steps(plan)):
+        dialogs.info("Package Cache", f"Freed {updates.format_size(plan.reclaimable)}.")
 
 def clearOrphanFile(_):
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        print("No sudo password provided")
+    job_runner.submit("Clear Orphan file", clear_orphan_file_job)
+
+def clear_orphan_file_job(job):
+    if maintenance.distro_family() != "arch":
+        dialogs.error("Error", "Orphan removal needs pacman; this is not an Arch-based system.")
+        return
+    graph = pacmandb.load_graph()
+    orphans = maintenance.list_orphans(graph)
+    if not orphans:
+        job.log("No orphan packages found")
         return
 
-    try:
-        subprocess.run(["sudo", "pacman", "-Rns", "$(pacman -Qdtq)"], input=sudo_password + "\n", text=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to clear orphan file: {e}")
+    message = f"{len(orphans)} packages are no longer needed; removing them frees {updates.format_size(graph.removal_size(orphans))}."
+    details = "\n".join(f"{name} {graph.packages[name].version}" for name in orphans)
+    if not dialogs.confirm_blocking("Remove Orphan Packages", message, accept_label="Remove", details=details):
+        job.log("Orphan removal cancelled")
+        return
+    run_steps_job(job, maintenance.clean_orphans_steps(orphans))
 
 def check_distro_and_update(_):
-    distro_name = distro.id().lower()  # Get the lowercase distribution ID
-    sudo_password = sudoPasswordPrompt()
-    if not sudo_password:
-        messageZen("Error", "No sudo password provided")
+    job_runner.submit("System Update", system_update_job)
+
+def system_update_job(job):
+    family = maintenance.distro_family()
+    if family is None:
+        dialogs.error("Error", "Unsupported distribution")
         return
 
     try:
-        if 'arch' in distro_name or 'manjaro' in distro_name:
-            subprocess.run(["sudo", "pacman", "-Syu", "--noconfirm"], input=sudo_password + "\n", text=True, check=True)
-            subprocess.run(["yay", "-Syu", "--noconfirm"], check=True)
-            subprocess.run(["paru", "-Syu", "--noconfirm"], check=True)
-        elif 'ubuntu' in distro_name or 'debian' in distro_name:
-            subprocess.run(["sudo", "apt", "update"], input=sudo_password + "\n", text=True, check=True)
-            subprocess.run(["sudo", "apt", "upgrade", "-y"], input=sudo_password + "\n", text=True, check=True)
-        elif 'fedora' in distro_name:
-            subprocess.run(["sudo", "dnf", "update", "-y"], input=sudo_password + "\n", text=True, check=True)
-        else:
-            messageZen("Error", f"Unsupported distribution: {distro_name}")
+        if not run_steps_job(job, updates.refresh_steps(family)):
+            return
+        job.log("Checking for updates...")
+        plan = updates.plan_updates(family, get_capabilities())
+        if not updates.has_updates(plan):
+            dialogs.info("System Update", "The system is up to date.")
             return
-        messageZen("Success", "System update completed successfully.")
-    except subprocess.CalledProcessError as e:
-        messageZen("Error", f"Failed to update system: {e}")
 
-def create_main_page():
-    battery = psutil.sensors_battery()
-    battery_percentage = int(battery.percent) if battery else None
-    battery_health = "Good"
-    is_charging = battery.power_plugged if battery else False
+        lines = updates.format_plan(plan)
+        if not dialogs.confirm_blocking("System Update", lines[-1], accept_label="Update", details="\n".join(lines[:-1])):
+            job.log("Update cancelled")
+            return
+        if run_steps_job(job, updates.plan_steps(plan)):
+            dialogs.info("Success", "System update completed successfully.")
+    except (subprocess.CalledProcessError, HelperError, OSError) as e:
+        dialogs.error("Error", f"Failed to update system: {e}")
+
+def create_job_panel():
+    panel = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+    panel.set_margin_start(20)
+    panel.set_margin_end(20)
+
+    status_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+    status_label = Gtk.Label(label="No maintenance job running")
+    status_label.set_halign(Gtk.Align.START)
+    status_label.set_hexpand(True)
+    cancel_button = Gtk.Button(label="Cancel")
+    cancel_button.set_sensitive(False)
+    cancel_button.connect("clicked", lambda _: job_runner.cancel_all())
+    status_row.append(status_label)
+    status_row.append(cancel_button)
+    panel.append(status_row)
+
+    schedule_label = Gtk.Label()
+    schedule_label.set_halign(Gtk.Align.START)
+    schedule_label.add_css_class("dim-label")
+    panel.append(schedule_label)
+
+    progress_bar = Gtk.ProgressBar()
+    panel.append(progress_bar)
+
+    log_buffer = Gtk.TextBuffer()
+    log_view = Gtk.TextView(buffer=log_buffer)
+    log_view.set_editable(False)
+    log_view.set_cursor_visible(False)
+    log_view.set_monospace(True)
+
+    log_window = Gtk.ScrolledWindow()
+    log_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+    log_window.set_min_content_height(120)
+    log_window.set_child(log_view)
+    panel.append(log_window)
+
+    max_log_lines = 2000
+    pulse_source = None
+
+    def pulse():
+        progress_bar.pulse()
+        return True
 
+    def on_start(job):
+        nonlocal pulse_source
+        # Jobs the user started win over background maintenance
+        scheduler.interrupt()
+        status_label.set_text(f"Running: {job.name}")
+        cancel_button.set_sensitive(True)
+        progress_bar.set_fraction(0)
+        if pulse_source is None:
+            pulse_source = GLib.timeout_add(100, pulse)
+
+    def on_line(job, line):
+        log_buffer.insert(log_buffer.get_end_iter(), line + "\n")
+        # Keep the log bounded however chatty the job is
+        extra = log_buffer.get_line_count() - max_log_lines
+        if extra > 0:
+            log_buffer.delete(log_buffer.get_start_iter(), log_buffer.get_iter_at_line(extra)[1])
+        log_view.scroll_to_mark(log_buffer.get_insert(), 0, False, 0, 0)
+
+    def on_progress(job, fraction, text):
+        nonlocal pulse_source
+        # Jobs pulse until they report their first real step
+        if pulse_source is not None:
+            GLib.source_remove(pulse_source)
+            pulse_source = None
+        progress_bar.set_fraction(fraction)
+        if text:
+            status_label.set_text(f"{job.name}: {text}")
+
+    def on_finish(job):
+        nonlocal pulse_source
+        on_line(job, f"[{job.name}: {job.status}]")
+        if job_runner.active_jobs():
+            return
+        if pulse_source is not None:
+            GLib.source_remove(pulse_source)
+            pulse_source = None
+        progress_bar.set_fraction(1 if job.status == "done" else 0)
+        status_label.set_text(f"{job.name}: {job.status}")
+        cancel_button.set_sensitive(False)
+
+    job_runner.on_start = on_start
+    job_runner.on_line = on_line
+    job_runner.on_progress = on_progress
+    job_runner.on_finish = on_finish
+    scheduler.on_change = lambda: run_on_main(lambda: schedule_label.set_text(scheduler.status_text()))
+    schedule_label.set_text(scheduler.status_text())
+
+    return panel
+
+def create_main_page():
     column_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
     row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=30)
     row_box.set_halign(Gtk.Align.CENTER)
 
-    battery_icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "battery_icon.png")
-    battery_icon = Gtk.Image.new_from_file(battery_icon_path)
+    battery_icon = assets.new_image("battery_icon.png", 120)
     battery_icon.set_size_request(120, 120)
 
-    charging_icon = "⚡" if is_charging else ""
-    percentage_label = Gtk.Label(label=f"{battery_percentage}% {charging_icon}")
-    health_label = Gtk.Label(label=f"Health: {battery_health}")
+    # Filled in by the power monitor once the window is up
+    percentage_label = Gtk.Label()
+    health_label = Gtk.Label()
 
     vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
     vbox.set_halign(Gtk.Align.START)
@@ -225,13 +453,17 @@ def create_main_page():
     power_profile_buttons.set_halign(Gtk.Align.CENTER)
     
     buttons = []
-    active_profile = get_active_power_profile()
     for profile in power_profiles:
-        label = f"{profile.capitalize()} ✅" if profile == active_profile else profile.capitalize()
-        button = Gtk.Button(label=label)
+        button = Gtk.Button(label=profile.capitalize())
         button.connect("clicked", lambda btn, p=profile: change_power_profile(p, buttons))
         buttons.append(button)
         power_profile_buttons.append(button)
+
+    # Also follows profile changes made outside the app
+    try:
+        control_client.watch(controls.POWER_PROFILE, lambda active: mark_active_profile(active, buttons))
+    except controls.ControlError as e:
+        print(f"Failed to watch power profile: {e}")
     
     column_box.append(power_profile_buttons)
 
@@ -262,7 +494,7 @@ def create_main_page():
     grid.set_margin_bottom(10)
     grid.set_halign(Gtk.Align.CENTER)
 
-    button_texts = ["Clear Pacman Cache", "Clear Orphan file ⚠️", "Clear Swap file", "Kill All Process", "Clear Session Management", "System Update"]
+    button_texts = ["Clear Pacman Cache", "Clear Orphan file ⚠️", "Clear Swap file", "Manage Processes", "Clear Session Management", "System Update"]
     for i, text in enumerate(button_texts):
         button = Gtk.Button(label=text)
         if text == "System Update":
@@ -273,14 +505,15 @@ def create_main_page():
             button.connect("clicked", clearSwapFile)
         elif text == "Clear Pacman Cache":
             button.connect("clicked", clearCache)
-        elif text == "Kill All Process":
-            button.connect("clicked", killAllProcess)
+        elif text == "Manage Processes":
+            button.connect("clicked", lambda button: button.get_ancestor(Gtk.Stack).set_visible_child_name("Processes"))
         elif text == "Clear Session Management":
             button.connect("clicked", clearSessionManagement)
 
         grid.attach(button, i % 2, i // 2, 1, 1)
 
     column_box.append(grid)
+    column_box.append(create_job_panel())
 
     # Add footer
     footer_label = Gtk.Label(label="Alpha build for Arch or Arch based Systems")
@@ -291,116 +524,71 @@ def create_main_page():
     return column_box, percentage_label, health_label
 
 
-def on_brightness_changed(slider):
-    value = int(slider.get_value())
-    try:
-        with open('/sys/class/backlight/intel_backlight/brightness', 'w') as f:
-            f.write(str(value))
-        print(f"Brightness changed to: {value}%")
-    except Exception as e:
-        print(f"Failed to change brightness: {e}")
+audio_backend = AudioBackend()
 
 def on_volume_changed(slider):
-    value = int(slider.get_value())
-    try:
-        # Check if PipeWire is running
-        result = subprocess.run(["pactl", "info"], capture_output=True, text=True, check=True)
-        if "PipeWire" in result.stdout:
-            subprocess.run(["pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{value}%"], check=True)
-        else:
-            subprocess.run(["amixer", "set", "Master", f"{value}%", "unmute"], check=True)
-        print(f"Volume changed to: {value}%")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to change volume: {e}")
-
-def get_current_volume():
-    try:
-        # Check if PipeWire is running
-        result = subprocess.run(["pactl", "info"], capture_output=True, text=True, check=True)
-        if "PipeWire" in result.stdout:
-            result = subprocess.run(["pactl", "get-sink-volume", "@DEFAULT_SINK@"], capture_output=True, text=True, check=True)
-            volume = int(result.stdout.split('/')[1].strip().replace('%', ''))
-        else:
-            result = subprocess.run(["amixer", "get", "Master"], capture_output=True, text=True, check=True)
-            volume = int(result.stdout.split('[')[1].split('%')[0])
-        return volume
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to get current volume: {e}")
-        return 50  # Default to 50% if there's an error
-
-def on_keyboard_brightness_changed(slider):
-    value = int(slider.get_value())
-    try:
-        with open('/sys/class/leds/asus::kbd_backlight/brightness', 'w') as f:
-            f.write(str(value))
-        print(f"Keyboard brightness changed to: {value}%")
-    except Exception as e:
-        print(f"Failed to change keyboard brightness: {e}")
+    # Coalesced: only the latest value of a drag reaches the audio server
+    audio_backend.set_volume(int(slider.get_value()))
 
 def on_microphone_changed(slider):
-    value = int(slider.get_value())
-    try:
-        # Check if PipeWire is running
-        result = subprocess.run(["pactl", "info"], capture_output=True, text=True, check=True)
-        if "PipeWire" in result.stdout:
-            subprocess.run(["pactl", "set-source-volume", "@DEFAULT_SOURCE@", f"{value}%"], check=True)
-        else:
-            subprocess.run(["amixer", "set", "Capture", f"{value}%", "unmute"], check=True)
-        print(f"Microphone volume changed to: {value}%")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to change microphone volume: {e}")
+    audio_backend.set_microphone_volume(int(slider.get_value()))
+
+# Last state reported over D-Bus; the toggles flip these, never the button text
+radio_states = {}
+
+def show_toggle_state(button, enabled):
+    if enabled:
+        button.add_css_class("suggested-action")
+    else:
+        button.remove_css_class("suggested-action")
+
+def watch_radios(wifi_button, bluetooth_button, airplane_button):
+    def update(name, enabled):
+        radio_states[name] = bool(enabled)
+        if name in ("wifi", "wwan") and "wifi" in radio_states and "wwan" in radio_states:
+            radio_states["airplane"] = not (radio_states["wifi"] or radio_states["wwan"])
+            show_toggle_state(airplane_button, radio_states["airplane"])
+        show_toggle_state(wifi_button, radio_states.get("wifi"))
+        show_toggle_state(bluetooth_button, radio_states.get("bluetooth"))
 
-def get_current_microphone_volume():
     try:
-        # Check if PipeWire is running
-        result = subprocess.run(["pactl", "info"], capture_output=True, text=True, check=True)
-        if "PipeWire" in result.stdout:
-            result = subprocess.run(["pactl", "get-source-volume", "@DEFAULT_SOURCE@"], capture_output=True, text=True, check=True)
-            volume = int(result.stdout.split('/')[1].strip().replace('%', ''))
-        else:
-            result = subprocess.run(["amixer", "get", "Capture"], capture_output=True, text=True, check=True)
-            volume = int(result.stdout.split('[')[1].split('%')[0])
-        return volume
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to get current microphone volume: {e}")
-        return 50  # Default to 50% if there's an error
+        control_client.watch(controls.WIFI, lambda enabled: update("wifi", enabled))
+        control_client.watch(controls.WWAN, lambda enabled: update("wwan", enabled))
+    except controls.ControlError as e:
+        print(f"Failed to watch radios: {e}")
+        return
+    def on_bluetooth_adapter(adapter, error):
+        if adapter:
+            control_client.watch(adapter, lambda powered: update("bluetooth", powered))
+
+    control_client.bluetooth(on_bluetooth_adapter)
 
 def wifi_toggle(button):
-    try:
-        subprocess.run(["nmcli", "radio", "wifi", "on" if button.get_label() == "Wifi Off" else "off"], check=True)
-        button.set_label("Wifi Off" if button.get_label() == "Wifi On" else "Wifi On")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to toggle wifi: {e}")
+    control_client.set(controls.WIFI, not radio_states.get("wifi", False), report_control_error("toggle wifi"))
 
 def bluetooth_toggle(button):
-    try:
-        subprocess.run(["bluetoothctl", "power", "on" if button.get_label() == "Bluetooth Off" else "off"], check=True)
-        button.set_label("Bluetooth Off" if button.get_label() == "Bluetooth On" else "Bluetooth On")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to toggle bluetooth: {e}")
+    def toggle(adapter, error):
+        if adapter is None:
+            print(f"Failed to toggle bluetooth: {error or 'no adapter'}")
+            return
+        control_client.set(adapter, not radio_states.get("bluetooth", False), report_control_error("toggle bluetooth"))
+    control_client.bluetooth(toggle)
 
 def airplane_toggle(button):
-    try:
-        subprocess.run(["nmcli", "radio", "all", "on" if button.get_label() == "Airplane Off" else "off"], check=True)
-        button.set_label("Airplane Off" if button.get_label() == "Airplane On" else "Airplane On")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to toggle airplane mode: {e}")
+    # Same radios as `nmcli radio all`
+    enable = radio_states.get("airplane", False)
+    for radio in controls.AIRPLANE_RADIOS:
+        control_client.set(radio, enable, report_control_error("toggle airplane mode"))
 
 def mic_toggle(button):
-    try:
-        # Check if PipeWire is running
-        result = subprocess.run(["pactl", "info"], capture_output=True, text=True, check=True)
-        if "PipeWire" in result.stdout:
-            subprocess.run(["pactl", "set-source-mute", "@DEFAULT_SOURCE@", "toggle"], check=True)
-        else:
-            subprocess.run(["amixer", "set", "Capture", "toggle"], check=True)
-        button.set_label("Mic Off" if button.get_label() == "Mic On" else "Mic On")
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to toggle microphone: {e}")
+    # Applied on the writer thread, since the pactl/amixer fallback forks
+    muted = button.get_label() == "Mic On"
+    audio_backend.set_microphone_mute(muted)
+    button.set_label("Mic Off" if muted else "Mic On")
 
 
 
-def create_second_page():
+def create_second_page(stack):
     scrolled_window = Gtk.ScrolledWindow()
     scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
     scrolled_window.set_min_content_height(400)
@@ -412,10 +600,9 @@ def create_second_page():
     asusctl_status_label.set_halign(Gtk.Align.START)
     asusctl_status_label.set_margin_start(20)
     asusctl_status_label.set_margin_top(6)
-    try:
-        subprocess.run(["asusctl", "--version"], check=True, capture_output=True, text=True)
+    if get_capabilities().has("asusctl"):
         asusctl_status_label.set_text("✅ asusctl is installed")
-    except subprocess.CalledProcessError:
+    else:
         asusctl_status_label.set_text("❌ asusctl is not installed")
     box.append(asusctl_status_label)
 
@@ -425,13 +612,10 @@ def create_second_page():
 
     box.append(label)
 
-    disk_usage = psutil.disk_usage('/')
-    memory_usage = psutil.virtual_memory()
-
-    disk_usage_label = Gtk.Label(label=f"Disk Usage: {disk_usage.percent}%")
-    memory_usage_label = Gtk.Label(label=f"Memory Usage: {memory_usage.percent}%")
-    free_space_label = Gtk.Label(label=f"Free Space: {disk_usage.free // (1024 ** 3)} GB")
-    free_memory_label = Gtk.Label(label=f"Free Memory: {memory_usage.available // (1024 ** 2)} MB")
+    disk_usage_label = Gtk.Label(label="Disk Usage: …")
+    memory_usage_label = Gtk.Label(label="Memory Usage: …")
+    free_space_label = Gtk.Label(label="Free Space: …")
+    free_memory_label = Gtk.Label(label="Free Memory: …")
 
     disk_usage_label.set_halign(Gtk.Align.START)
     memory_usage_label.set_halign(Gtk.Align.START)
@@ -463,7 +647,7 @@ def create_second_page():
     box.append(grid)
 
     # Brightness Slider
-    brightness_label = Gtk.Label(label="Brightness (In progress)")
+    brightness_label = Gtk.Label(label="Brightness")
     brightness_label.set_halign(Gtk.Align.START)
     grid.attach(brightness_label, 0, 3, 1, 1)
 
@@ -472,11 +656,11 @@ def create_second_page():
     brightness_slider.set_digits(0)
     brightness_slider.set_hexpand(True)
     brightness_slider.set_valign(Gtk.Align.CENTER)
-    brightness_slider.connect("value-changed", on_brightness_changed)
+    brightness_slider.set_sensitive(False)
     grid.attach(brightness_slider, 1, 3, 1, 1)
 
     # Keyboard Brightness Slider
-    keyboard_brightness_label = Gtk.Label(label="Keyboard Brightness(In progress)")
+    keyboard_brightness_label = Gtk.Label(label="Keyboard Brightness")
     keyboard_brightness_label.set_halign(Gtk.Align.START)
     grid.attach(keyboard_brightness_label, 0, 4, 1, 1)
     
@@ -485,7 +669,7 @@ def create_second_page():
     keyboard_brightness_slider.set_digits(0)
     keyboard_brightness_slider.set_hexpand(True)
     keyboard_brightness_slider.set_valign(Gtk.Align.CENTER)
-    keyboard_brightness_slider.connect("value-changed", on_keyboard_brightness_changed)
+    keyboard_brightness_slider.set_sensitive(False)
     grid.attach(keyboard_brightness_slider, 1, 4, 1, 1)
 
     # Volume Slider
@@ -493,13 +677,12 @@ def create_second_page():
     volume_label.set_halign(Gtk.Align.START)
     grid.attach(volume_label, 0, 5, 1, 1)
     
-    current_volume = get_current_volume()
-    volume_adjustment = Gtk.Adjustment(value=current_volume, lower=0, upper=100, step_increment=1, page_increment=10, page_size=0)
+    volume_adjustment = Gtk.Adjustment(value=50, lower=0, upper=100, step_increment=1, page_increment=10, page_size=0)
     volume_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=volume_adjustment)
     volume_slider.set_digits(0)
     volume_slider.set_hexpand(True)
     volume_slider.set_valign(Gtk.Align.CENTER)
-    volume_slider.connect("value-changed", on_volume_changed)
+    volume_slider.set_sensitive(False)
     grid.attach(volume_slider, 1, 5, 1, 1)
 
     # Microphone Slider
@@ -507,16 +690,43 @@ def create_second_page():
     microphone_label.set_halign(Gtk.Align.START)
     grid.attach(microphone_label, 0, 6, 1, 1)
 
-    current_microphone_volume = get_current_microphone_volume()
-    microphone_adjustment = Gtk.Adjustment(value=current_microphone_volume, lower=0, upper=100, step_increment=1, page_increment=10, page_size=0)
+    microphone_adjustment = Gtk.Adjustment(value=50, lower=0, upper=100, step_increment=1, page_increment=10, page_size=0)
     microphone_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=microphone_adjustment)
     microphone_slider.set_digits(0)
     microphone_slider.set_hexpand(True)
     microphone_slider.set_valign(Gtk.Align.CENTER)
-    microphone_slider.connect("value-changed", on_microphone_changed)
+    microphone_slider.set_sensitive(False)
     grid.attach(microphone_slider, 1, 6, 1, 1)
 
-    box.append(grid)
+    def load_page_data():
+        devices = backlight.discover()
+        screen = backlight.screen_backlight(devices)
+        keyboard = backlight.keyboard_backlight(devices)
+        return {
+            "volume": audio_backend.get_volume(),
+            "microphone": audio_backend.get_microphone_volume(),
+            "brightness": (screen, screen.get_percent()) if screen else None,
+            "keyboard_brightness": (keyboard, keyboard.get_percent()) if keyboard else None,
+        }
+
+    def apply_page_data(data):
+        # Set the real levels before connecting so they are not written back
+        volume_slider.set_value(data["volume"])
+        volume_slider.connect("value-changed", on_volume_changed)
+        volume_slider.set_sensitive(True)
+        microphone_slider.set_value(data["microphone"])
+        microphone_slider.connect("value-changed", on_microphone_changed)
+        microphone_slider.set_sensitive(True)
+        for slider, key in ((brightness_slider, "brightness"), (keyboard_brightness_slider, "keyboard_brightness")):
+            if data[key] is None:
+                slider.set_tooltip_text("No device found")
+                continue
+            device, level = data[key]
+            slider.set_value(level)
+            slider.connect("value-changed", lambda slider, device=device: device.set_percent(slider.get_value()))
+            slider.set_sensitive(True)
+
+    run_in_background(load_page_data, apply_page_data)
 
     # Add horizontal separator
     separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
@@ -544,13 +754,14 @@ def create_second_page():
     button_functions = [wifi_toggle, bluetooth_toggle, airplane_toggle, mic_toggle, about_dialog]
     button_labels = ["Wifi", "Bluetooth", "Airplane", "Mic", "About"]
 
+    toggle_buttons = {}
     for icon_name, func, label in zip(svg_icons, button_functions, button_labels):
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
         button = Gtk.Button()
+        toggle_buttons[label] = button
         button.set_size_request(50, 50)  # Set the size to make them square
 
-        icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), icon_name)
-        icon = Gtk.Image.new_from_file(icon_path)
+        icon = assets.new_image(icon_name, 32)
         button.set_child(icon)
         button.connect("clicked", func)
 
@@ -562,6 +773,7 @@ def create_second_page():
         button_box.append(vbox)
 
     box.append(button_box)
+    watch_radios(toggle_buttons["Wifi"], toggle_buttons["Bluetooth"], toggle_buttons["Airplane"])
 
     # Add horizontal separator
     separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
@@ -616,123 +828,401 @@ def create_second_page():
 
     box.append(fan_temp_grid)
 
-    def update_fan_temp():
-        try:
-            # Fetch CPU temperature using sensors
-            cpu_temp_result = subprocess.run(["sensors"], capture_output=True, text=True, check=True)
-            cpu_temp_lines = [line for line in cpu_temp_result.stdout.split('\n') if 'Core 0' in line]
-            if cpu_temp_lines:
-                cpu_temp = cpu_temp_lines[0].split()[2]
-                cpu_temp_value.set_text(cpu_temp)
-
-            # Fetch GPU temperature using sensors
-            gpu_temp_lines = [line for line in cpu_temp_result.stdout.split('\n') if 'temp1' in line]
-            if gpu_temp_lines:
-                gpu_temp = gpu_temp_lines[0].split()[1]
-                gpu_temp_value.set_text(gpu_temp)
-
-            # Fetch CPU fan speed using sensors
-            cpu_fan_result = subprocess.run(["sensors"], capture_output=True, text=True, check=True)
-            cpu_fan_lines = [line for line in cpu_fan_result.stdout.split('\n') if 'fan1' in line]
-            if cpu_fan_lines:
-                cpu_fan_speed = cpu_fan_lines[0].split()[1]
-                cpu_fan_value.set_text(f"{cpu_fan_speed} RPM")
-
-            # Fetch GPU fan speed using sensors
-            gpu_fan_lines = [line for line in cpu_fan_result.stdout.split('\n') if 'fan2' in line]
-            if gpu_fan_lines:
-                gpu_fan_speed = gpu_fan_lines[0].split()[1]
-                gpu_fan_value.set_text(f"{gpu_fan_speed} RPM")
-        except Exception as e:
-            print(f"Failed to update fan and temperature: {e}")
-
-        return True  # Continue calling this function
+    # Subheader
+    subheader_label = Gtk.Label(label=f"History (last {HISTORY_WINDOW // 60} minutes)")
+    subheader_label.set_halign(Gtk.Align.START)
+    subheader_label.set_margin_start(20)
+    subheader_label.set_margin_top(6)
+    subheader_label.set_margin_bottom(2)
+    box.append(subheader_label)
 
-    GLib.timeout_add_seconds(5, update_fan_temp)
+    history_grid = Gtk.Grid()
+    history_grid.set_column_spacing(20)
+    history_grid.set_row_spacing(10)
+    history_grid.set_margin_start(20)
+    history_grid.set_margin_end(20)
+    history_grid.set_margin_top(10)
+    history_grid.set_margin_bottom(10)
+
+    sparklines = []
+    history_rows = [
+        ("CPU Usage", "cpu_percent", 0, 100),
+        ("Memory Usage", "memory_percent", 0, 100),
+        ("CPU Temperature", "cpu_temp", 20, 100),
+        ("CPU Fan Speed", "cpu_fan", 0, None),
+    ]
+    for row, (title, metric, lower, upper) in enumerate(history_rows):
+        history_label = Gtk.Label(label=title)
+        history_label.set_halign(Gtk.Align.START)
+        sparkline = Sparkline(history[metric], lower, upper)
+        history_grid.attach(history_label, 0, row, 1, 1)
+        history_grid.attach(sparkline, 1, row, 1, 1)
+        sparklines.append(sparkline)
+
+    box.append(history_grid)
+
+    sampler_label = Gtk.Label()
+    sampler_label.set_halign(Gtk.Align.CENTER)
+    sampler_label.add_css_class("dim-label")
+    box.append(sampler_label)
+
+    def update_telemetry(snapshot):
+        disk_usage_label.set_text(f"Disk Usage: {snapshot.disk_percent}%")
+        memory_usage_label.set_text(f"Memory Usage: {snapshot.memory_percent}%")
+        free_space_label.set_text(f"Free Space: {snapshot.disk_free // (1024 ** 3)} GB")
+        free_memory_label.set_text(f"Free Memory: {snapshot.memory_available // (1024 ** 2)} MB")
+
+        sensors = snapshot.sensors
+        cpu_temp_value.set_text(format_temp(sensors.cpu_temp))
+        gpu_temp_value.set_text(format_temp(sensors.gpu_temp))
+        cpu_fan_value.set_text(format_fan(sensors.cpu_fan))
+        gpu_fan_value.set_text(format_fan(sensors.gpu_fan))
+
+        for sparkline in sparklines:
+            sparkline.push()
+
+        interval = sampler.interval()
+        rate = f"every {interval} s" if interval else "paused"
+        sampler_label.set_text(f"Sampling {rate}, {sampler.average_cost() * 1000:.2f} ms per tick")
+
+    subscribe_while_visible(stack, "More", update_telemetry)
 
     
     return scrolled_window
 
-def about_dialog(_):
-    try:
-        # Check if fastfetch is installed
-        subprocess.run(["fastfetch", "--version"], check=True, capture_output=True, text=True)
-        fetch_command = ["fastfetch"]
-    except subprocess.CalledProcessError:
-        try:
-            # Check if neofetch is installed
-            subprocess.run(["neofetch", "--version"], check=True, capture_output=True, text=True)
-            fetch_command = ["neofetch", "--stdout"]
-        except subprocess.CalledProcessError:
-            fetch_command = None
+def create_process_page(stack):
+    table = ProcessTable()
+    rows = []
+    selected = set()
+    rendering = False
+    refreshing = False
+    timer = None
 
-    if fetch_command:
-        try:
-            result = subprocess.run(fetch_command, capture_output=True, text=True, check=True)
-            message = result.stdout
-        except subprocess.CalledProcessError as e:
-            message = f"Failed to fetch system information: {e}"
-    else:
-        distro_name = distro.name()
-        host_name = os.uname().nodename
-        user_name = os.getlogin()
-        cpu_info = subprocess.run(["lscpu"], capture_output=True, text=True).stdout.split('\n')[0]
-        memory_info = subprocess.run(["free", "-h"], capture_output=True, text=True).stdout.split('\n')[1]
-        message = f"Distro: {distro_name}\nHost: {host_name}\nUser: {user_name}\nCPU: {cpu_info}\nMemory: {memory_info}"
+    box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+    box.set_margin_start(20)
+    box.set_margin_end(20)
+    box.set_margin_top(10)
+
+    header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+    sort_dropdown = Gtk.DropDown.new_from_strings(["CPU", "Memory"])
+    status_label = Gtk.Label(label="Loading processes…")
+    status_label.set_hexpand(True)
+    status_label.set_halign(Gtk.Align.START)
+    header.append(status_label)
+    header.append(Gtk.Label(label="Sort by"))
+    header.append(sort_dropdown)
+    box.append(header)
+
+    list_box = Gtk.ListBox()
+    list_box.set_selection_mode(Gtk.SelectionMode.MULTIPLE)
+    scrolled_window = Gtk.ScrolledWindow()
+    scrolled_window.set_vexpand(True)
+    scrolled_window.set_min_content_height(400)
+    scrolled_window.set_child(list_box)
+    box.append(scrolled_window)
+
+    actions = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+    actions.set_halign(Gtk.Align.END)
+    actions.set_margin_bottom(10)
+    box.append(actions)
+
+    def render(top):
+        nonlocal rendering, refreshing, rows
+        refreshing = False
+        rendering = True
+        rows = top
+        while (row := list_box.get_first_child()) is not None:
+            list_box.remove(row)
+        for process in top:
+            row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+            name_label = Gtk.Label(label=process.name)
+            name_label.set_halign(Gtk.Align.START)
+            name_label.set_hexpand(True)
+            name_label.set_ellipsize(Pango.EllipsizeMode.END)
+            name_label.set_tooltip_text(process.cmdline or process.name)
+            row.append(name_label)
+            for text, width in ((str(process.pid), 7), (process.username, 10), (f"{process.cpu_percent:.1f}%", 7), (updates.format_size(process.rss), 10)):
+                label = Gtk.Label(label=text)
+                label.set_width_chars(width)
+                label.set_xalign(1)
+                row.append(label)
+            list_box.append(row)
+            if (process.pid, process.started) in selected:
+                list_box.select_row(list_box.get_last_child())
+        status_label.set_text(f"{len(table.rows)} processes, refreshed in {table.refresh_cost * 1000:.0f} ms")
+        rendering = False
+
+    def refresh(by):
+        # Reading /proc for every process runs off the main loop; only the top rows are rendered
+        table.refresh()
+        return table.top(by=by)
+
+    def on_refresh_failed(error):
+        nonlocal refreshing
+        refreshing = False
+        status_label.set_text(f"Failed to read processes: {error}")
+
+    def on_timer():
+        nonlocal refreshing
+        if not refreshing:
+            refreshing = True
+            by = "cpu" if sort_dropdown.get_selected() == 0 else "memory"
+            run_in_background(lambda: refresh(by), render, on_refresh_failed)
+        return True
 
-    try:
-        subprocess.run(["zenity", "--info", "--title", "System Information", "--text", message, "--width=600", "--height=400"], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to show system information: {e}")
+    def on_selection_changed(_):
+        if not rendering:
+            selected.clear()
+            # With the start time, so a PID reused before the action is not hit
+            selected.update((rows[row.get_index()].pid, rows[row.get_index()].started) for row in list_box.get_selected_rows())
+
+    def act(func, *args):
+        errors = func(sorted(selected), *args)
+        if errors:
+            dialogs.error("Processes", "; ".join(f"{pid}: {message}" for pid, message in sorted(errors.items())))
+        selected.clear()
+        on_timer()
+
+    def send_signal(sig, verb):
+        if not selected:
+            return
+        names = ", ".join(sorted({row.name for row in rows if (row.pid, row.started) in selected}))
+        dialogs.confirm(f"{verb} Processes", f"{verb} {len(selected)} selected processes ({names})?",
+                        lambda accepted: accepted and act(signal_processes, sig), accept_label=verb)
+
+    def update_timer(*_):
+        nonlocal timer
+        visible = stack.get_visible_child_name() == "Processes"
+        if visible and timer is None:
+            on_timer()
+            timer = GLib.timeout_add_seconds(1, on_timer)
+        elif not visible and timer is not None:
+            GLib.source_remove(timer)
+            timer = None
+
+    for label, handler in (
+        ("Lower Priority", lambda _: act(renice_processes, 5)),
+        ("End", lambda _: send_signal(signal.SIGTERM, "End")),
+        ("Kill", lambda _: send_signal(signal.SIGKILL, "Kill")),
+    ):
+        button = Gtk.Button(label=label)
+        button.connect("clicked", handler)
+        actions.append(button)
+    actions.get_last_child().add_css_class("destructive-action")
 
-def on_activate(app):
-    if not prepare():
-        return
+    list_box.connect("selected-rows-changed", on_selection_changed)
+    sort_dropdown.connect("notify::selected", lambda *_: on_timer())
+    stack.connect("notify::visible-child-name", update_timer)
+    update_timer()
+    return box
 
-    messageZen("Welcome", "Welcome to System Maintenance")
-    
-    win = Gtk.ApplicationWindow(application=app)
-    win.set_title("System Maintenance")
-    win.set_default_size(400, 600)
-    print("Current working directory:", os.getcwd())
+DISK_PAGE_ROWS = 200  # largest entries shown per folder
 
-    try:
-        icon_theme = Gtk.IconTheme.get_for_display(Gdk.Display.get_default())
-        icon_info = icon_theme.lookup_icon("icon.png", 48, 1, Gtk.TextDirection.NONE, Gtk.IconLookupFlags.GENERIC_FALLBACK)
-        if icon_info:
-            icon = GdkPixbuf.Pixbuf.new_from_file(icon_info.get_filename())
-            win.set_icon(icon)
-        else:
-            print("Icon not found")
-    except Exception as e:
-        print(f"Error setting icon: {e}")
+def create_disk_page(stack):
+    index = None
+    current_path = os.path.expanduser("~")
+    refresh_source = None
+    row_paths = []
 
-    stack = Gtk.Stack()
-    stack.set_transition_type(Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
-    stack.set_transition_duration(1000)
+    box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+    box.set_margin_start(20)
+    box.set_margin_end(20)
+    box.set_margin_top(10)
+
+    header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+    up_button = Gtk.Button(label="Up")
+    path_label = Gtk.Label(label=current_path)
+    path_label.set_hexpand(True)
+    path_label.set_halign(Gtk.Align.START)
+    path_label.set_ellipsize(Pango.EllipsizeMode.END)
+    scan_button = Gtk.Button(label="Scan")
+    header.append(up_button)
+    header.append(path_label)
+    header.append(scan_button)
+    box.append(header)
+
+    status_label = Gtk.Label(label="Scan your home folder to see where the space went")
+    status_label.set_halign(Gtk.Align.START)
+    box.append(status_label)
+
+    list_box = Gtk.ListBox()
+    list_box.set_selection_mode(Gtk.SelectionMode.NONE)
+    scrolled_window = Gtk.ScrolledWindow()
+    scrolled_window.set_vexpand(True)
+    scrolled_window.set_min_content_height(400)
+    scrolled_window.set_child(list_box)
+    box.append(scrolled_window)
+
+    def show_directory():
+        path_label.set_text(current_path)
+        up_button.set_sensitive(index is not None and current_path != index.root)
+        while (row := list_box.get_first_child()) is not None:
+            list_box.remove(row)
+        row_paths.clear()
+        if index is None:
+            return
+        total = index.total(current_path) or 1
+        for name, size, is_directory in index.children(current_path, limit=DISK_PAGE_ROWS):
+            row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+            name_label = Gtk.Label(label=name + ("/" if is_directory else ""))
+            name_label.set_halign(Gtk.Align.START)
+            name_label.set_size_request(220, -1)
+            name_label.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+            bar = Gtk.LevelBar(value=size / total)
+            bar.set_hexpand(True)
+            bar.set_valign(Gtk.Align.CENTER)
+            size_label = Gtk.Label(label=updates.format_size(size))
+            row.append(name_label)
+            row.append(bar)
+            row.append(size_label)
+            list_box.append(row)
+            row_paths.append(os.path.join(current_path, name) if is_directory else None)
+
+    def show_status():
+        state = "Scanned" if index.finished else "Scanning…"
+        status_label.set_text(f"{state} {len(index.records)} folders ({index.reused} unchanged), {updates.format_size(index.total())}")
+
+    def on_refresh():
+        show_status()
+        show_directory()
+        return True
 
-    main_page, percentage_label, health_label = create_main_page()
-    second_page = create_second_page()
+    def on_scan_finished():
+        nonlocal refresh_source
+        if refresh_source is not None:
+            GLib.source_remove(refresh_source)
+            refresh_source = None
+        scan_button.set_sensitive(True)
+        on_refresh()
+
+    def scan():
+        index.load()
+        if index.scan():
+            try:
+                index.save()
+            except OSError as e:
+                print(f"Failed to save disk usage index: {e}")
+        run_on_main(on_scan_finished)
+
+    def on_scan(_):
+        nonlocal index, refresh_source, current_path
+        index = DiskUsageIndex(os.path.expanduser("~"))
+        current_path = index.root
+        scan_button.set_sensitive(False)
+        # Partial totals are shown while the crawler runs
+        refresh_source = GLib.timeout_add(500, on_refresh)
+        threading.Thread(target=scan, daemon=True).start()
+
+    def on_row_activated(_, row):
+        nonlocal current_path
+        path = row_paths[row.get_index()]
+        if path is not None:
+            current_path = path
+            show_directory()
+
+    def on_up(_):
+        nonlocal current_path
+        current_path = os.path.dirname(current_path)
+        show_directory()
+
+    scan_button.connect("clicked", on_scan)
+    up_button.connect("clicked", on_up)
+    up_button.set_sensitive(False)
+    list_box.connect("row-activated", on_row_activated)
+    return box
+
+about_window = None
+show_about_rows = None
 
-    stack.add_titled(main_page, "main", "Main Page")
-    stack.add_titled(second_page, "More", "Configure Page")
+def about_dialog(_):
+    # Built once and hidden on close; static facts come from the boot-keyed
+    # cache, so a refresh only re-reads uptime, memory and load
+    global about_window, show_about_rows
+    if about_window is None:
+        about_window, show_about_rows = dialogs.create_facts_window("System Information", sysinfo.format_rows)
+    about_window.present()
+    run_in_background(sysinfo.collect, show_about_rows)
+
+def report_first_frame(win):
+    frame_clock = win.get_frame_clock()
+    if frame_clock is None:
+        return
+
+    def on_after_paint(clock):
+        clock.disconnect(handler_id)
+        first_frame = trace.finish()
+        if trace.enabled:
+            print(f"Time to first frame: {first_frame * 1000:.0f} ms")
 
-    stack_switcher = Gtk.StackSwitcher()
-    stack_switcher.set_stack(stack)
-    stack_switcher.set_margin_start(10)
-    stack_switcher.set_margin_end(10)
-    stack_switcher.set_margin_top(20)
-    stack_switcher.set_margin_bottom(10)
+    handler_id = frame_clock.connect("after-paint", on_after_paint)
 
-    vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
-    vbox.append(stack)
-    vbox.append(stack_switcher)
+def on_activate(app):
+    trace.mark("activate")
+    with trace.span("widgets"):
+        assets.load_bundle()
+        win = Gtk.ApplicationWindow(application=app)
+        win.set_title("System Maintenance")
+        win.set_default_size(400, 600)
+
+        assets.setup_app_icon(win.get_display())
+
+        stack = Gtk.Stack()
+        stack.set_transition_type(Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
+        stack.set_transition_duration(1000)
+
+        main_page, percentage_label, health_label = create_main_page()
+        stack.add_titled(main_page, "main", "Main Page")
+        # Built on first switch; keeps its probes and timers off the startup path
+        add_lazy_page(stack, "More", "Configure Page", create_second_page)
+        add_lazy_page(stack, "Processes", "Processes", create_process_page)
+        add_lazy_page(stack, "Disk", "Disk Usage", create_disk_page)
+
+        stack_switcher = Gtk.StackSwitcher()
+        stack_switcher.set_stack(stack)
+        stack_switcher.set_margin_start(10)
+        stack_switcher.set_margin_end(10)
+        stack_switcher.set_margin_top(20)
+        stack_switcher.set_margin_bottom(10)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        vbox.append(dialogs.create_banner(win))
+        vbox.append(stack)
+        vbox.append(stack_switcher)
+
+        win.set_child(profiler.create_overlay(vbox) if profiler.enabled else vbox)
 
-    win.set_child(vbox)
     win.present()
+    trace.mark("presented")
+    report_first_frame(win)
+
+    dialogs.info("Welcome", "Welcome to System Maintenance")
+
+    with trace.span("probes"):
+        # Pushes on UPower property changes only, so it stays connected while hidden
+        power_monitor = power.PowerMonitor(lambda state: update_battery_status(percentage_label, health_label, state)).start()
+    win.connect("notify::is-active", lambda win, _: sampler.set_focused(win.is_active()))
+    surface = win.get_surface()
+    surface.connect("notify::state", lambda surface, _: sampler.set_minimised(bool(surface.get_state() & Gdk.ToplevelState.MINIMIZED)))
+    with trace.span("probes"):
+        sampler.start()
+
+    def on_schedule_tick():
+        # Reads load, PSI and logind off the main loop
+        threading.Thread(target=scheduler.tick, name="scheduler-tick", daemon=True).start()
+        return True
+
+    def on_close_request(_):
+        power_monitor.stop()
+        scheduler.interrupt()
+        return False
+
+    GLib.timeout_add_seconds(CHECK_INTERVAL, on_schedule_tick)
+    win.connect("close-request", on_close_request)
 
-    GLib.timeout_add_seconds(5, update_battery_status, percentage_label, health_label)
+def main():
+    app = Gtk.Application()
+    app.connect('activate', on_activate)
+    return app.run(None)
 
-app = Gtk.Application()
-app.connect('activate', on_activate)
-app.run(None)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+
+from gi.repository import Gdk, GdkPixbuf, Gio, GLib, Gtk
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_PATH = os.path.join(APP_DIR, "sys_main.gresource")
+RESOURCE_PREFIX = "/io/github/fcatilizer/sys_main"
+APP_ICON_NAME = "sys-main"
+
+# Every icon the UI draws, with the pixel sizes it is drawn at.
+# build_assets.py pre-rasterises exactly these into the bundle.
+ASSETS = {
+    "battery_icon.png": (120,),
+    "wifi.svg": (32,),
+    "bluetooth.svg": (32,),
+    "airplane.svg": (32,),
+    "mic.svg": (32,),
+    "about.svg": (32,),
+}
+APP_ICON_SOURCE = os.path.join("src", "Logo", "icon.png")
+APP_ICON_SIZES = (48, 128)
+SCALES = (1, 2)
+
+_textures = {}
+_bundle_loaded = None
+
+
+def texture_resource_path(name, size, scale):
+    stem = os.path.splitext(name)[0]
+    return f"{RESOURCE_PREFIX}/textures/{stem}-{size}@{scale}.png"
+
+
+def load_bundle():
+    # Registers the compiled bundle once; False means we fall back to loose files
+    global _bundle_loaded
+    if _bundle_loaded is None:
+        try:
+            Gio.Resource.load(BUNDLE_PATH)._register()
+            _bundle_loaded = True
+        except GLib.Error:
+            print("Asset bundle not found, loading loose icon files (run build_assets.py)")
+            _bundle_loaded = False
+    return _bundle_loaded
+
+
+def get_texture(name, size, scale=1):
+    key = (name, size, scale)
+    texture = _textures.get(key)
+    if texture is None:
+        texture = _load_texture(name, size, scale)
+        _textures[key] = texture
+    return texture
+
+
+def _load_texture(name, size, scale):
+    if load_bundle():
+        resource_path = texture_resource_path(name, size, scale)
+        try:
+            # new_from_resource aborts on a missing path, so look it up first
+            Gio.resources_get_info(resource_path, Gio.ResourceLookupFlags.NONE)
+            return Gdk.Texture.new_from_resource(resource_path)
+        except GLib.Error:
+            pass
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(os.path.join(APP_DIR, name), size * scale, size * scale)
+    return Gdk.Texture.new_for_pixbuf(pixbuf)
+
+
+def preferred_scale():
+    display = Gdk.Display.get_default()
+    monitors = display.get_monitors() if display else None
+    if monitors:
+        for i in range(monitors.get_n_items()):
+            if monitors.get_item(i).get_scale_factor() > 1:
+                return 2
+    return 1
+
+
+def new_image(name, size):
+    try:
+        image = Gtk.Image.new_from_paintable(get_texture(name, size, preferred_scale()))
+    except GLib.Error as e:
+        print(f"Failed to load icon {name}: {e}")
+        image = Gtk.Image.new_from_icon_name("image-missing")
+    image.set_pixel_size(size)
+    return image
+
+
+def setup_app_icon(display):
+    icon_theme = Gtk.IconTheme.get_for_display(display)
+    if load_bundle():
+        icon_theme.add_resource_path(f"{RESOURCE_PREFIX}/icons")
+        Gtk.Window.set_default_icon_name(APP_ICON_NAME)
+    else:
+        icon_theme.add_search_path(os.path.dirname(os.path.join(APP_DIR, APP_ICON_SOURCE)))
+        Gtk.Window.set_default_icon_name("icon")
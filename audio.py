@@ -0,0 +1,163 @@
+import subprocess
+import threading
+
+from capabilities import get_capabilities
+from throttle import Coalescer
+
+try:
+    import pulsectl
+except ImportError:
+    pulsectl = None
+
+# Slider writes are coalesced to at most this many per second
+WRITE_RATE = 10
+
+
+class PulseConnection:
+    # One long-lived client connection to the PulseAudio / pipewire-pulse server
+    def __init__(self, server=None):
+        self.server = server
+        self._pulse = None
+
+    def _connect(self):
+        if self._pulse is None:
+            self._pulse = pulsectl.Pulse("sys-main", server=self.server)
+        return self._pulse
+
+    def _device(self, kind):
+        pulse = self._connect()
+        info = pulse.server_info()
+        if kind == "sink":
+            return pulse.get_sink_by_name(info.default_sink_name)
+        return pulse.get_source_by_name(info.default_source_name)
+
+    def _retry(self, func):
+        try:
+            return func()
+        except pulsectl.PulseError:
+            # Server restarted or connection dropped; reconnect once
+            self.close()
+            return func()
+
+    def get_volume(self, kind):
+        return self._retry(lambda: round(self._connect().volume_get_all_chans(self._device(kind)) * 100))
+
+    def set_volume(self, kind, value):
+        def apply():
+            device = self._device(kind)
+            self._connect().volume_set_all_chans(device, value / 100)
+            if device.mute:
+                self._connect().mute(device, False)
+        self._retry(apply)
+
+    def set_mute(self, kind, muted):
+        self._retry(lambda: self._connect().mute(self._device(kind), muted))
+
+    def close(self):
+        if self._pulse is not None:
+            self._pulse.close()
+            self._pulse = None
+
+
+class CommandConnection:
+    # Fallback when pulsectl is missing: the server type comes from the
+    # capability index and every write goes through a single pactl (or amixer) call.
+    def __init__(self, use_pactl):
+        self.use_pactl = use_pactl
+
+    def get_volume(self, kind):
+        if self.use_pactl:
+            command = "get-sink-volume" if kind == "sink" else "get-source-volume"
+            target = "@DEFAULT_SINK@" if kind == "sink" else "@DEFAULT_SOURCE@"
+            result = subprocess.run(["pactl", command, target], capture_output=True, text=True, check=True)
+            return int(result.stdout.split('/')[1].strip().replace('%', ''))
+        control = "Master" if kind == "sink" else "Capture"
+        result = subprocess.run(["amixer", "get", control], capture_output=True, text=True, check=True)
+        return int(result.stdout.split('[')[1].split('%')[0])
+
+    def set_volume(self, kind, value):
+        if self.use_pactl:
+            command = "set-sink-volume" if kind == "sink" else "set-source-volume"
+            target = "@DEFAULT_SINK@" if kind == "sink" else "@DEFAULT_SOURCE@"
+            subprocess.run(["pactl", command, target, f"{value}%"], check=True)
+        else:
+            control = "Master" if kind == "sink" else "Capture"
+            subprocess.run(["amixer", "set", control, f"{value}%", "unmute"], check=True)
+
+    def set_mute(self, kind, muted):
+        if self.use_pactl:
+            command = "set-sink-mute" if kind == "sink" else "set-source-mute"
+            target = "@DEFAULT_SINK@" if kind == "sink" else "@DEFAULT_SOURCE@"
+            subprocess.run(["pactl", command, target, "1" if muted else "0"], check=True)
+        else:
+            control = "Master" if kind == "sink" else "Capture"
+            subprocess.run(["amixer", "set", control, "mute" if muted else "unmute"], check=True)
+
+    def close(self):
+        pass
+
+
+def detect_pactl():
+    capabilities = get_capabilities()
+    running = capabilities.backend("pipewire") or capabilities.backend("pulse")
+    return capabilities.has("pactl") and running
+
+
+class AudioBackend:
+    def __init__(self, server=None, rate=WRITE_RATE):
+        self.server = server
+        self._connection = None
+        self._lock = threading.Lock()
+        self.volume_writer = Coalescer(lambda value: self._set("sink", value), 1 / rate, "volume")
+        self.microphone_writer = Coalescer(lambda value: self._set("source", value), 1 / rate, "microphone")
+        # Mute takes the wanted state rather than toggling, so coalesced clicks stay correct
+        self.microphone_mute_writer = Coalescer(lambda muted: self._set_mute("source", muted), 1 / rate, "microphone-mute")
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            if pulsectl is not None:
+                self._connection = PulseConnection(self.server)
+            else:
+                self._connection = CommandConnection(detect_pactl())
+        return self._connection
+
+    def _set(self, kind, value):
+        with self._lock:
+            self.connection.set_volume(kind, value)
+
+    def _set_mute(self, kind, muted):
+        with self._lock:
+            self.connection.set_mute(kind, muted)
+
+    def _get(self, kind, default):
+        try:
+            with self._lock:
+                return self.connection.get_volume(kind)
+        except Exception as e:
+            print(f"Failed to get current {kind} volume: {e}")
+            return default
+
+    def get_volume(self, default=50):
+        return self._get("sink", default)
+
+    def get_microphone_volume(self, default=50):
+        return self._get("source", default)
+
+    def set_volume(self, value):
+        self.volume_writer.submit(value)
+
+    def set_microphone_volume(self, value):
+        self.microphone_writer.submit(value)
+
+    def set_microphone_mute(self, muted):
+        self.microphone_mute_writer.submit(muted)
+
+    def close(self):
+        self.volume_writer.close()
+        self.microphone_writer.close()
+        self.microphone_mute_writer.close()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,114 @@
+import os
+
+from throttle import Coalescer
+
+# Screen backlight and LED (keyboard backlight) devices from sysfs. Values
+# are percentages scaled to each device's max_brightness. Handles stay open
+# and slider drags are coalesced to WRITE_RATE writes per second. When the
+# brightness file is not writable (no udev rule for the user), the write
+# goes through logind's Session.SetBrightness, which needs no root.
+
+SYSFS_ROOT = "/sys/class"
+SUBSYSTEMS = ("backlight", "leds")
+WRITE_RATE = 20
+# logind's preference when several backlights exist
+BACKLIGHT_TYPES = ("firmware", "platform", "raw")
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class BrightnessDevice:
+    def __init__(self, subsystem, name, root=SYSFS_ROOT, rate=WRITE_RATE):
+        self.subsystem = subsystem
+        self.name = name
+        self.path = os.path.join(root, subsystem, name)
+        self.max_brightness = int(_read_text(os.path.join(self.path, "max_brightness")) or 0)
+        self.type = _read_text(os.path.join(self.path, "type"))
+        self.writer = Coalescer(self.write_raw, interval=1.0 / rate, name=f"brightness-{name}")
+        self._read_fd = None
+        self._write_fd = None
+        self._use_logind = False
+
+    def __repr__(self):
+        return f"BrightnessDevice({self.subsystem}/{self.name}, max={self.max_brightness})"
+
+    def read_raw(self):
+        # actual_brightness is what the hardware reports; brightness is the last request
+        if self._read_fd is None:
+            actual = os.path.join(self.path, "actual_brightness")
+            self._read_fd = os.open(actual if os.path.exists(actual) else os.path.join(self.path, "brightness"), os.O_RDONLY)
+        return int(os.pread(self._read_fd, 32, 0))
+
+    def get_percent(self):
+        if not self.max_brightness:
+            return 0
+        return round(self.read_raw() * 100 / self.max_brightness)
+
+    def set_percent(self, percent):
+        # Called from the UI thread; the write happens on the coalescer thread
+        raw = round(max(0, min(100, percent)) * self.max_brightness / 100)
+        self.writer.submit(raw)
+
+    def write_raw(self, value):
+        if not self._use_logind:
+            try:
+                if self._write_fd is None:
+                    self._write_fd = os.open(os.path.join(self.path, "brightness"), os.O_WRONLY)
+                os.pwrite(self._write_fd, str(value).encode(), 0)
+                return
+            except PermissionError:
+                self._use_logind = True
+        self._set_brightness_logind(value)
+
+    def _set_brightness_logind(self, value):
+        from gi.repository import Gio, GLib
+
+        bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        bus.call_sync(
+            "org.freedesktop.login1",
+            "/org/freedesktop/login1/session/auto",
+            "org.freedesktop.login1.Session",
+            "SetBrightness",
+            GLib.Variant("(ssu)", (self.subsystem, self.name, value)),
+            None,
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+        )
+
+    def close(self):
+        self.writer.close()
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._write_fd = None
+
+
+def discover(root=SYSFS_ROOT):
+    devices = []
+    for subsystem in SUBSYSTEMS:
+        try:
+            names = sorted(os.listdir(os.path.join(root, subsystem)))
+        except OSError:
+            continue
+        for name in names:
+            device = BrightnessDevice(subsystem, name, root)
+            if device.max_brightness > 0:
+                devices.append(device)
+    return devices
+
+
+def screen_backlight(devices):
+    backlights = [device for device in devices if device.subsystem == "backlight"]
+    ranked = sorted(backlights, key=lambda device: BACKLIGHT_TYPES.index(device.type) if device.type in BACKLIGHT_TYPES else len(BACKLIGHT_TYPES))
+    return ranked[0] if ranked else None
+
+
+def keyboard_backlight(devices):
+    return next((device for device in devices if device.subsystem == "leds" and "kbd_backlight" in device.name), None)
@@ -0,0 +1,536 @@
+import argparse
+import inspect
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Headless benchmarks for the code behind the UI handlers. Every case runs
+# against a generated /sys and /proc tree, with subprocess.Popen replaced by
+# a shim that counts the processes a handler would spawn and sleeps for a
+# simulated start-up latency instead. Results are compared with
+# bench_baseline.json; a new fork on the main thread, noticeably more forks
+# overall, or a large slowdown fails the run.
+#   python bench.py                    # compare with the baseline
+#   python bench.py --update-baseline  # accept the current numbers
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+BASELINE_PATH = os.path.join(APP_DIR, "bench_baseline.json")
+REPEAT = 200
+DRAG_EVENTS = 100
+# Timings vary between machines; only flag big slowdowns, and ignore
+# anything under TIME_FLOOR seconds per interaction
+TIME_TOLERANCE = 3.0
+TIME_FLOOR = 0.0005
+# Coalesced writes race the worker thread, so the total may vary a little
+FORK_TOLERANCE = 1.5
+
+# Seconds a real process of each tool takes to start and answer
+DEFAULT_LATENCY = 0.005
+COMMAND_LATENCY = {
+    "pactl": 0.004,
+    "amixer": 0.006,
+    "powerprofilesctl": 0.120,
+    "nmcli": 0.030,
+    "bluetoothctl": 0.040,
+    "fastfetch": 0.080,
+}
+COMMAND_OUTPUT = {
+    "pactl": "Volume: front-left: 32768 /  50% / -18.06 dB,   front-right: 32768 /  50% / -18.06 dB\n",
+    "amixer": "  Front Left: Playback 32768 [50%] [on]\n",
+    "powerprofilesctl": "balanced\n",
+}
+
+# The app's own modules, in the order app.py imports them
+STARTUP_MODULES = (
+    "profiler", "assets", "backlight", "controls", "dialogs", "maintenance", "pacmandb", "pkgcache", "power", "swap",
+    "sysinfo", "updates", "audio", "capabilities", "jobs", "privhelper", "scheduler", "sensors", "startup_trace",
+    "telemetry", "history", "sparkline", "diskusage", "processes", "tmpclean",
+)
+# Seconds the activate case keeps the main loop running after on_activate
+ACTIVATE_SETTLE = 1.0
+
+
+class SkipCase(Exception):
+    pass
+
+
+class ForkRecorder:
+    # Replaces subprocess.Popen while active. Commands never run: each call
+    # is recorded with the thread it came from and sleeps for its latency.
+    def __init__(self, latency=None, outputs=None):
+        self.latency = COMMAND_LATENCY if latency is None else latency
+        self.outputs = COMMAND_OUTPUT if outputs is None else outputs
+        self.calls = []
+        self._lock = threading.Lock()
+        self._original = None
+
+    def __enter__(self):
+        self._original = subprocess.Popen
+        subprocess.Popen = self._popen_class()
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen = self._original
+        return False
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+
+    def counts(self):
+        with self._lock:
+            main = sum(1 for _, on_main, _ in self.calls if on_main)
+            return main, len(self.calls), sum(latency for _, _, latency in self.calls)
+
+    def _record(self, argv):
+        name = os.path.basename(argv[0]) if argv else "?"
+        latency = self.latency.get(name, DEFAULT_LATENCY)
+        with self._lock:
+            self.calls.append((name, threading.current_thread() is threading.main_thread(), latency))
+        time.sleep(latency)
+        return self.outputs.get(name, "")
+
+    def _popen_class(self):
+        recorder = self
+
+        class FakePopen:
+            def __init__(self, args, *_, text=None, universal_newlines=None, **__):
+                self.args = args
+                self.returncode = 0
+                self.stdin = self.stdout = self.stderr = None
+                self.pid = 0
+                self._text = text or universal_newlines
+                self._output = recorder._record([args] if isinstance(args, str) else list(args))
+
+            def communicate(self, input=None, timeout=None):
+                if self._text:
+                    return self._output, ""
+                return self._output.encode(), b""
+
+            def wait(self, timeout=None):
+                return self.returncode
+
+            def poll(self):
+                return self.returncode
+
+            def kill(self):
+                pass
+
+            terminate = kill
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        return FakePopen
+
+
+def _write(root, relative, content):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def build_fake_root(root):
+    # A laptop-shaped /sys and /proc: hwmon chips, battery and AC, backlight
+    # and keyboard LED, one GPU, and the procfs files the app reads
+    sys_root = os.path.join(root, "sys")
+    proc_root = os.path.join(root, "proc")
+
+    chips = {
+        "hwmon0": ("coretemp", [("temp1", "Package id 0", 54000)] + [(f"temp{i}", f"Core {i - 2}", 50000 + i * 500) for i in range(2, 10)]),
+        "hwmon1": ("amdgpu", [("temp1", "edge", 47000), ("fan1", None, 1800)]),
+        "hwmon2": ("nvme", [("temp1", "Composite", 38850)]),
+        "hwmon3": ("asus", [("fan1", "cpu_fan", 2400), ("fan2", "gpu_fan", 2100)]),
+        "hwmon4": ("acpitz", [("temp1", None, 45000)]),
+    }
+    for hwmon, (name, channels) in chips.items():
+        _write(sys_root, f"class/hwmon/{hwmon}/name", f"{name}\n")
+        for channel, label, value in channels:
+            _write(sys_root, f"class/hwmon/{hwmon}/{channel}_input", f"{value}\n")
+            if label:
+                _write(sys_root, f"class/hwmon/{hwmon}/{channel}_label", f"{label}\n")
+
+    supplies = {
+        "BAT0": {"type": "Battery", "status": "Discharging", "capacity": "76", "energy_full": "45120000",
+                 "energy_full_design": "50160000", "cycle_count": "212"},
+        "AC": {"type": "Mains", "online": "0"},
+        "hid-00:11:22:33:44:55-battery": {"type": "Battery", "scope": "Device", "capacity": "40"},
+    }
+    for supply, attributes in supplies.items():
+        for attribute, value in attributes.items():
+            _write(sys_root, f"class/power_supply/{supply}/{attribute}", f"{value}\n")
+
+    for subsystem, name, maximum, value, kind in (
+        ("backlight", "intel_backlight", 96000, 48000, "raw"),
+        ("backlight", "acpi_video0", 100, 50, "firmware"),
+        ("leds", "asus::kbd_backlight", 3, 1, None),
+        ("leds", "input3::capslock", 1, 0, None),
+    ):
+        device = f"class/{subsystem}/{name}"
+        _write(sys_root, f"{device}/max_brightness", f"{maximum}\n")
+        _write(sys_root, f"{device}/brightness", f"{value}\n")
+        if subsystem == "backlight":
+            _write(sys_root, f"{device}/actual_brightness", f"{value}\n")
+            _write(sys_root, f"{device}/type", f"{kind}\n")
+
+    _write(sys_root, "class/drm/card0/device/vendor", "0x1002\n")
+    _write(sys_root, "class/drm/card0/device/device", "0x1638\n")
+    _write(sys_root, "class/drm/card0-eDP-1/status", "connected\n")
+    for field, value in (("sys_vendor", "ASUSTeK COMPUTER INC."), ("product_name", "ROG Zephyrus G14"),
+                         ("board_vendor", "ASUSTeK COMPUTER INC."), ("board_name", "GA401QM"), ("bios_version", "GA401QM.410")):
+        _write(sys_root, f"class/dmi/id/{field}", f"{value}\n")
+    _write(sys_root, "devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq", "4280000\n")
+
+    cpuinfo = "".join(
+        f"processor\t: {cpu}\nmodel name\t: AMD Ryzen 9 5900HS with Radeon Graphics\n"
+        f"physical id\t: 0\ncore id\t\t: {cpu // 2}\n\n" for cpu in range(16))
+    _write(proc_root, "cpuinfo", cpuinfo)
+    _write(proc_root, "meminfo", "MemTotal:       15730000 kB\nMemFree:         2100000 kB\nMemAvailable:    9400000 kB\n"
+                                 "SwapTotal:       8388604 kB\nSwapFree:        7340028 kB\n")
+    _write(proc_root, "swaps", "Filename\t\t\t\tType\t\tSize\t\tUsed\t\tPriority\n/dev/zram0 partition\t8388604\t1048576\t100\n")
+    _write(proc_root, "pressure/memory", "some avg10=0.00 avg60=0.00 avg300=0.00 total=0\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+    _write(proc_root, "uptime", "12345.67 98765.43\n")
+    _write(proc_root, "loadavg", "0.52 0.61 0.70 2/1024 4242\n")
+    _write(proc_root, "sys/kernel/random/boot_id", "0f8fad5b-d9cb-469f-a165-70867728950e\n")
+    return {"root": root, "sys": sys_root, "proc": proc_root}
+
+
+def _in_background(func):
+    # Runs func the way app.run_in_background does, off the main thread
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0] if result else None
+
+
+def _per_call(func, repeat=REPEAT):
+    func()  # warm caches and lazily opened handles
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), repeat + 1
+
+
+# Each case returns (seconds per interaction on the thread the app runs it
+# on, interactions);
+# forks are counted by the recorder around it.
+
+def case_sensor_refresh(fake):
+    # The sensor part of update_telemetry: one pread per hwmon channel
+    from sensors import SensorReader
+
+    with SensorReader(os.path.join(fake["sys"], "class", "hwmon")) as reader:
+        return _per_call(reader.read)
+
+
+def case_telemetry_tick(fake):
+    from sensors import SensorReader
+    from telemetry import Sampler
+
+    sampler = Sampler(SensorReader(os.path.join(fake["sys"], "class", "hwmon")))
+    try:
+        return _per_call(sampler.collect, repeat=50)
+    finally:
+        sampler.sensor_reader.close()
+
+
+def case_battery_update(fake):
+    # What the power monitor reads per change outside UPower
+    import power
+
+    return _per_call(lambda: power.read_sysfs_state(os.path.join(fake["sys"], "class", "power_supply")))
+
+
+def case_volume_drag(fake):
+    # on_volume_changed for a whole drag, without pulsectl: every applied
+    # value is a pactl process on the writer thread
+    from audio import AudioBackend, CommandConnection
+
+    backend = AudioBackend()
+    backend._connection = CommandConnection(use_pactl=True)
+    start = time.perf_counter()
+    for value in range(DRAG_EVENTS):
+        backend.set_volume(value)
+    elapsed = time.perf_counter() - start
+    backend.volume_writer.flush()
+    backend.close()
+    return elapsed / DRAG_EVENTS, 1
+
+
+def case_brightness_drag(fake):
+    import backlight
+
+    device = backlight.screen_backlight(backlight.discover(os.path.join(fake["sys"], "class")))
+    start = time.perf_counter()
+    for value in range(DRAG_EVENTS):
+        device.set_percent(value)
+    elapsed = time.perf_counter() - start
+    device.writer.flush()
+    device.close()
+    return elapsed / DRAG_EVENTS, 1
+
+
+def case_second_page_data(fake):
+    # create_second_page's background load: devices and current levels
+    import backlight
+    from audio import AudioBackend, CommandConnection
+
+    def load():
+        backend = AudioBackend()
+        backend._connection = CommandConnection(use_pactl=True)
+        devices = backlight.discover(os.path.join(fake["sys"], "class"))
+        levels = (backend.get_volume(), backend.get_microphone_volume(),
+                  [device.get_percent() for device in devices])
+        for device in devices:
+            device.close()
+        backend.close()
+        return levels
+
+    start = time.perf_counter()
+    _in_background(load)
+    return time.perf_counter() - start, 1
+
+
+def case_about_dialog(fake):
+    # A repeat click: static facts come from the boot-ID cache
+    import sysinfo
+
+    cache_path = os.path.join(fake["root"], "sysinfo.json")
+    return _per_call(lambda: _in_background(lambda: sysinfo.collect(fake["proc"], fake["sys"], cache_path)), repeat=50)
+
+
+def case_swap_plan(fake):
+    import swap
+
+    return _per_call(lambda: swap.plan_reclaim(fake["proc"]))
+
+
+def case_startup_imports(fake):
+    # Importing the app's modules in a fresh interpreter, best of three.
+    # Runs the real interpreter, so it is not counted as a fork. Skipped
+    # unless every module imports, since a partial import is not comparable.
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {STARTUP_MODULES!r}:\n"
+        "    try:\n"
+        "        __import__(name)\n"
+        "    except ImportError as e:\n"
+        "        print('missing', e.name)\n"
+        "        sys.exit()\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    best = None
+    for _ in range(3):
+        result = subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, capture_output=True, text=True, check=True)
+        output = result.stdout.strip().splitlines()[-1]
+        if output.startswith("missing "):
+            raise ImportError(output, name=output.split()[1])
+        seconds = float(output)
+        best = seconds if best is None else min(best, seconds)
+    return best, 1
+
+
+def _redirect_roots(fake, modules):
+    # Points every module constant and default argument naming a path under
+    # /sys or /proc at the fake tree; the app builds its readers from them
+    def redirect(value):
+        if isinstance(value, str):
+            for real, replacement in (("/sys", fake["sys"]), ("/proc", fake["proc"])):
+                if value == real or value.startswith(real + "/"):
+                    return replacement + value[len(real):]
+        return value
+
+    for module in modules:
+        for name, value in list(vars(module).items()):
+            functions = []
+            if inspect.isfunction(value):
+                functions = [value]
+            elif inspect.isclass(value) and value.__module__ == module.__name__:
+                functions = [member for member in vars(value).values() if inspect.isfunction(member)]
+            elif redirect(value) is not value:
+                setattr(module, name, redirect(value))
+            for function in functions:
+                if function.__defaults__:
+                    function.__defaults__ = tuple(redirect(default) for default in function.__defaults__)
+                if function.__kwdefaults__:
+                    function.__kwdefaults__ = {key: redirect(default) for key, default in function.__kwdefaults__.items()}
+
+
+def case_activate(fake):
+    # app.on_activate end to end: widgets, probes, the sampler and the
+    # scheduler start against the fake tree, then the main loop runs for
+    # ACTIVATE_SETTLE seconds so timers and idle callbacks fire too. Needs
+    # GTK 4 and a display.
+    if not (os.environ.get("WAYLAND_DISPLAY") or os.environ.get("DISPLAY")):
+        raise SkipCase("no display")
+    import gi
+    try:
+        gi.require_version("Gtk", "4.0")
+    except ValueError:
+        raise SkipCase("GTK 4 is not installed")
+    os.environ["XDG_CACHE_HOME"] = os.path.join(fake["root"], "cache")
+    os.environ["XDG_STATE_HOME"] = os.path.join(fake["root"], "state")
+    _redirect_roots(fake, [__import__(name) for name in STARTUP_MODULES])
+    import app
+    from gi.repository import Gio, GLib, Gtk
+
+    elapsed = []
+    application = Gtk.Application(flags=Gio.ApplicationFlags.NON_UNIQUE)
+
+    def on_settled():
+        application.quit()
+        return False
+
+    def on_activate(application):
+        start = time.perf_counter()
+        app.on_activate(application)
+        elapsed.append(time.perf_counter() - start)
+        GLib.timeout_add(int(ACTIVATE_SETTLE * 1000), on_settled)
+
+    application.connect("activate", on_activate)
+    application.run(None)
+    return elapsed[0], 1
+
+
+CASES = {
+    "sensor_refresh": case_sensor_refresh,
+    "telemetry_tick": case_telemetry_tick,
+    "battery_update": case_battery_update,
+    "volume_drag": case_volume_drag,
+    "brightness_drag": case_brightness_drag,
+    "second_page_data": case_second_page_data,
+    "about_dialog": case_about_dialog,
+    "swap_plan": case_swap_plan,
+    "activate": case_activate,
+}
+# Cases that must run real processes
+UNSHIMMED_CASES = {
+    "startup_imports": case_startup_imports,
+}
+# Cases that only run on a machine with GTK installed. The committed
+# baseline may have been recorded without them, so a missing entry is a
+# warning rather than a failure.
+ENVIRONMENT_CASES = {"startup_imports", "activate"}
+
+
+def run_cases(fake, names=None):
+    results = {}
+    recorder = ForkRecorder()
+    selected = [(name, func, True) for name, func in CASES.items()] + [(name, func, False) for name, func in UNSHIMMED_CASES.items()]
+    for name, func, shimmed in selected:
+        if names and name not in names:
+            continue
+        recorder.reset()
+        try:
+            if shimmed:
+                with recorder:
+                    seconds, interactions = func(fake)
+            else:
+                seconds, interactions = func(fake)
+        except ImportError as e:
+            results[name] = {"skipped": f"missing module {e.name}"}
+            continue
+        except SkipCase as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        main_forks, forks, fork_seconds = recorder.counts()
+        results[name] = {
+            "seconds": seconds,
+            "main_thread_forks": main_forks / interactions,
+            "forks": forks / interactions,
+            "fork_seconds": fork_seconds / interactions,
+        }
+    return results
+
+
+def compare(results, baseline):
+    # Returns (regressions, warnings). A case that ran but has no baseline
+    # entry is a regression too, so a new case cannot pass unchecked, unless
+    # it is one of ENVIRONMENT_CASES.
+    problems = []
+    warnings = []
+    for name, result in results.items():
+        if "skipped" in result:
+            continue
+        expected = baseline.get(name)
+        if not expected or "skipped" in expected:
+            message = f"{name}: no baseline entry; run with --update-baseline {name} to record one"
+            (warnings if name in ENVIRONMENT_CASES else problems).append(message)
+            continue
+        if result["main_thread_forks"] > expected["main_thread_forks"]:
+            problems.append(f"{name}: {result['main_thread_forks']:g} processes spawned on the main thread per interaction, baseline {expected['main_thread_forks']:g}")
+        if result["forks"] > expected["forks"] * FORK_TOLERANCE + 1e-9 and result["forks"] > expected["forks"] + 1:
+            problems.append(f"{name}: {result['forks']:g} processes per interaction, baseline {expected['forks']:g}")
+        if result["seconds"] > max(expected["seconds"] * TIME_TOLERANCE, TIME_FLOOR):
+            problems.append(f"{name}: {result['seconds'] * 1000:.3f} ms per interaction, baseline {expected['seconds'] * 1000:.3f} ms")
+    return problems, warnings
+
+
+def format_results(results):
+    lines = [f"{'case':<18} {'time':>12} {'main forks':>10} {'forks':>6} {'fork time':>10}"]
+    for name, result in results.items():
+        if "skipped" in result:
+            lines.append(f"{name:<18} skipped ({result['skipped']})")
+            continue
+        lines.append(f"{name:<18} {result['seconds'] * 1000:>9.3f} ms {result['main_thread_forks']:>10g} "
+                     f"{result['forks']:>6g} {result['fork_seconds'] * 1000:>7.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the UI handler paths against a fake /sys and /proc")
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(list(CASES) + list(UNSHIMMED_CASES))})")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="sys_main-bench-") as root:
+        results = run_cases(build_fake_root(root), set(args.cases))
+
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    if args.update_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError):
+            baseline = {}
+        # Keep entries for cases that were skipped or not selected this time
+        baseline.update({name: result for name, result in results.items() if "skipped" not in result})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+    problems, warnings = compare(results, baseline)
+    for warning in warnings:
+        print(f"WARNING {warning}")
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import gi
+
+gi.require_version('Gtk', '4.0')
+gi.require_version('GdkPixbuf', '2.0')
+
+from gi.repository import GdkPixbuf
+
+# Pre-rasterises every icon at the sizes the UI uses and compiles them into
+# sys_main.gresource, so the app decodes PNG textures instead of parsing SVGs.
+# Run once after changing icons:  python build_assets.py
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+
+from assets import APP_ICON_SIZES, APP_ICON_SOURCE, ASSETS, BUNDLE_PATH, RESOURCE_PREFIX, SCALES, APP_ICON_NAME, texture_resource_path
+
+
+def rasterise(source, size, destination):
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(source, size, size)
+    pixbuf.savev(destination, "png", [], [])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as build_dir:
+        files = []
+        for name, sizes in ASSETS.items():
+            for size in sizes:
+                for scale in SCALES:
+                    alias = texture_resource_path(name, size, scale)[len(RESOURCE_PREFIX) + 1:]
+                    destination = os.path.join(build_dir, alias)
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    rasterise(os.path.join(APP_DIR, name), size * scale, destination)
+                    files.append(alias)
+
+        for size in APP_ICON_SIZES:
+            alias = f"icons/{size}x{size}/apps/{APP_ICON_NAME}.png"
+            destination = os.path.join(build_dir, alias)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            rasterise(os.path.join(APP_DIR, APP_ICON_SOURCE), size, destination)
+            files.append(alias)
+
+        manifest = os.path.join(build_dir, "sys_main.gresource.xml")
+        with open(manifest, "w") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<gresources>\n')
+            f.write(f'  <gresource prefix="{RESOURCE_PREFIX}">\n')
+            for alias in files:
+                # PNGs are already compressed; storing them raw keeps loads zero-copy
+                f.write(f'    <file>{alias}</file>\n')
+            f.write('  </gresource>\n</gresources>\n')
+
+        try:
+            subprocess.run(["glib-compile-resources", "--sourcedir", build_dir, "--target", BUNDLE_PATH, manifest], check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Failed to compile asset bundle: {e}")
+            return 1
+
+    print(f"Wrote {BUNDLE_PATH} with {len(files)} textures")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+
+# External tools the app may call; resolved once per PATH/binary change
+TOOLS = (
+    "sudo", "pkexec",
+    "asusctl",
+    "pactl", "amixer",
+    "pacman", "checkupdates", "yay", "paru", "apt", "apt-get", "dnf",
+    "swapoff", "swapon", "nice", "ionice",
+)
+
+CACHE_VERSION = 1
+
+
+def default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "sys_main", "capabilities.json")
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def detect_backends():
+    # Runtime services: checked by socket presence, never cached
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    return {
+        "pipewire": os.path.exists(os.path.join(runtime_dir, "pipewire-0")),
+        "pulse": os.path.exists(os.path.join(runtime_dir, "pulse", "native")),
+        "hwmon": os.path.isdir("/sys/class/hwmon"),
+        "systemd": os.path.isdir("/run/systemd/system"),
+    }
+
+
+class Capabilities:
+    def __init__(self, tools=TOOLS, path=None, cache_path=None):
+        self.tool_names = tuple(tools)
+        self.path = os.environ.get("PATH", os.defpath) if path is None else path
+        self.cache_path = cache_path or default_cache_path()
+        self.tools = {}
+        self.backends = {}
+        self.from_cache = False
+
+    def path_entries(self):
+        return [entry for entry in self.path.split(os.pathsep) if entry]
+
+    def cache_key(self, tools):
+        # A PATH directory's mtime changes when a binary is added or removed;
+        # a binary's mtime changes when it is upgraded in place.
+        return {
+            "version": CACHE_VERSION,
+            "path": [[entry, _mtime(entry)] for entry in self.path_entries()],
+            "binaries": {name: _mtime(location) for name, location in sorted(tools.items()) if location},
+        }
+
+    def load(self):
+        cached = self._read_cache()
+        if cached and set(cached["tools"]) == set(self.tool_names) and cached["key"] == self.cache_key(cached["tools"]):
+            self.tools = cached["tools"]
+            self.from_cache = True
+        else:
+            self.resolve()
+            self._write_cache()
+        self.backends = detect_backends()
+        return self
+
+    def resolve(self):
+        self.tools = {name: shutil.which(name, path=self.path) for name in self.tool_names}
+        self.from_cache = False
+
+    def has(self, name):
+        return self.tools.get(name) is not None
+
+    def which(self, name):
+        return self.tools.get(name)
+
+    def backend(self, name):
+        return self.backends.get(name, False)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"key": self.cache_key(self.tools), "tools": self.tools}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Failed to write capability cache: {e}")
+
+
+_capabilities = None
+
+
+def get_capabilities():
+    global _capabilities
+    if _capabilities is None:
+        _capabilities = Capabilities().load()
+    return _capabilities
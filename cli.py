@@ -0,0 +1,267 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Headless entry point: never imports gi/Gtk. Each subcommand imports only
+# the modules it needs so `sys-main status` starts in a few tens of ms.
+
+
+def get_helper(dry_run):
+    from privhelper import HelperClient, LocalHelper
+
+    if dry_run or os.geteuid() == 0:
+        return LocalHelper(dry_run=dry_run)
+    from capabilities import get_capabilities
+    return HelperClient().start(use_pkexec=get_capabilities().has("pkexec") and not sys.stdin.isatty())
+
+
+def run_user_command(args):
+    subprocess.run(args, check=True)
+
+
+def execute(steps, dry_run, quiet=False):
+    import maintenance
+
+    if not steps:
+        if not quiet:
+            print("Nothing to do")
+        return 0
+    if dry_run:
+        for line in maintenance.describe_steps(steps):
+            print(line)
+        return 0
+
+    helper = None
+    if any(kind == "privileged" for kind, _ in steps):
+        helper = get_helper(dry_run)
+    try:
+        maintenance.run_steps(steps, helper, run_user_command)
+    finally:
+        if helper is not None:
+            helper.close()
+    return 0
+
+
+def cmd_status(args):
+    from maintenance import system_status
+
+    status = system_status()
+    if args.json:
+        import json
+        json.dump(status, sys.stdout, indent=2)
+        print()
+        return 0
+
+    battery = status["battery"]
+    if battery:
+        charging = " (charging)" if battery["power_plugged"] else ""
+        print(f"Battery:       {battery['percent']}%{charging}")
+    print(f"Power profile: {status['power_profile'] or 'unknown'}")
+    print(f"Load average:  {' '.join(f'{load:.2f}' for load in status['load_average'])}")
+    print(f"Memory:        {status['memory']['percent']}% used, {status['memory']['available'] // (1024 ** 2)} MB available")
+    print(f"Disk (/):      {status['disk']['percent']}% used, {status['disk']['free'] // (1024 ** 3)} GB free")
+    for key, value in status["sensors"].items():
+        if value is not None:
+            print(f"{key + ':':<15}{value}")
+    return 0
+
+
+def cmd_update(args):
+    import maintenance
+    import updates
+    from capabilities import get_capabilities
+
+    family = maintenance.distro_family()
+    if family is None:
+        print("Unsupported distribution", file=sys.stderr)
+        return 1
+    # Refreshing package lists only changes metadata, never installed packages
+    if not args.dry_run and execute(updates.refresh_steps(family), False, quiet=True):
+        return 1
+
+    plan = updates.plan_updates(family, get_capabilities())
+    if not updates.has_updates(plan):
+        print("The system is up to date")
+        return 0
+    for line in updates.format_plan(plan):
+        print(line)
+    if not args.dry_run and not args.yes:
+        if not sys.stdin.isatty() or input("Proceed with the update? [y/N] ").strip().lower() not in ("y", "yes"):
+            print("Update cancelled")
+            return 1
+    return execute(updates.plan_steps(plan), args.dry_run)
+
+
+def clean_cache_steps(keep):
+    import maintenance
+    import pkgcache
+    from updates import format_size
+
+    plan = pkgcache.analyse(pkgcache.KEEP_VERSIONS if keep is None else keep)
+    print(f"{len(plan.remove)} of {len(plan.remove) + len(plan.keep)} cached packages can be removed ({format_size(plan.reclaimable)})")
+    return maintenance.clean_cache_steps(plan)
+
+
+def clean_orphans_steps():
+    import maintenance
+    import pacmandb
+    from updates import format_size
+
+    graph = pacmandb.load_graph()
+    orphans = maintenance.list_orphans(graph)
+    for name in orphans:
+        print(f"{name} {graph.packages[name].version}")
+    print(f"{len(orphans)} orphan packages, {format_size(graph.removal_size(orphans))} installed size")
+    return maintenance.clean_orphans_steps(orphans)
+
+
+def clean_tmp_steps():
+    import maintenance
+    from tmpclean import TempCleaner
+    from updates import format_size
+
+    cleaner = TempCleaner()
+    report = cleaner.scan()
+    print(f"{report.files} old files ({format_size(report.bytes)}) can be removed; {report.open} open and {report.recent} recent files are kept")
+    return maintenance.clean_tmp_steps(cleaner) if report.files or report.directories else []
+
+
+def clean_swap_steps(drop_caches):
+    import maintenance
+    import swap
+
+    if drop_caches:
+        return maintenance.drop_caches_steps()
+    plan = swap.plan_reclaim()
+    for device in plan.devices:
+        print(f"{device.path}: {device.used // 1024} MiB in use, priority {device.priority}")
+    for warning in plan.warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    if plan.skipped and not plan.devices:
+        print("Swap does not fit in free memory; try --drop-caches", file=sys.stderr)
+    return maintenance.clean_swap_steps(plan)
+
+
+def cmd_clean(args):
+    if args.target == "orphans":
+        import maintenance
+        if maintenance.distro_family() != "arch":
+            print("Orphan removal needs pacman; this is not an Arch-based system", file=sys.stderr)
+            return 1
+    steps = {
+        "cache": lambda: clean_cache_steps(args.keep),
+        "orphans": clean_orphans_steps,
+        "swap": lambda: clean_swap_steps(args.drop_caches),
+        "tmp": clean_tmp_steps,
+    }[args.target]()
+    return execute(steps, args.dry_run)
+
+
+def cmd_power_profile(args):
+    import maintenance
+
+    if args.profile is None:
+        profile = maintenance.get_active_power_profile()
+        if profile is None:
+            return 1
+        print(profile)
+        return 0
+    maintenance.set_power_profile(args.profile)
+    return 0
+
+
+def cmd_schedule(args):
+    import time
+    from scheduler import CHECK_INTERVAL, Scheduler, check
+
+    helper = None
+    if args.daemon:
+        # Authenticated once at startup: root needs no password, a terminal
+        # gets sudo's prompt. Otherwise tasks with privileged steps wait.
+        if os.geteuid() == 0 or sys.stdin.isatty():
+            from privhelper import HelperError
+            try:
+                helper = get_helper(False)
+            except (HelperError, OSError) as e:
+                print(f"Failed to start the privileged helper: {e}", file=sys.stderr)
+        if helper is None:
+            print("Tasks with privileged steps will wait; start the daemon as root or from a terminal to run them",
+                  file=sys.stderr)
+    scheduler = Scheduler(helper=lambda: helper, helper_hint="restart the daemon as root or from a terminal").load()
+    if args.run_now:
+        for name in scheduler.tasks:
+            scheduler.enqueue(name)
+    if not args.daemon:
+        # Only reports; the daemon or the GUI queues due tasks
+        for name, task in scheduler.tasks.items():
+            last = scheduler.last_run.get(name)
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(last["time"])) + f" ({last['status']})" if last else "never"
+            print(f"{name + ':':<18}{task.description}, last run {when}")
+        waiting = [entry["name"] for entry in scheduler.queue]
+        waiting += [name for name in scheduler.due() if name not in waiting]
+        conditions = check(scheduler.probe)
+        print(f"Waiting to run: {', '.join(waiting)}" if waiting else "No maintenance due")
+        print("Conditions:    " + ("ok" if conditions.ok else ", ".join(conditions.reasons)))
+        return 0
+    try:
+        while True:
+            scheduler.tick()
+            time.sleep(CHECK_INTERVAL)
+    finally:
+        scheduler.interrupt()
+        if helper is not None:
+            helper.close()
+
+
+def build_parser():
+    from maintenance import POWER_PROFILES
+
+    parser = argparse.ArgumentParser(prog="sys-main", description="System maintenance without the GUI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status = subparsers.add_parser("status", help="show battery, power, memory, disk and sensor status")
+    status.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    status.set_defaults(func=cmd_status)
+
+    update = subparsers.add_parser("update", help="upgrade system packages")
+    update.add_argument("--dry-run", action="store_true", help="only print what would be done")
+    update.add_argument("-y", "--yes", action="store_true", help="do not ask for confirmation")
+    update.set_defaults(func=cmd_update)
+
+    clean = subparsers.add_parser("clean", help="clean caches, orphans, swap or /tmp")
+    clean.add_argument("target", choices=["cache", "orphans", "swap", "tmp"])
+    clean.add_argument("--dry-run", action="store_true", help="only print what would be done")
+    # None means pkgcache.KEEP_VERSIONS, resolved in clean_cache_steps so the parser does not import pkgcache
+    clean.add_argument("--keep", type=int, metavar="N", help="cached versions to keep per package (cache only; defaults to the GUI's setting)")
+    clean.add_argument("--drop-caches", action="store_true", help="drop clean page cache instead of cycling swap (swap only)")
+    clean.set_defaults(func=cmd_clean)
+
+    power = subparsers.add_parser("power-profile", help="get or set the power profile")
+    power.add_argument("profile", nargs="?", choices=POWER_PROFILES)
+    power.set_defaults(func=cmd_power_profile)
+
+    schedule = subparsers.add_parser("schedule", help="show or run idle-time background maintenance")
+    schedule.add_argument("--daemon", action="store_true", help="keep running and start due tasks when the machine is idle")
+    schedule.add_argument("--run-now", action="store_true", help="queue every task regardless of when it last ran")
+    schedule.set_defaults(func=cmd_schedule)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+    except subprocess.CalledProcessError as e:
+        print(f"Failed: {e}", file=sys.stderr)
+        return e.returncode or 1
+    except Exception as e:
+        print(f"Failed: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+from collections import namedtuple
+
+# One shared system-bus connection for the quick controls: power profiles
+# (power-profiles-daemon), Wi-Fi and mobile radios (NetworkManager) and
+# Bluetooth (BlueZ). State is read from D-Bus properties and kept current
+# through PropertiesChanged, so a toggle is a single Set call and never
+# forks a CLI tool. Gio honours DBUS_SYSTEM_BUS_ADDRESS, so the client can
+# run against dbusmock services; bus="session" uses the session bus instead.
+
+PROPERTIES = "org.freedesktop.DBus.Properties"
+OBJECT_MANAGER = "org.freedesktop.DBus.ObjectManager"
+CALL_TIMEOUT = 5000  # ms
+
+# signature is the D-Bus type of the value
+Property = namedtuple("Property", ["service", "path", "interface", "name", "signature"])
+
+POWER_PROFILE = Property("net.hadess.PowerProfiles", "/net/hadess/PowerProfiles", "net.hadess.PowerProfiles", "ActiveProfile", "s")
+WIFI = Property("org.freedesktop.NetworkManager", "/org/freedesktop/NetworkManager", "org.freedesktop.NetworkManager", "WirelessEnabled", "b")
+WWAN = Property("org.freedesktop.NetworkManager", "/org/freedesktop/NetworkManager", "org.freedesktop.NetworkManager", "WwanEnabled", "b")
+BLUEZ = "org.bluez"
+BLUEZ_ADAPTER = "org.bluez.Adapter1"
+
+# What `nmcli radio all` switches
+AIRPLANE_RADIOS = (WIFI, WWAN)
+
+
+class ControlError(Exception):
+    pass
+
+
+class ControlClient:
+    # Methods taking callback=None block and return the value (CLI); with a
+    # callback they return at once and call callback(value, error) from the
+    # main loop, where error is None or a message.
+    def __init__(self, bus="system"):
+        self.bus = bus
+        self._connection = None
+        self._bluetooth = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            from gi.repository import Gio, GLib
+
+            bus_type = Gio.BusType.SESSION if self.bus == "session" else Gio.BusType.SYSTEM
+            try:
+                self._connection = Gio.bus_get_sync(bus_type, None)
+            except GLib.Error as e:
+                raise ControlError(f"Cannot connect to the {self.bus} bus: {e.message}") from e
+        return self._connection
+
+    def _call(self, service, path, interface, method, parameters, reply_type, callback, unpack):
+        from gi.repository import Gio, GLib
+
+        reply_type = GLib.VariantType.new(reply_type) if reply_type else None
+        if callback is None:
+            try:
+                reply = self.connection.call_sync(service, path, interface, method, parameters, reply_type,
+                                                  Gio.DBusCallFlags.NONE, CALL_TIMEOUT, None)
+            except GLib.Error as e:
+                raise ControlError(f"{service}.{method}: {e.message}") from e
+            return unpack(reply)
+
+        def on_reply(connection, result):
+            try:
+                reply = connection.call_finish(result)
+            except GLib.Error as e:
+                callback(None, f"{service}.{method}: {e.message}")
+                return
+            callback(unpack(reply), None)
+
+        try:
+            connection = self.connection
+        except ControlError as e:
+            callback(None, str(e))
+            return None
+        connection.call(service, path, interface, method, parameters, reply_type,
+                        Gio.DBusCallFlags.NONE, CALL_TIMEOUT, None, on_reply)
+        return None
+
+    def get(self, prop, callback=None):
+        from gi.repository import GLib
+
+        return self._call(prop.service, prop.path, PROPERTIES, "Get", GLib.Variant("(ss)", (prop.interface, prop.name)),
+                          "(v)", callback, lambda reply: reply.unpack()[0])
+
+    def set(self, prop, value, callback=None):
+        from gi.repository import GLib
+
+        parameters = GLib.Variant("(ssv)", (prop.interface, prop.name, GLib.Variant(prop.signature, value)))
+        return self._call(prop.service, prop.path, PROPERTIES, "Set", parameters, None, callback, lambda reply: value)
+
+    def watch(self, prop, on_change):
+        # on_change(value) now (once Get answers) and on every change; returns
+        # an id for unwatch()
+        from gi.repository import Gio
+
+        def on_signal(connection, sender, path, interface, signal, parameters):
+            interface_name, changed, invalidated = parameters.unpack()
+            if interface_name != prop.interface:
+                return
+            if prop.name in changed:
+                on_change(changed[prop.name])
+            elif prop.name in invalidated:
+                self.get(prop, lambda value, error: error is None and on_change(value))
+
+        subscription = self.connection.signal_subscribe(
+            prop.service, PROPERTIES, "PropertiesChanged", prop.path, prop.interface,
+            Gio.DBusSignalFlags.NONE, on_signal)
+        self.get(prop, lambda value, error: on_change(value) if error is None else print(f"Failed to read {prop.name}: {error}"))
+        return subscription
+
+    def unwatch(self, subscription):
+        self.connection.signal_unsubscribe(subscription)
+
+    def bluetooth(self, callback=None):
+        # The Powered property of the first BlueZ adapter, or None without one
+        if self._bluetooth is not None:
+            if callback is None:
+                return self._bluetooth
+            callback(self._bluetooth, None)
+            return None
+
+        def find_adapter(reply):
+            objects = reply.unpack()[0]
+            paths = sorted(path for path, interfaces in objects.items() if BLUEZ_ADAPTER in interfaces)
+            if paths:
+                self._bluetooth = Property(BLUEZ, paths[0], BLUEZ_ADAPTER, "Powered", "b")
+            return self._bluetooth
+
+        return self._call(BLUEZ, "/", OBJECT_MANAGER, "GetManagedObjects", None, "(a{oa{sa{sv}}})", callback, find_adapter)
+
+    def close(self):
+        self._connection = None
+        self._bluetooth = None
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = ControlClient()
+    return _client
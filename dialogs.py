@@ -0,0 +1,303 @@
+import threading
+
+from gi.repository import Gdk, Gtk, GLib
+
+# Seconds an info banner stays visible; errors stay until dismissed
+INFO_TIMEOUT = 5
+
+_window = None
+_revealer = None
+_title_label = None
+_message_label = None
+_hide_source = None
+_pending = []
+
+
+def create_banner(window):
+    global _window, _revealer, _title_label, _message_label
+    _window = window
+
+    box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+    box.set_margin_start(20)
+    box.set_margin_end(20)
+    box.set_margin_top(10)
+
+    text_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+    text_box.set_hexpand(True)
+    _title_label = Gtk.Label()
+    _title_label.set_halign(Gtk.Align.START)
+    _title_label.add_css_class("heading")
+    _message_label = Gtk.Label()
+    _message_label.set_halign(Gtk.Align.START)
+    _message_label.set_wrap(True)
+    _message_label.set_selectable(True)
+    text_box.append(_title_label)
+    text_box.append(_message_label)
+
+    close_button = Gtk.Button(label="✕")
+    close_button.set_valign(Gtk.Align.START)
+    close_button.connect("clicked", lambda _: _hide())
+
+    box.append(text_box)
+    box.append(close_button)
+
+    _revealer = Gtk.Revealer()
+    _revealer.set_transition_type(Gtk.RevealerTransitionType.SLIDE_DOWN)
+    _revealer.set_child(box)
+
+    for kind, title, message in _pending:
+        _show(kind, title, message)
+    _pending.clear()
+
+    return _revealer
+
+
+def _hide():
+    global _hide_source
+    if _hide_source is not None:
+        GLib.source_remove(_hide_source)
+        _hide_source = None
+    _revealer.set_reveal_child(False)
+    return False
+
+
+def _show(kind, title, message):
+    global _hide_source
+    if _revealer is None:
+        # Window not built yet; shown as soon as the banner exists
+        _pending.append((kind, title, message))
+        return False
+
+    _title_label.set_text(title)
+    _message_label.set_text(message)
+    if kind == "error":
+        _title_label.add_css_class("error")
+    else:
+        _title_label.remove_css_class("error")
+    _revealer.set_reveal_child(True)
+
+    if _hide_source is not None:
+        GLib.source_remove(_hide_source)
+        _hide_source = None
+    if kind != "error":
+        def on_timeout():
+            global _hide_source
+            _hide_source = None
+            _revealer.set_reveal_child(False)
+            return False
+        _hide_source = GLib.timeout_add_seconds(INFO_TIMEOUT, on_timeout)
+    return False
+
+
+def notify(kind, title, message):
+    # Safe to call from worker threads
+    print(f"{title}: {message}")
+    GLib.idle_add(_show, kind, title, message)
+
+
+def info(title, message):
+    notify("info", title, message)
+
+
+def error(title, message):
+    notify("error", title, message)
+
+
+def _dialog_window(title, message):
+    dialog = Gtk.Window(title=title, modal=True, resizable=False)
+    if _window is not None:
+        dialog.set_transient_for(_window)
+
+    box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+    box.set_margin_start(20)
+    box.set_margin_end(20)
+    box.set_margin_top(20)
+    box.set_margin_bottom(20)
+    label = Gtk.Label(label=message)
+    label.set_wrap(True)
+    label.set_max_width_chars(50)
+    box.append(label)
+    dialog.set_child(box)
+
+    buttons = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+    buttons.set_halign(Gtk.Align.END)
+    return dialog, box, buttons
+
+
+def confirm(title, message, callback, accept_label="Continue", details=None):
+    dialog, box, buttons = _dialog_window(title, message)
+    answered = False
+
+    if details:
+        # Long lists (e.g. the packages of an update) scroll instead of growing the dialog
+        view = Gtk.TextView()
+        view.get_buffer().set_text(details)
+        view.set_editable(False)
+        view.set_cursor_visible(False)
+        view.set_monospace(True)
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_child(view)
+        scrolled_window.set_min_content_width(480)
+        scrolled_window.set_min_content_height(240)
+        box.append(scrolled_window)
+
+    def finish(result):
+        nonlocal answered
+        if answered:
+            return
+        answered = True
+        dialog.destroy()
+        callback(result)
+
+    cancel_button = Gtk.Button(label="Cancel")
+    cancel_button.connect("clicked", lambda _: finish(False))
+    accept_button = Gtk.Button(label=accept_label)
+    accept_button.add_css_class("destructive-action")
+    accept_button.connect("clicked", lambda _: finish(True))
+    buttons.append(cancel_button)
+    buttons.append(accept_button)
+    box.append(buttons)
+
+    dialog.connect("close-request", lambda _: finish(False) or True)
+    dialog.present()
+
+
+def ask_password(title, message, callback):
+    dialog, box, buttons = _dialog_window(title, message)
+    answered = False
+
+    entry = Gtk.PasswordEntry()
+    entry.set_show_peek_icon(True)
+    box.append(entry)
+
+    def finish(password):
+        nonlocal answered
+        if answered:
+            return
+        answered = True
+        dialog.destroy()
+        callback(password)
+
+    cancel_button = Gtk.Button(label="Cancel")
+    cancel_button.connect("clicked", lambda _: finish(None))
+    ok_button = Gtk.Button(label="Authenticate")
+    ok_button.add_css_class("suggested-action")
+    ok_button.connect("clicked", lambda _: finish(entry.get_text()))
+    entry.connect("activate", lambda _: finish(entry.get_text()))
+    buttons.append(cancel_button)
+    buttons.append(ok_button)
+    box.append(buttons)
+
+    dialog.connect("close-request", lambda _: finish(None) or True)
+    dialog.present()
+    entry.grab_focus()
+
+
+def _wait_for_answer(show_dialog, *args, **kwargs):
+    # For job threads: shows the dialog on the main loop and waits for the answer
+    if threading.current_thread() is threading.main_thread():
+        raise RuntimeError("blocking dialogs would deadlock the main loop")
+
+    done = threading.Event()
+    result = []
+
+    def on_answer(answer):
+        result.append(answer)
+        done.set()
+
+    def show():
+        show_dialog(*args, callback=on_answer, **kwargs)
+        return False
+
+    GLib.idle_add(show)
+    done.wait()
+    return result[0]
+
+
+def ask_password_blocking(title, message):
+    return _wait_for_answer(ask_password, title, message)
+
+
+def confirm_blocking(title, message, accept_label="Continue", details=None):
+    return _wait_for_answer(confirm, title, message, accept_label=accept_label, details=details)
+
+
+def show_text(title, text, width=600, height=400):
+    window = Gtk.Window(title=title)
+    window.set_default_size(width, height)
+    if _window is not None:
+        window.set_transient_for(_window)
+
+    buffer = Gtk.TextBuffer()
+    buffer.set_text(text)
+    view = Gtk.TextView(buffer=buffer)
+    view.set_editable(False)
+    view.set_cursor_visible(False)
+    view.set_monospace(True)
+    view.set_left_margin(10)
+    view.set_top_margin(10)
+
+    scrolled_window = Gtk.ScrolledWindow()
+    scrolled_window.set_child(view)
+    window.set_child(scrolled_window)
+    window.present()
+    return window
+
+
+def create_facts_window(title, to_text):
+    # A label/value grid kept for reuse: hidden on close, and
+    # show_rows([(label, value), ...]) updates it in place. The Copy button
+    # puts to_text(rows) on the clipboard.
+    window = Gtk.Window(title=title)
+    window.set_default_size(520, -1)
+    window.set_hide_on_close(True)
+    if _window is not None:
+        window.set_transient_for(_window)
+
+    box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+    box.set_margin_start(20)
+    box.set_margin_end(20)
+    box.set_margin_top(20)
+    box.set_margin_bottom(20)
+    grid = Gtk.Grid()
+    grid.set_column_spacing(16)
+    grid.set_row_spacing(6)
+    box.append(grid)
+
+    copy_button = Gtk.Button(label="Copy")
+    copy_button.set_halign(Gtk.Align.END)
+    box.append(copy_button)
+    window.set_child(box)
+
+    rows = []
+    labels = {}
+
+    def show_rows(new_rows):
+        rows[:] = new_rows
+        shown = dict(new_rows)
+        # Rows stay in the grid once added; facts that went away (swap
+        # switched off) are hidden instead
+        for label, (key_label, value_label) in labels.items():
+            key_label.set_visible(label in shown)
+            value_label.set_visible(label in shown)
+        for label, value in new_rows:
+            if label not in labels:
+                key_label = Gtk.Label(label=label)
+                key_label.set_halign(Gtk.Align.END)
+                key_label.set_valign(Gtk.Align.START)
+                key_label.add_css_class("dim-label")
+                value_label = Gtk.Label()
+                value_label.set_halign(Gtk.Align.START)
+                value_label.set_xalign(0)
+                value_label.set_wrap(True)
+                value_label.set_selectable(True)
+                grid.attach(key_label, 0, len(labels), 1, 1)
+                grid.attach(value_label, 1, len(labels), 1, 1)
+                labels[label] = (key_label, value_label)
+            labels[label][1].set_text(value)
+
+    def copy(_):
+        window.get_clipboard().set_content(Gdk.ContentProvider.new_for_value(to_text(rows)))
+
+    copy_button.connect("clicked", copy)
+    return window, show_rows
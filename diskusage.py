@@ -0,0 +1,195 @@
+import hashlib
+import marshal
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Disk usage crawler. Only per-directory aggregates are kept (never one
+# object per file), so memory grows with the number of directories, and
+# MAX_DIRECTORIES caps even that: past it, whole subtrees are summed without
+# being indexed. The index is saved with marshal; on the next scan a
+# directory whose mtime is unchanged is not listed again, only stat'ed.
+# Its entries are then the same, but file sizes come from the index, so
+# files that grew in place show up after that directory next changes.
+
+INDEX_VERSION = 1
+SCAN_WORKERS = 8
+MAX_DIRECTORIES = 500000
+
+# path -> (mtime_ns, own_bytes, own_files, subdirectory names, collapsed_bytes)
+MTIME, OWN_BYTES, OWN_FILES, SUBDIRS, COLLAPSED = range(5)
+
+
+def default_index_path(root):
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    digest = hashlib.sha1(os.fsencode(root)).hexdigest()[:16]
+    return os.path.join(cache_home, "sys_main", f"diskusage-{digest}.marshal")
+
+
+def _entry_bytes(stat_result):
+    # Allocated size, so sparse files and small files are counted like du does
+    return stat_result.st_blocks * 512
+
+
+def _list_directory(path, device):
+    own_bytes = 0
+    own_files = 0
+    subdirectories = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.stat(follow_symlinks=False).st_dev == device:
+                            subdirectories.append(entry.name)
+                    else:
+                        own_bytes += _entry_bytes(entry.stat(follow_symlinks=False))
+                        own_files += 1
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return own_bytes, own_files, tuple(subdirectories)
+
+
+class DiskUsageIndex:
+    def __init__(self, root, index_path=None, max_directories=MAX_DIRECTORIES):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or default_index_path(self.root)
+        self.max_directories = max_directories
+        self.records = {}
+        self.totals = {}
+        self.scanned = 0
+        self.reused = 0
+        self.finished = False
+        self._previous = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def load(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return False
+        self._previous = data["records"]
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "wb") as f:
+            marshal.dump({"version": INDEX_VERSION, "root": self.root, "records": self.records}, f)
+        os.replace(temporary, self.index_path)
+
+    def stop(self):
+        self._stop.set()
+
+    def scan(self, workers=SCAN_WORKERS, on_progress=None):
+        # Blocking; run it off the main loop. Readers may call children() and
+        # total() at any time and see the totals found so far.
+        self._stop.clear()
+        self.finished = False
+        self.records = {}
+        self.totals = {}
+        self.scanned = 0
+        self.reused = 0
+        try:
+            device = os.stat(self.root).st_dev
+        except OSError:
+            return False
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(self._visit, self.root, device): (self._visit, self.root)}
+            while pending and not self._stop.is_set():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, path = pending.pop(future)
+                    if kind == self._collapse:
+                        self._add_collapsed(os.path.dirname(path), future.result())
+                        continue
+                    record, reused = future.result()
+                    if record is None:
+                        continue
+                    # Counted here rather than in the workers, which run concurrently
+                    if reused:
+                        self.reused += 1
+                    else:
+                        self.scanned += 1
+                    self._add(path, record)
+                    # Over budget: sum the remaining subtrees without indexing them
+                    task = self._visit if len(self.records) < self.max_directories else self._collapse
+                    for name in record[SUBDIRS]:
+                        child = os.path.join(path, name)
+                        pending[pool.submit(task, child, device)] = (task, child)
+                if on_progress is not None:
+                    on_progress(self)
+            for future in pending:
+                future.cancel()
+
+        self.finished = not self._stop.is_set()
+        if self.finished:
+            self._previous = self.records
+        return self.finished
+
+    def _visit(self, path, device):
+        # Returns (record, whether it was reused from the previous scan)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None, False
+        previous = self._previous.get(path)
+        if previous is not None and previous[MTIME] == mtime:
+            return (mtime, previous[OWN_BYTES], previous[OWN_FILES], previous[SUBDIRS], 0), True
+        own_bytes, own_files, subdirectories = _list_directory(path, device)
+        return (mtime, own_bytes, own_files, subdirectories, 0), False
+
+    def _collapse(self, path, device):
+        total = 0
+        stack = [path]
+        while stack and not self._stop.is_set():
+            directory = stack.pop()
+            own_bytes, _, subdirectories = _list_directory(directory, device)
+            total += own_bytes
+            stack.extend(os.path.join(directory, name) for name in subdirectories)
+        return total
+
+    def _add(self, path, record):
+        with self._lock:
+            self.records[path] = record
+            self._propagate(path, record[OWN_BYTES])
+
+    def _add_collapsed(self, parent, size):
+        with self._lock:
+            record = self.records[parent]
+            self.records[parent] = record[:COLLAPSED] + (record[COLLAPSED] + size,)
+            self._propagate(parent, size)
+
+    def _propagate(self, path, size):
+        # Every ancestor is updated so partial totals are always current
+        while True:
+            self.totals[path] = self.totals.get(path, 0) + size
+            if path == self.root:
+                break
+            path = os.path.dirname(path)
+
+    def total(self, path=None):
+        return self.totals.get(path or self.root, 0)
+
+    def children(self, path=None, limit=None):
+        # [(name, bytes, is_directory)], largest first; files of the directory
+        # are folded into one "(files)" row
+        path = path or self.root
+        with self._lock:
+            record = self.records.get(path)
+            if record is None:
+                return []
+            rows = [(name, self.totals.get(os.path.join(path, name), 0), True) for name in record[SUBDIRS]]
+            if record[OWN_FILES]:
+                rows.append((f"({record[OWN_FILES]} files)", record[OWN_BYTES], False))
+            if record[COLLAPSED]:
+                rows.append(("(not indexed)", record[COLLAPSED], False))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit] if limit else rows
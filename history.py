@@ -0,0 +1,109 @@
+import math
+from array import array
+
+# (resolution in seconds, number of slots): 10 minutes of raw samples,
+# one hour at 10 s and one day at 1 min. Memory is fixed at startup.
+TIERS = ((1, 600), (10, 360), (60, 1440))
+
+METRICS = {
+    "cpu_percent": lambda s: s.cpu_percent,
+    "memory_percent": lambda s: s.memory_percent,
+    "disk_percent": lambda s: s.disk_percent,
+    "battery_percent": lambda s: s.battery_percent,
+    "cpu_temp": lambda s: s.sensors.cpu_temp,
+    "gpu_temp": lambda s: s.sensors.gpu_temp,
+    "cpu_fan": lambda s: s.sensors.cpu_fan,
+    "gpu_fan": lambda s: s.sensors.gpu_fan,
+}
+
+
+class RingBuffer:
+    # Fixed-size, array-backed buffer of (time, value) pairs; the oldest
+    # sample is overwritten once it is full.
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, value):
+        index = (self.start + self.count) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def oldest(self):
+        if not self.count:
+            return None
+        return self.times[self.start], self.values[self.start]
+
+    def latest(self):
+        if not self.count:
+            return None
+        index = (self.start + self.count - 1) % self.capacity
+        return self.times[index], self.values[index]
+
+    def items(self, last=None):
+        # Oldest first; `last` limits the result to the newest n samples
+        n = self.count if last is None else min(last, self.count)
+        first = self.start + self.count - n
+        return [(self.times[i % self.capacity], self.values[i % self.capacity]) for i in range(first, first + n)]
+
+
+class MetricHistory:
+    # Raw samples go into the finest tier; each coarser tier stores the mean
+    # of every completed bucket of its resolution.
+    def __init__(self, tiers=TIERS):
+        self.resolutions = [resolution for resolution, _ in tiers]
+        self.tiers = [RingBuffer(capacity) for _, capacity in tiers]
+        self._buckets = [None] * len(tiers)
+        self._sums = [0.0] * len(tiers)
+        self._counts = [0] * len(tiers)
+
+    def add(self, timestamp, value):
+        self.tiers[0].append(timestamp, value)
+        for i in range(1, len(self.tiers)):
+            resolution = self.resolutions[i]
+            bucket = math.floor(timestamp / resolution)
+            if self._buckets[i] is not None and bucket != self._buckets[i]:
+                self.tiers[i].append(self._buckets[i] * resolution, self._sums[i] / self._counts[i])
+                self._sums[i] = 0.0
+                self._counts[i] = 0
+            self._buckets[i] = bucket
+            self._sums[i] += value
+            self._counts[i] += 1
+
+    def series(self, seconds, now):
+        # Finest tier that still covers the requested window; a tier that has
+        # not wrapped yet holds everything since startup
+        since = now - seconds
+        for tier in self.tiers:
+            oldest = tier.oldest()
+            if tier.count < tier.capacity or (oldest is not None and oldest[0] <= since):
+                return [item for item in tier.items() if item[0] >= since]
+        return [item for item in self.tiers[-1].items() if item[0] >= since]
+
+    def latest(self):
+        return self.tiers[0].latest()
+
+
+class HistoryStore:
+    def __init__(self, metrics=METRICS, tiers=TIERS):
+        self.getters = dict(metrics)
+        self.metrics = {name: MetricHistory(tiers) for name in metrics}
+
+    def record(self, snapshot):
+        for name, getter in self.getters.items():
+            value = getter(snapshot)
+            if value is not None:
+                self.metrics[name].add(snapshot.time, float(value))
+
+    def __getitem__(self, name):
+        return self.metrics[name]
@@ -0,0 +1,171 @@
+import os
+import queue
+import signal
+import subprocess
+import threading
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name, func, runner, steps=1):
+        self.name = name
+        self.func = func
+        self.runner = runner
+        self.steps = steps
+        self.done_steps = 0
+        self.status = "queued"
+        self._cancelled = threading.Event()
+        self._proc = None
+        self._lock = threading.Lock()
+        self._cancel_callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def on_cancel(self, callback):
+        # For work that does not run through Job.run (e.g. the privileged helper)
+        with self._lock:
+            self._cancel_callbacks.append(callback)
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            proc = self._proc
+            callbacks = list(self._cancel_callbacks)
+        for callback in callbacks:
+            callback()
+        if proc and proc.poll() is None:
+            try:
+                # Signal the whole process group so grandchildren holding the
+                # output pipe open are stopped too
+                os.killpg(proc.pid, signal.SIGTERM)
+            except OSError as e:
+                self.log(f"Failed to stop {self.name}: {e}")
+
+    def log(self, line):
+        self.runner._emit("on_line", self, line)
+
+    def progress(self, fraction, text=None):
+        self.runner._emit("on_progress", self, fraction, text)
+
+    def run(self, args, input=None, env=None):
+        # Runs one command, streaming stdout and stderr line by line into the log
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+        self.log("$ " + " ".join(args))
+        with self._lock:
+            self._proc = subprocess.Popen(
+                args,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env=env,
+                start_new_session=True,
+            )
+            proc = self._proc
+
+        if input is not None:
+            try:
+                proc.stdin.write(input)
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        for line in proc.stdout:
+            self.log(line.rstrip("\n"))
+        returncode = proc.wait()
+
+        with self._lock:
+            self._proc = None
+
+        if self.cancelled:
+            raise JobCancelled(self.name)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args)
+
+        self.done_steps += 1
+        self.progress(min(self.done_steps / self.steps, 1.0))
+        return returncode
+
+
+class JobRunner:
+    # Runs maintenance jobs on a small worker pool so GTK callbacks return at once.
+    # Listener callbacks (on_start, on_line, on_progress, on_finish) are passed
+    # through `dispatch`, which the GUI sets to hop back onto the main loop.
+    def __init__(self, workers=2, max_queued=8, dispatch=None):
+        self.dispatch = dispatch or (lambda func, *args: func(*args))
+        self.on_start = None
+        self.on_line = None
+        self.on_progress = None
+        self.on_finish = None
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._active = {}
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+
+    def is_running(self, name):
+        with self._lock:
+            return name in self._active
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def submit(self, name, func, steps=1):
+        with self._lock:
+            if name in self._active:
+                print(f"{name} is already running")
+                return None
+            job = Job(name, func, self, steps)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                print(f"Too many jobs queued, dropping {name}")
+                return None
+            self._active[name] = job
+        return job
+
+    def cancel(self, name):
+        with self._lock:
+            job = self._active.get(name)
+        if job:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def _emit(self, listener, *args):
+        callback = getattr(self, listener)
+        if callback:
+            self.dispatch(callback, *args)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job.cancelled:
+                job.status = "cancelled"
+            else:
+                job.status = "running"
+                self._emit("on_start", job)
+                try:
+                    job.func(job)
+                    job.status = "cancelled" if job.cancelled else "done"
+                except JobCancelled:
+                    job.status = "cancelled"
+                except Exception as e:
+                    job.status = "failed"
+                    job.log(f"{job.name} failed: {e}")
+
+            with self._lock:
+                self._active.pop(job.name, None)
+            self._emit("on_finish", job)
+            self._queue.task_done()
@@ -0,0 +1,173 @@
+import os
+import sys
+
+# GTK-free maintenance logic shared by the GUI (app.py) and the CLI (cli.py).
+# A plan is a list of steps: ("privileged", [(op, args), ...]) runs one batch
+# on the privileged helper, ("user", argv) runs a command as the current user
+# and ("call", (description, func)) runs func(on_line, cancelled) in-process.
+
+PACKAGE_MANAGERS = {"arch": "pacman", "debian": "apt", "fedora": "dnf"}
+POWER_PROFILES = ("balanced", "power-saver", "performance")
+
+
+def distro_family(distro_id=None, like=None):
+    if distro_id is None:
+        import distro
+        distro_id = distro.id()
+        like = distro.like()
+    names = f"{distro_id} {like or ''}".lower()
+    if 'arch' in names or 'manjaro' in names:
+        return "arch"
+    if 'ubuntu' in names or 'debian' in names:
+        return "debian"
+    if 'fedora' in names or 'rhel' in names:
+        return "fedora"
+    return None
+
+
+def clean_cache_steps(plan=None, keep=None):
+    # Only old versions go: the newest `keep` and the installed one stay for downgrades
+    import pkgcache
+
+    if plan is None:
+        plan = pkgcache.analyse(pkgcache.KEEP_VERSIONS if keep is None else keep)
+    ops = pkgcache.prune_ops(plan)
+    return [("privileged", ops)] if ops else []
+
+
+def list_orphans(graph=None):
+    # Orphans and the dependencies only they need, from the local database
+    if graph is None:
+        import pacmandb
+        graph = pacmandb.load_graph()
+    return graph.orphan_closure()
+
+
+def clean_orphans_steps(orphans=None):
+    if orphans is None:
+        orphans = list_orphans()
+    if not orphans:
+        return []
+    return [("privileged", [("package_transaction", {"manager": "pacman", "action": "remove", "packages": orphans})])]
+
+
+def clean_swap_steps(plan=None):
+    # One device per batch, highest priority first; see swap.plan_reclaim
+    if plan is None:
+        import swap
+        plan = swap.plan_reclaim()
+    return [("privileged", [("swap_cycle", {"device": device.path})]) for device in plan.devices]
+
+
+def drop_caches_steps():
+    return [("privileged", [("drop_caches", {"level": 1})])]
+
+
+def clean_tmp_steps(cleaner=None):
+    # Runs as the invoking user: only their own files are candidates anyway
+    from tmpclean import TempCleaner
+
+    cleaner = cleaner or TempCleaner()
+
+    def clean(on_line, cancelled):
+        report = cleaner.clean(cancelled=cancelled)
+        on_line(f"Removed {report.files} files and {report.directories} folders ({report.bytes // (1024 ** 2)} MB); "
+                f"kept {report.open} open and {report.recent} recent files")
+
+    roots = ", ".join(root for root, _ in cleaner.targets)
+    return [("call", (f"remove old temporary files from {roots}", clean))]
+
+
+def describe_steps(steps):
+    lines = []
+    for kind, payload in steps:
+        if kind == "user":
+            lines.append("$ " + " ".join(payload))
+        elif kind == "call":
+            lines.append(f"# {payload[0]}")
+        else:
+            for op, args in payload:
+                details = " ".join(f"{key}={value}" for key, value in args.items() if key != "paths")
+                if "paths" in args:
+                    details += f" ({len(args['paths'])} paths)"
+                lines.append(f"# {op} {details}".rstrip())
+    return lines
+
+
+def run_steps(steps, helper, run_user, on_line=print, cancelled=lambda: False):
+    # helper: anything with batch(ops, on_line), e.g. privhelper.HelperClient
+    for kind, payload in steps:
+        if kind == "privileged":
+            helper.batch(payload, on_line)
+        elif kind == "call":
+            payload[1](on_line, cancelled)
+        else:
+            run_user(payload)
+
+
+def _powerprofilesctl(args):
+    # Without PyGObject (headless installs) the daemon's own CLI still works
+    import subprocess
+    from controls import ControlError
+
+    try:
+        result = subprocess.run(["powerprofilesctl"] + args, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ControlError(f"powerprofilesctl failed: {e}") from e
+    return result.stdout.strip()
+
+
+def get_active_power_profile():
+    from controls import POWER_PROFILE, ControlError, get_client
+
+    try:
+        try:
+            return get_client().get(POWER_PROFILE)
+        except ImportError:
+            return _powerprofilesctl(["get"])
+    except ControlError as e:
+        # stderr, so `sys-main status --json` output stays valid JSON
+        print(f"Failed to get active power profile: {e}", file=sys.stderr)
+        return None
+
+
+def set_power_profile(profile):
+    from controls import POWER_PROFILE, get_client
+
+    try:
+        get_client().set(POWER_PROFILE, profile)
+    except ImportError:
+        _powerprofilesctl(["set", profile])
+
+
+def battery_status():
+    import psutil
+
+    battery = psutil.sensors_battery()
+    if battery is None:
+        return None
+    return {"percent": int(battery.percent), "power_plugged": battery.power_plugged}
+
+
+def system_status():
+    import psutil
+    from sensors import SensorReader
+
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage("/")
+    with SensorReader() as reader:
+        sensors = reader.read()
+    return {
+        "battery": battery_status(),
+        "power_profile": get_active_power_profile(),
+        "load_average": list(os.getloadavg()),
+        "memory": {"percent": memory.percent, "available": memory.available, "total": memory.total},
+        "disk": {"percent": disk.percent, "free": disk.free, "total": disk.total},
+        "sensors": {
+            "cpu_temp": sensors.cpu_temp,
+            "gpu_temp": sensors.gpu_temp,
+            "disk_temp": sensors.disk_temp,
+            "cpu_fan": sensors.cpu_fan,
+            "gpu_fan": sensors.gpu_fan,
+        },
+    }
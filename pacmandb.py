@@ -0,0 +1,184 @@
+import marshal
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Reads pacman's local database (/var/lib/pacman/local/<name>-<version>/desc)
+# without running pacman. Parsed packages are cached on disk per entry,
+# keyed on the desc file's mtime and size: pacman -D rewrites desc in place
+# without touching the directory, so every entry is checked on each read.
+
+LOCAL_DB = "/var/lib/pacman/local"
+CACHE_VERSION = 2
+PARSE_WORKERS = 8
+
+Package = namedtuple("Package", ["name", "version", "size", "explicit", "depends", "optdepends", "provides"])
+
+VERSION_CONSTRAINT = re.compile(r"[<>=]")
+
+
+def default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "sys_main", "pacman-local.marshal")
+
+
+def _dependency_name(entry):
+    # "glibc>=2.38", "libfoo.so=1-64" and "python: for scripts" -> the bare name
+    return VERSION_CONSTRAINT.split(entry.split(":", 1)[0].strip(), 1)[0]
+
+
+def parse_desc(text):
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("%") and line.endswith("%"):
+            current = sections.setdefault(line[1:-1], [])
+        elif line and current is not None:
+            current.append(line)
+    if not sections.get("NAME"):
+        return None
+    return Package(
+        name=sections["NAME"][0],
+        version=sections.get("VERSION", [""])[0],
+        size=int(sections.get("SIZE", ["0"])[0]),
+        # %REASON% is 1 for dependencies and absent for explicit installs
+        explicit=sections.get("REASON", ["0"])[0] != "1",
+        depends=tuple(_dependency_name(entry) for entry in sections.get("DEPENDS", ())),
+        optdepends=tuple(_dependency_name(entry) for entry in sections.get("OPTDEPENDS", ())),
+        provides=tuple(_dependency_name(entry) for entry in sections.get("PROVIDES", ())),
+    )
+
+
+def _desc_stamp(local_db, entry):
+    try:
+        info = os.stat(os.path.join(local_db, entry, "desc"))
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _read_entry(local_db, entry):
+    try:
+        with open(os.path.join(local_db, entry, "desc"), encoding="utf-8", errors="replace") as f:
+            return entry, parse_desc(f.read())
+    except OSError:
+        return entry, None
+
+
+def read_local_db(local_db=LOCAL_DB, cache_path=None, workers=PARSE_WORKERS):
+    # Returns {name: Package}; only entries whose desc is new or changed are
+    # parsed. Empty when there is no local database (not a pacman system).
+    if not os.path.isdir(local_db):
+        return {}
+    cache_path = cache_path or default_cache_path()
+    cached = {}
+    try:
+        with open(cache_path, "rb") as f:
+            data = marshal.load(f)
+        if data.get("version") == CACHE_VERSION and data.get("root") == local_db:
+            cached = data["entries"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError):
+        pass
+
+    # entry -> (desc stamp, package fields)
+    entries = {}
+    stale = []
+    for entry in os.listdir(local_db):
+        if entry == "ALPM_DB_VERSION":
+            continue
+        stamp = _desc_stamp(local_db, entry)
+        if stamp is None:
+            continue
+        if entry in cached and cached[entry][0] == stamp:
+            entries[entry] = cached[entry]
+        else:
+            stale.append((entry, stamp))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (entry, package), (_, stamp) in zip(pool.map(lambda item: _read_entry(local_db, item[0]), stale), stale):
+            if package is not None:
+                entries[entry] = (stamp, tuple(package))
+
+    if stale or len(entries) != len(cached):
+        _write_cache(cache_path, local_db, entries)
+    return {fields[0]: Package(*fields) for _, fields in entries.values()}
+
+
+def _write_cache(cache_path, local_db, entries):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path + ".tmp", "wb") as f:
+            marshal.dump({"version": CACHE_VERSION, "root": local_db, "entries": entries}, f)
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError as e:
+        print(f"Failed to write pacman database cache: {e}")
+
+
+class PackageGraph:
+    # Forward and reverse dependency indexes over the installed packages.
+    # Dependencies are resolved through package names and %PROVIDES%.
+    def __init__(self, packages):
+        self.packages = packages
+        providers = {}
+        for package in packages.values():
+            providers.setdefault(package.name, set()).add(package.name)
+            for name in package.provides:
+                providers.setdefault(name, set()).add(package.name)
+
+        self.depends = {name: set() for name in packages}
+        self.optdepends = {name: set() for name in packages}
+        self.required_by = {name: set() for name in packages}
+        self.optional_for = {name: set() for name in packages}
+        for package in packages.values():
+            for dependency in package.depends:
+                for provider in providers.get(dependency, ()):
+                    self.depends[package.name].add(provider)
+                    self.required_by[provider].add(package.name)
+            for dependency in package.optdepends:
+                for provider in providers.get(dependency, ()):
+                    self.optdepends[package.name].add(provider)
+                    self.optional_for[provider].add(package.name)
+
+    def _needed(self, name, removing=frozenset(), include_optional=True):
+        users = self.required_by[name] | (self.optional_for[name] if include_optional else set())
+        return bool(users - removing - {name})
+
+    def orphans(self, include_optional=True):
+        # Same as pacman -Qdt: installed as a dependency, needed by nothing;
+        # include_optional=False matches -Qdtt
+        return sorted(name for name, package in self.packages.items()
+                      if not package.explicit and not self._needed(name, include_optional=include_optional))
+
+    def orphan_closure(self, include_optional=True):
+        # Orphans plus every dependency that becomes an orphan once they are
+        # gone, i.e. what `pacman -Rns $(pacman -Qdtq)` repeated would remove
+        removing = set(self.orphans(include_optional))
+        pending = list(removing)
+        while pending:
+            for dependency in self.depends[pending.pop()]:
+                if dependency in removing or self.packages[dependency].explicit:
+                    continue
+                if not self._needed(dependency, removing, include_optional):
+                    removing.add(dependency)
+                    pending.append(dependency)
+        return sorted(removing)
+
+    def dependents(self, name, recursive=False):
+        # "What depends on X"
+        if not recursive:
+            return sorted(self.required_by.get(name, ()))
+        found = set()
+        pending = [name]
+        while pending:
+            for dependent in self.required_by.get(pending.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+        return sorted(found)
+
+    def removal_size(self, names):
+        return sum(self.packages[name].size for name in names)
+
+
+def load_graph(local_db=LOCAL_DB, cache_path=None):
+    return PackageGraph(read_local_db(local_db, cache_path))
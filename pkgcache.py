@@ -0,0 +1,372 @@
+import os
+import re
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cmp_to_key
+
+# Package cache analysis: scan the pacman/apt/dnf caches on a thread pool,
+# group files by package and decide what to keep (the newest KEEP_VERSIONS
+# versions plus whatever is installed) before anything is deleted.
+
+CACHE_DIRS = {
+    "pacman": "/var/cache/pacman/pkg",
+    "apt": "/var/cache/apt/archives",
+    "dnf": "/var/cache/dnf",
+}
+PACMAN_LOCAL_DB = "/var/lib/pacman/local"
+DPKG_STATUS = "/var/lib/dpkg/status"
+KEEP_VERSIONS = 3
+SCAN_WORKERS = 8
+STAT_CHUNK = 1000
+DELETE_BATCH = 500
+
+CacheEntry = namedtuple("CacheEntry", ["manager", "name", "version", "arch", "paths", "size"])
+PrunePlan = namedtuple("PrunePlan", ["remove", "keep", "reclaimable"])
+
+PACMAN_SUFFIX = re.compile(r"\.pkg\.tar(\.\w+)?$")
+
+
+def parse_pacman_filename(filename):
+    # name-pkgver-pkgrel-arch.pkg.tar.zst; names may contain dashes
+    match = PACMAN_SUFFIX.search(filename)
+    if match is None:
+        return None
+    parts = filename[:match.start()].rsplit("-", 3)
+    if len(parts) != 4:
+        return None
+    name, pkgver, pkgrel, arch = parts
+    return name, f"{pkgver}-{pkgrel}", arch
+
+
+def parse_deb_filename(filename):
+    # name_version_arch.deb; the epoch colon is stored as %3a
+    if not filename.endswith(".deb"):
+        return None
+    parts = filename[:-len(".deb")].split("_")
+    if len(parts) != 3:
+        return None
+    name, version, arch = parts
+    return name, version.replace("%3a", ":"), arch
+
+
+def parse_rpm_filename(filename):
+    # name-version-release.arch.rpm
+    if not filename.endswith(".rpm"):
+        return None
+    stem, _, arch = filename[:-len(".rpm")].rpartition(".")
+    parts = stem.rsplit("-", 2)
+    if len(parts) != 3 or not arch:
+        return None
+    name, version, release = parts
+    return name, f"{version}-{release}", arch
+
+
+PARSERS = {"pacman": parse_pacman_filename, "apt": parse_deb_filename, "dnf": parse_rpm_filename}
+
+
+def _split_epoch(version):
+    epoch, sep, rest = version.partition(":")
+    if sep and epoch.isdigit():
+        return int(epoch), rest
+    return 0, version
+
+
+def _rpm_segments_cmp(a, b):
+    # rpm's rpmvercmp
+    if a == b:
+        return 0
+    segments = re.compile(r"(~)|(\d+)|([a-zA-Z]+)")
+    ia = segments.finditer(a)
+    ib = segments.finditer(b)
+    while True:
+        ma = next(ia, None)
+        mb = next(ib, None)
+        if ma is None or mb is None:
+            break
+        sa, sb = ma.group(0), mb.group(0)
+        if sa == "~" or sb == "~":
+            if sa != sb:
+                return -1 if sa == "~" else 1
+            continue
+        if sa.isdigit() != sb.isdigit():
+            return 1 if sa.isdigit() else -1
+        if sa.isdigit():
+            sa, sb = int(sa), int(sb)
+        if sa != sb:
+            return 1 if sa > sb else -1
+    if ma is None and mb is None:
+        return 0
+    rest = ma or mb
+    sign = 1 if ma is not None else -1
+    # A trailing tilde sorts before the end; anything else after
+    return -sign if rest.group(0) == "~" else sign
+
+
+def rpm_vercmp(a, b):
+    epoch_a, a = _split_epoch(a)
+    epoch_b, b = _split_epoch(b)
+    if epoch_a != epoch_b:
+        return 1 if epoch_a > epoch_b else -1
+    version_a, _, release_a = a.rpartition("-") if "-" in a else (a, "", "")
+    version_b, _, release_b = b.rpartition("-") if "-" in b else (b, "", "")
+    result = _rpm_segments_cmp(version_a, version_b)
+    if result == 0 and release_a and release_b:
+        result = _rpm_segments_cmp(release_a, release_b)
+    return result
+
+
+def _alpm_segments_cmp(a, b):
+    # libalpm's copy of rpmvercmp, which differs from rpm's: there is no
+    # tilde, separators compare by run length, and a leftover alpha segment
+    # sorts before the end of the other string (2.0rc1 < 2.0)
+    if a == b:
+        return 0
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start_i, start_j = i, j
+        while i < len(a) and not a[i].isalnum():
+            i += 1
+        while j < len(b) and not b[j].isalnum():
+            j += 1
+        if i == len(a) or j == len(b):
+            break
+        if i - start_i != j - start_j:
+            return -1 if i - start_i < j - start_j else 1
+        numeric = a[i].isdigit()
+        same_kind = str.isdigit if numeric else str.isalpha
+        end_i, end_j = i, j
+        while end_i < len(a) and same_kind(a[end_i]):
+            end_i += 1
+        while end_j < len(b) and same_kind(b[end_j]):
+            end_j += 1
+        sa, sb = a[i:end_i], b[j:end_j]
+        # Numbers are newer than letters
+        if not sb:
+            return 1 if numeric else -1
+        if numeric:
+            sa, sb = sa.lstrip("0"), sb.lstrip("0")
+            if len(sa) != len(sb):
+                return 1 if len(sa) > len(sb) else -1
+        if sa != sb:
+            return 1 if sa > sb else -1
+        i, j = end_i, end_j
+    rest_a, rest_b = a[i:], b[j:]
+    if not rest_a and not rest_b:
+        return 0
+    # A leftover alpha segment never beats the end of the other string
+    if (not rest_a and not rest_b[0].isalpha()) or (rest_a and rest_a[0].isalpha()):
+        return -1
+    return 1
+
+
+def _parse_evr(version):
+    # [epoch:]version[-release]; the epoch defaults to 0, release may be None
+    digits = len(version) - len(version.lstrip("0123456789"))
+    if version[digits:digits + 1] == ":":
+        epoch, version = version[:digits] or "0", version[digits + 1:]
+    else:
+        epoch = "0"
+    version, sep, release = version.rpartition("-")
+    return (epoch, version, release) if sep else (epoch, release, None)
+
+
+def alpm_vercmp(a, b):
+    # pacman's vercmp / alpm_pkg_vercmp
+    if a == b:
+        return 0
+    epoch_a, version_a, release_a = _parse_evr(a)
+    epoch_b, version_b, release_b = _parse_evr(b)
+    result = _alpm_segments_cmp(epoch_a, epoch_b) or _alpm_segments_cmp(version_a, version_b)
+    if result == 0 and release_a and release_b:
+        result = _alpm_segments_cmp(release_a, release_b)
+    return result
+
+
+def _dpkg_order(char):
+    if char == "~":
+        return -1
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256 if char else 0
+
+
+def _dpkg_part_cmp(a, b):
+    i = j = 0
+    while i < len(a) or j < len(b):
+        # Non-digit prefix, compared with dpkg's character order
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ca = _dpkg_order(a[i]) if i < len(a) and not a[i].isdigit() else 0
+            cb = _dpkg_order(b[j]) if j < len(b) and not b[j].isdigit() else 0
+            if ca != cb:
+                return 1 if ca > cb else -1
+            i += 1
+            j += 1
+        start_i, start_j = i, j
+        while i < len(a) and a[i].isdigit():
+            i += 1
+        while j < len(b) and b[j].isdigit():
+            j += 1
+        na = int(a[start_i:i] or 0)
+        nb = int(b[start_j:j] or 0)
+        if na != nb:
+            return 1 if na > nb else -1
+    return 0
+
+
+def dpkg_vercmp(a, b):
+    epoch_a, a = _split_epoch(a)
+    epoch_b, b = _split_epoch(b)
+    if epoch_a != epoch_b:
+        return 1 if epoch_a > epoch_b else -1
+    upstream_a, _, revision_a = a.rpartition("-") if "-" in a else (a, "", "")
+    upstream_b, _, revision_b = b.rpartition("-") if "-" in b else (b, "", "")
+    return _dpkg_part_cmp(upstream_a, upstream_b) or _dpkg_part_cmp(revision_a, revision_b)
+
+
+VERCMP = {"pacman": alpm_vercmp, "apt": dpkg_vercmp, "dnf": rpm_vercmp}
+
+
+def _list_directory(path):
+    files = {}
+    subdirectories = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files[entry.name] = entry
+    except OSError:
+        pass
+    return files, subdirectories
+
+
+def _read_entries(manager, names, files):
+    # Parses and stats one chunk of a directory; signatures are attached to their package
+    parse = PARSERS[manager]
+    entries = []
+    for name in names:
+        parsed = parse(name)
+        if parsed is None:
+            continue
+        try:
+            paths = [files[name].path]
+            size = files[name].stat(follow_symlinks=False).st_size
+            signature = files.get(name + ".sig")
+            if signature is not None:
+                paths.append(signature.path)
+                size += signature.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        entries.append(CacheEntry(manager, parsed[0], parsed[1], parsed[2], tuple(paths), size))
+    return entries
+
+
+def scan(caches=None, workers=SCAN_WORKERS, on_progress=None, chunk_size=STAT_CHUNK):
+    # Lists directories breadth-first and stats their files in chunks on a
+    # thread pool; on_progress gets the package files found so far and the
+    # fraction of chunks done
+    caches = CACHE_DIRS if caches is None else caches
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        listings = [(manager, pool.submit(_list_directory, path)) for manager, path in caches.items() if os.path.isdir(path)]
+        chunks = []
+        while listings:
+            manager, future = listings.pop(0)
+            files, subdirectories = future.result()
+            listings.extend((manager, pool.submit(_list_directory, path)) for path in subdirectories)
+            names = sorted(files)
+            for start in range(0, len(names), chunk_size):
+                chunks.append(pool.submit(_read_entries, manager, names[start:start + chunk_size], files))
+
+        for done, future in enumerate(as_completed(chunks), 1):
+            results.extend(future.result())
+            if on_progress is not None:
+                on_progress(len(results), done / len(chunks))
+    return results
+
+
+def installed_pacman(local_db=PACMAN_LOCAL_DB):
+    # The local database has one directory per installed package: name-pkgver-pkgrel
+    installed = {}
+    try:
+        names = os.listdir(local_db)
+    except OSError:
+        return installed
+    for name in names:
+        parts = name.rsplit("-", 2)
+        if len(parts) == 3:
+            installed[parts[0]] = f"{parts[1]}-{parts[2]}"
+    return installed
+
+
+def installed_dpkg(status_path=DPKG_STATUS):
+    installed = {}
+    try:
+        with open(status_path) as f:
+            stanzas = f.read().split("\n\n")
+    except OSError:
+        return installed
+    for stanza in stanzas:
+        fields = dict(line.split(": ", 1) for line in stanza.splitlines() if ": " in line and not line.startswith(" "))
+        if fields.get("Status", "").endswith(" installed") and "Package" in fields:
+            installed[fields["Package"]] = fields.get("Version")
+    return installed
+
+
+def installed_rpm():
+    # Without the epoch: rpm file names (and so the cache entries) leave it out
+    try:
+        result = subprocess.run(["rpm", "-qa", "--qf", "%{NAME} %{VERSION}-%{RELEASE}\n"], capture_output=True, text=True)
+    except OSError:
+        return {}
+    installed = {}
+    for line in result.stdout.splitlines():
+        name, _, version = line.partition(" ")
+        installed[name] = version
+    return installed
+
+
+def installed_versions(managers):
+    sources = {"pacman": installed_pacman, "apt": installed_dpkg, "dnf": installed_rpm}
+    return {manager: sources[manager]() for manager in managers}
+
+
+def plan_prune(entries, installed, keep=KEEP_VERSIONS):
+    # installed: {manager: {name: version}}
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry.manager, entry.name, entry.arch), []).append(entry)
+
+    remove = []
+    kept = []
+    for (manager, name, _), group in groups.items():
+        compare = VERCMP[manager]
+        ordered = sorted(group, key=cmp_to_key(lambda a, b: compare(a.version, b.version)), reverse=True)
+        installed_version = installed.get(manager, {}).get(name)
+        for index, entry in enumerate(ordered):
+            if index < keep or (installed_version is not None and compare(entry.version, installed_version) == 0):
+                kept.append(entry)
+            else:
+                remove.append(entry)
+    return PrunePlan(remove, kept, sum(entry.size for entry in remove))
+
+
+def analyse(keep=KEEP_VERSIONS, caches=None, on_progress=None):
+    entries = scan(caches, on_progress=on_progress)
+    installed = installed_versions({entry.manager for entry in entries})
+    return plan_prune(entries, installed, keep)
+
+
+def prune_ops(plan, caches=None, batch_size=DELETE_BATCH):
+    # One cache_prune op per batch, so the helper reports progress as it goes
+    caches = CACHE_DIRS if caches is None else caches
+    ops = []
+    by_manager = {}
+    for entry in plan.remove:
+        by_manager.setdefault(entry.manager, []).extend(entry.paths)
+    for manager, paths in by_manager.items():
+        for start in range(0, len(paths), batch_size):
+            ops.append(("cache_prune", {"root": caches[manager], "paths": paths[start:start + batch_size]}))
+    return ops
@@ -0,0 +1,194 @@
+import os
+from collections import namedtuple
+
+# Battery and AC state pushed on change. UPower's DisplayDevice is watched
+# through PropertiesChanged; without UPower, udev power_supply uevents (via
+# GUdev) trigger a sysfs read. sysfs attributes do not raise inotify events,
+# so a slow poll is the last resort. Health always comes from sysfs since
+# UPower's DisplayDevice does not carry it.
+
+POWER_SUPPLY_ROOT = "/sys/class/power_supply"
+UPOWER_NAME = "org.freedesktop.UPower"
+UPOWER_PATH = "/org/freedesktop/UPower"
+DISPLAY_DEVICE_PATH = "/org/freedesktop/UPower/devices/DisplayDevice"
+FALLBACK_POLL = 30  # seconds
+
+# org.freedesktop.UPower.Device State
+UPOWER_STATES = {
+    0: "unknown",
+    1: "charging",
+    2: "discharging",
+    3: "empty",
+    4: "full",
+    5: "pending-charge",
+    6: "pending-discharge",
+}
+
+PowerState = namedtuple("PowerState", ["percent", "plugged", "state", "health", "cycle_count"])
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_int(path):
+    value = _read(path)
+    return int(value) if value and value.lstrip("-").isdigit() else None
+
+
+def _supplies(root):
+    try:
+        names = sorted(os.listdir(root))
+    except OSError:
+        return [], []
+    batteries = []
+    mains = []
+    for name in names:
+        kind = _read(os.path.join(root, name, "type"))
+        # Peripheral batteries (mice, headsets) report scope=Device
+        if kind == "Battery" and _read(os.path.join(root, name, "scope")) != "Device":
+            batteries.append(os.path.join(root, name))
+        elif kind == "Mains":
+            mains.append(os.path.join(root, name))
+    return batteries, mains
+
+
+def read_health(root=POWER_SUPPLY_ROOT):
+    # (full capacity as % of design, cycle count); None where the firmware does not say
+    batteries, _ = _supplies(root)
+    if not batteries:
+        return None, None
+    battery = batteries[0]
+    for prefix in ("energy", "charge"):
+        full = _read_int(os.path.join(battery, f"{prefix}_full"))
+        design = _read_int(os.path.join(battery, f"{prefix}_full_design"))
+        if full and design:
+            health = round(full * 100 / design)
+            break
+    else:
+        health = None
+    cycles = _read_int(os.path.join(battery, "cycle_count"))
+    # Many firmwares report 0 when they do not count cycles
+    return health, cycles or None
+
+
+def read_sysfs_state(root=POWER_SUPPLY_ROOT):
+    batteries, mains = _supplies(root)
+    if not batteries:
+        return None
+    battery = batteries[0]
+    health, cycles = read_health(root)
+    status = (_read(os.path.join(battery, "status")) or "unknown").lower()
+    if mains:
+        plugged = any(_read(os.path.join(supply, "online")) == "1" for supply in mains)
+    else:
+        plugged = status != "discharging"
+    state = {"not charging": "pending-charge"}.get(status, status)
+    return PowerState(_read_int(os.path.join(battery, "capacity")), plugged, state, health, cycles)
+
+
+def health_label(state):
+    if state is None or state.health is None:
+        return "Unknown"
+    rating = "Good" if state.health >= 80 else "Fair" if state.health >= 60 else "Poor"
+    cycles = f", {state.cycle_count} cycles" if state.cycle_count else ""
+    return f"{rating} ({state.health}%{cycles})"
+
+
+class PowerMonitor:
+    # on_change(state) runs on the GLib main loop, only when something changed
+    def __init__(self, on_change, root=POWER_SUPPLY_ROOT):
+        self.on_change = on_change
+        self.root = root
+        self.state = None
+        self.backend = None
+        self._device = None
+        self._upower = None
+        self._udev = None
+        self._handlers = []
+        self._source = None
+
+    def start(self):
+        if self._start_upower():
+            self.backend = "upower"
+        elif self._start_udev():
+            self.backend = "udev"
+        else:
+            from gi.repository import GLib
+            self._source = GLib.timeout_add_seconds(FALLBACK_POLL, self._on_poll)
+            self.backend = "poll"
+        self.refresh()
+        return self
+
+    def stop(self):
+        for obj, handler in self._handlers:
+            obj.disconnect(handler)
+        self._handlers = []
+        if self._source is not None:
+            from gi.repository import GLib
+            GLib.source_remove(self._source)
+            self._source = None
+
+    def _start_upower(self):
+        from gi.repository import Gio, GLib
+
+        try:
+            self._device = Gio.DBusProxy.new_for_bus_sync(
+                Gio.BusType.SYSTEM, Gio.DBusProxyFlags.NONE, None,
+                UPOWER_NAME, DISPLAY_DEVICE_PATH, "org.freedesktop.UPower.Device", None)
+            self._upower = Gio.DBusProxy.new_for_bus_sync(
+                Gio.BusType.SYSTEM, Gio.DBusProxyFlags.NONE, None,
+                UPOWER_NAME, UPOWER_PATH, "org.freedesktop.UPower", None)
+        except GLib.Error as e:
+            print(f"UPower is not available: {e.message}")
+            return False
+        if self._device.get_name_owner() is None:
+            return False
+        for proxy in (self._device, self._upower):
+            self._handlers.append((proxy, proxy.connect("g-properties-changed", lambda *_: self.refresh())))
+        return True
+
+    def _start_udev(self):
+        try:
+            import gi
+            gi.require_version("GUdev", "1.0")
+            from gi.repository import GUdev
+        except (ImportError, ValueError):
+            return False
+        self._udev = GUdev.Client.new(["power_supply"])
+        self._handlers.append((self._udev, self._udev.connect("uevent", lambda *_: self.refresh())))
+        return True
+
+    def _on_poll(self):
+        self.refresh()
+        return True
+
+    def read(self):
+        if self.backend != "upower":
+            return read_sysfs_state(self.root)
+
+        def prop(proxy, name):
+            value = proxy.get_cached_property(name)
+            return value.unpack() if value is not None else None
+
+        if not prop(self._device, "IsPresent"):
+            return None
+        health, cycles = read_health(self.root)
+        percent = prop(self._device, "Percentage")
+        return PowerState(
+            percent=round(percent) if percent is not None else None,
+            plugged=not prop(self._upower, "OnBattery"),
+            state=UPOWER_STATES.get(prop(self._device, "State"), "unknown"),
+            health=health,
+            cycle_count=cycles,
+        )
+
+    def refresh(self):
+        state = self.read()
+        if state != self.state:
+            self.state = state
+            self.on_change(state)
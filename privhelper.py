@@ -0,0 +1,811 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Root helper for privileged maintenance. Started once per session through
+# pkexec or sudo; the GUI then sends batches of typed operations over a Unix
+# socket instead of re-running sudo for every step.
+#
+# Protocol (newline-delimited JSON):
+#   client -> {"id": 1, "ops": [{"op": "swap_cycle", "args": {}}, ...]}
+#   client -> {"cancel": 1}
+#   client -> {"pause": 1} / {"resume": 1}
+#   helper -> {"id": 1, "event": "line", "index": 0, "line": "..."}
+#   helper -> {"id": 1, "event": "result", "index": 0, "ok": true, "returncode": 0, "error": null}
+#   helper -> {"id": 1, "event": "done", "ok": true}
+# A batch stops at the first failing operation. A batch sent with
+# "background": true runs its commands at idle CPU and I/O priority; pausing
+# stops the running command (SIGSTOP) and holds the next operation.
+
+HELPER_PATH = os.path.abspath(__file__)
+IDLE_TIMEOUT = 900
+REMOVE_WORKERS = 4
+
+CACHE_ROOTS = ("/var/cache/pacman/pkg", "/var/cache/apt/archives", "/var/cache/dnf")
+REMOVABLE_ROOTS = CACHE_ROOTS
+SYSFS_ROOTS = ("/sys/class/backlight", "/sys/class/leds")
+DROP_CACHES_PATH = "/proc/sys/vm/drop_caches"
+IDLE_PRIORITY = ["nice", "-n", "19"]
+IDLE_IO_PRIORITY = ["ionice", "-c", "3"]
+
+PACKAGE_COMMANDS = {
+    "pacman": {
+        "upgrade": ["pacman", "-Syu", "--noconfirm"],
+        "refresh": ["pacman", "-Sy"],
+        "remove": ["pacman", "-Rns", "--noconfirm"],
+    },
+    "apt": {
+        "refresh": ["apt-get", "update"],
+        "upgrade": ["apt-get", "upgrade", "-y"],
+        "remove": ["apt-get", "autoremove", "--purge", "-y"],
+    },
+    "dnf": {
+        "refresh": ["dnf", "makecache"],
+        "upgrade": ["dnf", "upgrade", "-y"],
+        "remove": ["dnf", "remove", "-y"],
+    },
+}
+
+# pacman's package-name grammar, which also covers apt and dnf names: no
+# path separators, colons (URLs) or leading dot or dash
+PACKAGE_NAME = re.compile(r"[A-Za-z0-9@_+][A-Za-z0-9@._+-]*")
+
+# Options a caller may add to a transaction, as full matches. Anything that
+# points the manager at another config, root, database or hook directory
+# would let the caller run code as root, so only these are accepted.
+PACKAGE_OPTIONS = {
+    "pacman": (r"--needed", r"--noprogressbar"),
+    "apt": (r"--no-install-recommends",),
+    "dnf": (r"--refresh", r"--setopt=max_parallel_downloads=\d{1,2}"),
+}
+
+# Extra package caches pre-filled by the user (see updates.py); the package
+# manager still verifies every file it takes from them
+CACHE_DIR_OPTIONS = {
+    "pacman": lambda path: ["--cachedir", "/var/cache/pacman/pkg", "--cachedir", path],
+    "apt": lambda path: ["-o", f"Dir::Cache::Archives={path}"],
+}
+# What each manager leaves in such a cache as root, removed after the
+# transaction so the user can delete the directory
+CACHE_DIR_LEFTOVERS = {
+    "apt": ("lock", "partial"),
+}
+
+
+class HelperError(Exception):
+    pass
+
+
+def _active_swaps():
+    with open("/proc/swaps") as f:
+        return {line.split()[0].replace("\\040", " ") for line in list(f)[1:] if line.strip()}
+
+
+def _split_under(path, roots):
+    # (root, [components]) for a path strictly below one of roots, compared
+    # without resolving links; None otherwise
+    if not isinstance(path, str) or not os.path.isabs(path):
+        return None
+    path = os.path.normpath(path)
+    for root in roots:
+        if path.startswith(root + os.sep):
+            return root, path[len(root) + 1:].split(os.sep)
+    return None
+
+
+def _remove_path(root_fd, parts):
+    # Each directory is opened relative to its parent without following
+    # links, so swapping one for a symlink cannot redirect the delete
+    fds = []
+    try:
+        parent = root_fd
+        for part in parts[:-1]:
+            parent = os.open(part, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=parent)
+            fds.append(parent)
+        if stat.S_ISDIR(os.stat(parts[-1], dir_fd=parent, follow_symlinks=False).st_mode):
+            shutil.rmtree(parts[-1], dir_fd=parent)
+        else:
+            os.unlink(parts[-1], dir_fd=parent)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return e
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return None
+
+
+def _package_names(packages):
+    # Names only: the package managers also take local files and URLs in the
+    # same position, and installing one of those as root runs its scripts
+    if not isinstance(packages, list) or not all(isinstance(p, str) for p in packages):
+        raise HelperError("packages must be a list of names")
+    for name in packages:
+        if not PACKAGE_NAME.fullmatch(name) or name.endswith((".deb", ".rpm")) or ".pkg.tar" in name:
+            raise HelperError(f"Invalid package name: {name!r}")
+    return packages
+
+
+class HelperServer:
+    def __init__(self, socket_path, uid, dry_run=False, idle_timeout=IDLE_TIMEOUT):
+        self.socket_path = socket_path
+        self.uid = uid
+        self.dry_run = dry_run
+        self.idle_timeout = idle_timeout
+        self._proc = None
+        # The executing batch and operation
+        self._request_id = None
+        self._op = None
+        self._cancelled = set()
+        self._background = False
+        self._paused = False
+        # A pause that arrived before its batch started, and the last batch
+        # started, so a late pause for a finished batch is dropped
+        self._pending_pause = None
+        self._last_request_id = 0
+        self._lock = threading.Lock()
+        self._resumed = threading.Condition(self._lock)
+        self._send_lock = threading.Lock()
+        self.ops = {
+            "ping": self.op_ping,
+            "swap_cycle": self.op_swap_cycle,
+            "drop_caches": self.op_drop_caches,
+            "cache_prune": self.op_cache_prune,
+            "remove_paths": self.op_remove_paths,
+            "package_transaction": self.op_package_transaction,
+            "install_built": self.op_install_built,
+            "sysfs_write": self.op_sysfs_write,
+        }
+
+    # Operations ---------------------------------------------------------
+
+    def op_ping(self, args, emit):
+        emit(f"helper running as uid {os.geteuid()}")
+        return 0
+
+    def op_swap_cycle(self, args, emit):
+        device = args.get("device")
+        if device is not None and not isinstance(device, str):
+            raise HelperError("device must be a path")
+        # Only re-enable what is already active swap
+        if device is not None and device not in _active_swaps():
+            raise HelperError(f"{device} is not an active swap device")
+        target = [device] if device else ["-a"]
+        returncode = self.run_command(["swapoff", "-v"] + target, emit)
+        if returncode != 0:
+            return returncode
+        return self.run_command(["swapon", "-v"] + target, emit)
+
+    def op_drop_caches(self, args, emit):
+        # 1: page cache, 2: dentries and inodes, 3: both. Only clean pages go
+        level = args.get("level", 1)
+        if level not in (1, 2, 3):
+            raise HelperError("level must be 1, 2 or 3")
+        if self.dry_run:
+            emit(f"would write {level} to {DROP_CACHES_PATH}")
+            return 0
+        os.sync()
+        with open(DROP_CACHES_PATH, "w") as f:
+            f.write(str(level))
+        emit("Dropped clean caches")
+        return 0
+
+    def op_cache_prune(self, args, emit):
+        root = args.get("root", CACHE_ROOTS[0])
+        if root not in CACHE_ROOTS:
+            raise HelperError(f"Not a package cache: {root}")
+        paths = args.get("paths")
+        if paths is None:
+            paths = [os.path.join(root, name) for name in sorted(os.listdir(root))]
+        return self._remove(paths, (root,), emit)
+
+    def op_remove_paths(self, args, emit):
+        return self._remove(args.get("paths", []), REMOVABLE_ROOTS, emit)
+
+    def op_package_transaction(self, args, emit):
+        commands = PACKAGE_COMMANDS.get(args.get("manager"))
+        if commands is None:
+            raise HelperError(f"Unsupported package manager: {args.get('manager')}")
+        command = commands.get(args.get("action"))
+        if command is None:
+            raise HelperError(f"Unsupported action: {args.get('action')}")
+        packages = _package_names(args.get("packages", []))
+        if args.get("action") == "remove" and not packages:
+            emit("Nothing to do")
+            return 0
+        options = args.get("options", [])
+        if not isinstance(options, list):
+            raise HelperError("options must be a list")
+        allowed = PACKAGE_OPTIONS.get(args["manager"], ())
+        for option in options:
+            if not isinstance(option, str) or not any(re.fullmatch(pattern, option) for pattern in allowed):
+                raise HelperError(f"Option not allowed: {option!r}")
+        cache_dirs = args.get("cache_dirs", [])
+        for path in cache_dirs:
+            if args["manager"] not in CACHE_DIR_OPTIONS:
+                raise HelperError(f"cache_dirs is not supported for {args['manager']}")
+            if not isinstance(path, str) or not os.path.isabs(path) or not os.path.isdir(path):
+                raise HelperError(f"Invalid cache directory: {path}")
+            options = options + CACHE_DIR_OPTIONS[args["manager"]](os.path.realpath(path))
+        try:
+            return self.run_command(command + options + packages, emit)
+        finally:
+            if not self.dry_run:
+                for path in cache_dirs:
+                    self._clean_cache_dir(path, CACHE_DIR_LEFTOVERS.get(args["manager"], ()), emit)
+
+    def op_install_built(self, args, emit):
+        # Installs the packages the user built from the AUR (see
+        # updates.aur_steps). Only upgrades installed foreign packages, so a
+        # build cannot replace a repository package or add new software. The
+        # files are copied somewhere root-owned before they are checked.
+        directory = args.get("directory")
+        if not isinstance(directory, str) or not os.path.isabs(directory):
+            raise HelperError("directory must be an absolute path")
+        if self.dry_run:
+            emit(f"would install the packages built in {directory}")
+            return 0
+        dir_fd = self._open_user_dir(directory)
+        staging = tempfile.mkdtemp(prefix="sys_main-built-")
+        try:
+            targets = []
+            for name in sorted(os.listdir(dir_fd)):
+                if ".pkg.tar" not in name or name.endswith(".sig"):
+                    continue
+                path = os.path.join(staging, name)
+                try:
+                    fd = os.open(name, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK, dir_fd=dir_fd)
+                except OSError as e:
+                    emit(f"Skipping {name}: {e}")
+                    continue
+                with open(fd, "rb") as source:
+                    if not stat.S_ISREG(os.fstat(fd).st_mode):
+                        continue
+                    with open(path, "wb") as target:
+                        shutil.copyfileobj(source, target)
+                info = subprocess.run(["pacman", "-Qip", path], capture_output=True, text=True)
+                package = next((line.split(":", 1)[1].strip() for line in info.stdout.splitlines() if line.startswith("Name ")), "")
+                installed = (PACKAGE_NAME.fullmatch(package)
+                             and subprocess.run(["pacman", "-Qqm", package], capture_output=True).returncode == 0)
+                if installed:
+                    targets.append(path)
+                else:
+                    emit(f"Skipping {name}: not an installed foreign package")
+            if not targets:
+                emit("Nothing to install")
+                return 0
+            return self.run_command(["pacman", "-U", "--noconfirm", "--needed", "--"] + targets, emit)
+        finally:
+            os.close(dir_fd)
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def op_sysfs_write(self, args, emit):
+        path = args.get("path", "")
+        value = args.get("value")
+        if not isinstance(value, int) or value < 0:
+            raise HelperError("value must be a non-negative integer")
+        # Only <class>/<device>/brightness; device entries are symlinks into /sys/devices
+        path = os.path.normpath(path)
+        if os.path.basename(path) != "brightness" or os.path.dirname(os.path.dirname(path)) not in SYSFS_ROOTS:
+            raise HelperError(f"Refusing to write {path}")
+        if self.dry_run:
+            emit(f"would write {value} to {path}")
+            return 0
+        with open(path, "w") as f:
+            f.write(str(value))
+        return 0
+
+    # Plumbing -----------------------------------------------------------
+
+    def _open_user_dir(self, path):
+        # A directory of the session user's, opened without following a
+        # final symlink; anything else could point the helper at system files
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+        except OSError as e:
+            raise HelperError(f"Cannot open {path}: {e}") from e
+        if os.fstat(fd).st_uid != self.uid:
+            os.close(fd)
+            raise HelperError(f"{path} is not owned by uid {self.uid}")
+        return fd
+
+    def _clean_cache_dir(self, path, names, emit):
+        if not names:
+            return
+        try:
+            dir_fd = self._open_user_dir(path)
+        except HelperError as e:
+            emit(f"Failed to clean up {path}: {e}")
+            return
+        try:
+            for name in names:
+                error = _remove_path(dir_fd, [name])
+                if error is not None:
+                    emit(f"Failed to remove {os.path.join(path, name)}: {error}")
+        finally:
+            os.close(dir_fd)
+
+    def _remove(self, paths, roots, emit):
+        if not isinstance(paths, list):
+            raise HelperError("paths must be a list")
+        failures = 0
+        allowed = []
+        root_fds = {}
+        try:
+            for path in paths:
+                split = _split_under(path, roots)
+                if split is None:
+                    emit(f"Skipping {path}: outside allowed directories")
+                    failures += 1
+                elif self.dry_run:
+                    emit(f"would remove {path}")
+                else:
+                    root, parts = split
+                    if root not in root_fds:
+                        try:
+                            root_fds[root] = os.open(root, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+                        except OSError as e:
+                            root_fds[root] = e
+                    if isinstance(root_fds[root], OSError):
+                        emit(f"Failed to remove {path}: {root_fds[root]}")
+                        failures += 1
+                    else:
+                        allowed.append((path, root_fds[root], parts))
+
+            # Unlinks are mostly metadata I/O, so a few threads overlap them well
+            with ThreadPoolExecutor(max_workers=REMOVE_WORKERS) as pool:
+                errors = pool.map(lambda entry: _remove_path(entry[1], entry[2]), allowed)
+                for (path, _, _), error in zip(allowed, errors):
+                    if error is not None:
+                        emit(f"Failed to remove {path}: {error}")
+                        failures += 1
+        finally:
+            for fd in root_fds.values():
+                if isinstance(fd, int):
+                    os.close(fd)
+        emit(f"Removed {len(paths) - failures} of {len(paths)} entries")
+        return 1 if failures else 0
+
+    def run_command(self, args, emit):
+        if self._background:
+            args = IDLE_PRIORITY + (IDLE_IO_PRIORITY if shutil.which(IDLE_IO_PRIORITY[0]) else []) + args
+        if self.dry_run:
+            emit("would run: " + " ".join(args))
+            return 0
+        with self._lock:
+            self._proc = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                start_new_session=True,
+            )
+            proc = self._proc
+            if self._paused:
+                self._signal(proc, signal.SIGSTOP)
+        for line in proc.stdout:
+            emit(line.rstrip("\n"))
+        returncode = proc.wait()
+        with self._lock:
+            self._proc = None
+        return returncode
+
+    def _signal(self, proc, signum):
+        if proc and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signum)
+            except OSError:
+                pass
+
+    def cancel(self, request_id, terminate=True):
+        with self._lock:
+            self._cancelled.add(request_id)
+            if request_id != self._request_id:
+                return
+            self._paused = False
+            self._resumed.notify_all()
+            proc = self._proc
+        if terminate:
+            self._signal(proc, signal.SIGTERM)
+        # A stopped process only acts on SIGTERM once it runs again
+        self._signal(proc, signal.SIGCONT)
+
+    def abandon(self):
+        # The client went away: skip the rest of its batch. A package
+        # transaction in flight is left to finish, since killing pacman or
+        # apt midway can leave the package database broken.
+        with self._lock:
+            request_id = self._request_id
+            op = self._op
+        if request_id is not None:
+            self.cancel(request_id, terminate=op != "package_transaction")
+
+    def pause(self, request_id):
+        # Only the batch it names; another client's work is never stopped
+        with self._lock:
+            if request_id != self._request_id:
+                if isinstance(request_id, int) and request_id > self._last_request_id:
+                    self._pending_pause = request_id
+                return
+            self._paused = True
+            proc = self._proc
+        self._signal(proc, signal.SIGSTOP)
+
+    def resume(self, request_id):
+        with self._lock:
+            if request_id != self._request_id:
+                if self._pending_pause == request_id:
+                    self._pending_pause = None
+                return
+            self._paused = False
+            self._resumed.notify_all()
+            proc = self._proc
+        self._signal(proc, signal.SIGCONT)
+
+    def send(self, conn, message):
+        data = (json.dumps(message) + "\n").encode()
+        with self._send_lock:
+            conn.sendall(data)
+
+    def run_batch(self, conn, request):
+        self.execute(request.get("id"), request.get("ops", []), lambda message: self.send(conn, message),
+                     request.get("background", False))
+
+    def execute(self, request_id, ops, send, background=False):
+        ok = True
+        self._background = background
+        with self._lock:
+            self._request_id = request_id
+            if isinstance(request_id, int):
+                self._last_request_id = max(self._last_request_id, request_id)
+            self._paused = self._pending_pause == request_id
+            self._pending_pause = None
+        for index, entry in enumerate(ops):
+            with self._lock:
+                while self._paused and request_id not in self._cancelled:
+                    self._resumed.wait()
+                cancelled = request_id in self._cancelled
+                self._op = entry.get("op")
+            if cancelled:
+                send({"id": request_id, "event": "result", "index": index, "ok": False, "returncode": None, "error": "cancelled"})
+                ok = False
+                break
+
+            def emit(line, index=index):
+                send({"id": request_id, "event": "line", "index": index, "line": line})
+
+            error = None
+            returncode = None
+            try:
+                handler = self.ops.get(entry.get("op"))
+                if handler is None:
+                    raise HelperError(f"Unknown operation: {entry.get('op')}")
+                returncode = handler(entry.get("args", {}), emit)
+            except (HelperError, OSError) as e:
+                error = str(e)
+            op_ok = error is None and returncode == 0
+            send({"id": request_id, "event": "result", "index": index, "ok": op_ok, "returncode": returncode, "error": error})
+            if not op_ok:
+                ok = False
+                break
+        with self._lock:
+            self._cancelled.discard(request_id)
+            self._request_id = None
+            self._op = None
+            self._paused = False
+        self._background = False
+        send({"id": request_id, "event": "done", "ok": ok})
+
+    def _bind(self):
+        directory = os.path.dirname(self.socket_path)
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != self.uid or info.st_mode & 0o077:
+            raise HelperError(f"{directory} must be a private directory owned by uid {self.uid}")
+        if os.path.lexists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise HelperError(f"{self.socket_path} exists and is not a socket")
+            os.unlink(self.socket_path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        if os.geteuid() == 0:
+            os.chown(self.socket_path, self.uid, -1)
+        sock.listen(1)
+        return sock
+
+    def _peer_allowed(self, conn):
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid in (self.uid, 0)
+
+    def serve(self):
+        sock = self._bind()
+        sock.settimeout(self.idle_timeout)
+        try:
+            while True:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    return
+                if not self._peer_allowed(conn):
+                    conn.close()
+                    continue
+                conn.settimeout(None)
+                self.handle(conn)
+                # One GUI session per helper
+                return
+        finally:
+            sock.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def handle(self, conn):
+        requests = []
+        cond = threading.Condition()
+        closed = False
+
+        def reader():
+            nonlocal closed
+            with conn.makefile("rb") as stream:
+                for raw in stream:
+                    try:
+                        message = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if "cancel" in message:
+                        self.cancel(message["cancel"])
+                        continue
+                    if "pause" in message:
+                        self.pause(message["pause"])
+                        continue
+                    if "resume" in message:
+                        self.resume(message["resume"])
+                        continue
+                    with cond:
+                        requests.append(message)
+                        cond.notify()
+            with cond:
+                closed = True
+                cond.notify()
+            self.abandon()
+
+        threading.Thread(target=reader, daemon=True).start()
+        while True:
+            with cond:
+                while not requests and not closed:
+                    cond.wait()
+                # Nobody is left to see the results of queued batches
+                if closed:
+                    break
+                request = requests.pop(0)
+            try:
+                self.run_batch(conn, request)
+            except OSError:
+                break
+        conn.close()
+
+
+class HelperClient:
+    def __init__(self, socket_path=None, dry_run=False):
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/sys_main-{os.getuid()}"
+        self.socket_dir = os.path.join(runtime_dir, "sys_main")
+        self.socket_path = socket_path or os.path.join(self.socket_dir, f"helper-{os.getpid()}.sock")
+        self.dry_run = dry_run
+        self._sock = None
+        self._stream = None
+        self._launcher = None
+        self._next_id = 0
+        self._current_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def helper_command(self):
+        command = [sys.executable, HELPER_PATH, "--socket", self.socket_path, "--uid", str(os.getuid())]
+        if self.dry_run:
+            command.append("--dry-run")
+        return command
+
+    def start(self, password=None, use_pkexec=True, timeout=60):
+        # Authenticates once: pkexec shows the polkit agent, otherwise sudo -S
+        # reads the password collected by the GUI.
+        os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+        command = self.helper_command()
+        if self.dry_run:
+            self._launcher = subprocess.Popen(command)
+        elif password is not None:
+            self._launcher = subprocess.Popen(["sudo", "-S", "-p", ""] + command, stdin=subprocess.PIPE, text=True)
+            self._launcher.stdin.write(password + "\n")
+            self._launcher.stdin.close()
+        elif use_pkexec:
+            self._launcher = subprocess.Popen(["pkexec"] + command)
+        else:
+            # Interactive sudo on the controlling terminal (CLI use)
+            self._launcher = subprocess.Popen(["sudo"] + command)
+        self.connect(timeout)
+        return self
+
+    def connect(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._launcher is not None and self._launcher.poll() is not None:
+                raise HelperError(f"Helper exited with status {self._launcher.returncode}")
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.socket_path)
+                break
+            except OSError:
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise HelperError("Timed out waiting for the helper")
+                time.sleep(0.1)
+        self._sock = sock
+        self._stream = sock.makefile("rb")
+
+    def batch(self, ops, on_line=None, background=False, on_request=None):
+        # ops: list of (name, args) pairs; returns the per-operation results.
+        # on_request gets the batch's id before it is sent, for pause(),
+        # resume() and cancel() from another thread.
+        with self._lock:
+            if self._sock is None:
+                raise HelperError("Helper is not running")
+            self._next_id += 1
+            request_id = self._next_id
+            self._current_id = request_id
+            if on_request is not None:
+                on_request(request_id)
+            message = {"id": request_id, "ops": [{"op": op, "args": args} for op, args in ops]}
+            if background:
+                message["background"] = True
+            self._sock.sendall((json.dumps(message) + "\n").encode())
+
+            results = []
+            try:
+                for raw in self._stream:
+                    reply = json.loads(raw)
+                    if reply.get("id") != request_id:
+                        continue
+                    if reply["event"] == "line":
+                        if on_line:
+                            on_line(reply["line"])
+                    elif reply["event"] == "result":
+                        results.append(reply)
+                    elif reply["event"] == "done":
+                        break
+                else:
+                    self.close()
+                    raise HelperError("Helper connection closed")
+            finally:
+                self._current_id = None
+
+        return _check_results(ops, results)
+
+    def call(self, op, on_line=None, **args):
+        return self.batch([(op, args)], on_line)[0]
+
+    def _control(self, action, request_id=None):
+        # Defaults to the batch in flight
+        request_id = self._current_id if request_id is None else request_id
+        sock = self._sock
+        if request_id is not None and sock is not None:
+            try:
+                sock.sendall((json.dumps({action: request_id}) + "\n").encode())
+            except OSError:
+                pass
+
+    def cancel(self, request_id=None):
+        self._control("cancel", request_id)
+
+    def pause(self, request_id=None):
+        self._control("pause", request_id)
+
+    def resume(self, request_id=None):
+        self._control("resume", request_id)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._stream.close()
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+            self._stream = None
+
+
+def _check_results(ops, results):
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        name = ops[failed[0]["index"]][0]
+        reason = failed[0]["error"] or f"exit status {failed[0]['returncode']}"
+        raise HelperError(f"{name} failed: {reason}")
+    return results
+
+
+class LocalHelper:
+    # Same interface as HelperClient, but runs the operations in this process.
+    # Used by the CLI when it already runs as root, and for --dry-run.
+    connected = True
+
+    def __init__(self, dry_run=False):
+        if not dry_run and os.geteuid() != 0:
+            raise HelperError("LocalHelper needs root unless dry_run is set")
+        self.server = HelperServer(None, os.getuid(), dry_run)
+        self._next_id = 0
+
+    def batch(self, ops, on_line=None, background=False, on_request=None):
+        self._next_id += 1
+        if on_request is not None:
+            on_request(self._next_id)
+        results = []
+
+        def send(message):
+            if message["event"] == "line" and on_line:
+                on_line(message["line"])
+            elif message["event"] == "result":
+                results.append(message)
+
+        self.server.execute(self._next_id, [{"op": op, "args": args} for op, args in ops], send, background)
+        return _check_results(ops, results)
+
+    def call(self, op, on_line=None, **args):
+        return self.batch([(op, args)], on_line)[0]
+
+    def cancel(self, request_id=None):
+        self.server.cancel(request_id or self._next_id)
+
+    def pause(self, request_id=None):
+        self.server.pause(request_id or self._next_id)
+
+    def resume(self, request_id=None):
+        self.server.resume(request_id or self._next_id)
+
+    def close(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sys_main privileged helper")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--uid", type=int, required=True)
+    parser.add_argument("--dry-run", action="store_true", help="run without root and only report what would be done")
+    parser.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    if not args.dry_run and os.geteuid() != 0:
+        print("privhelper must run as root (use --dry-run for a local stand-in)", file=sys.stderr)
+        return 1
+
+    try:
+        HelperServer(args.socket, args.uid, args.dry_run, args.idle_timeout).serve()
+    except HelperError as e:
+        print(f"privhelper: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
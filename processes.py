@@ -0,0 +1,179 @@
+import heapq
+import os
+import signal
+import time
+from collections import namedtuple
+
+import psutil
+
+# Live process table. Static fields (name, user, command line) are read once
+# per process through psutil's oneshot(); each refresh then only reads the
+# changing counters from /proc/<pid>/stat with a single read per process.
+# A process is identified by (pid, start time), so a recycled PID is treated
+# as a new process.
+
+PROC_ROOT = "/proc"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+TOP_N = 50
+
+ProcessRow = namedtuple("ProcessRow", ["pid", "name", "username", "cmdline", "cpu_percent", "memory_percent", "rss", "nice", "started"])
+
+
+def read_stat(pid, proc_root=PROC_ROOT):
+    # Returns (cpu ticks, start time, rss pages, nice) or None if it exited
+    try:
+        fd = os.open(f"{proc_root}/{pid}/stat", os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        data = os.read(fd, 1024)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    # comm may contain spaces and parentheses; fields restart after the last ")"
+    fields = data[data.rfind(b")") + 2:].split()
+    if len(fields) < 22:
+        return None
+    return int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21]), int(fields[16])
+
+
+def _static_fields(pid):
+    process = psutil.Process(pid)
+    with process.oneshot():
+        return process.name(), process.username(), " ".join(process.cmdline())
+
+
+class ProcessTable:
+    def __init__(self, proc_root=PROC_ROOT):
+        self.proc_root = proc_root
+        self.total_memory = psutil.virtual_memory().total
+        self.static = {}    # (pid, start) -> (name, username, cmdline)
+        self.counters = {}  # pid -> (start, cpu ticks)
+        self.rows = []
+        self.last_refresh = None
+        self.refresh_cost = 0.0
+
+    def refresh(self):
+        start = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self.last_refresh if self.last_refresh is not None else None
+        counters = {}
+        rows = []
+        scale = 100 / CLOCK_TICKS / elapsed if elapsed else 0.0
+        for name in os.listdir(self.proc_root):
+            if not name.isdigit():
+                continue
+            pid = int(name)
+            stat = read_stat(pid, self.proc_root)
+            if stat is None:
+                continue
+            ticks, started, rss_pages, nice = stat
+            key = (pid, started)
+            static = self.static.get(key)
+            if static is None:
+                try:
+                    static = self.static[key] = _static_fields(pid)
+                except psutil.Error:
+                    continue
+            counters[pid] = (started, ticks)
+
+            cpu_percent = 0.0
+            previous = self.counters.get(pid)
+            if elapsed and previous is not None and previous[0] == started:
+                cpu_percent = (ticks - previous[1]) * scale
+            # Rows stay plain tuples; ProcessRow is only built for what top() returns
+            rows.append((cpu_percent, rss_pages, pid, nice, started, static))
+
+        # Forget processes that exited
+        if len(self.static) > len(counters):
+            alive = {(pid, started) for pid, (started, _) in counters.items()}
+            for key in [key for key in self.static if key not in alive]:
+                del self.static[key]
+        self.counters = counters
+        self.rows = rows
+        self.last_refresh = now
+        self.refresh_cost = time.perf_counter() - start
+        return len(rows)
+
+    def top(self, n=TOP_N, by="cpu"):
+        # Partial sort: O(len(rows) log n) instead of sorting every process
+        if by == "cpu":
+            rows = heapq.nlargest(n, self.rows)
+        else:
+            rows = heapq.nlargest(n, self.rows, key=lambda row: row[1])
+        return [self._row(row) for row in rows]
+
+    def _row(self, row):
+        cpu_percent, rss_pages, pid, nice, started, (name, username, cmdline) = row
+        rss = rss_pages * PAGE_SIZE
+        return ProcessRow(pid, name, username, cmdline, cpu_percent, rss * 100 / self.total_memory, rss, nice, started)
+
+
+def protected_pids():
+    # Never signal init, this app or the session's ancestors (shell, compositor)
+    pids = {1, os.getpid()}
+    try:
+        for parent in psutil.Process().parents():
+            pids.add(parent.pid)
+    except psutil.Error:
+        pass
+    return pids
+
+
+def same_process(pid, started, proc_root=PROC_ROOT):
+    # False once the process has exited, even if its PID has been reused since
+    stat = read_stat(pid, proc_root)
+    return stat is not None and stat[1] == started
+
+
+def signal_processes(processes, sig=signal.SIGTERM, proc_root=PROC_ROOT):
+    # Takes (pid, start time) pairs from the table and returns {pid: error
+    # message} for the processes that could not be signalled. The start time
+    # is checked after opening a pidfd, so a PID recycled since the table was
+    # read is never signalled.
+    errors = {}
+    protected = protected_pids()
+    for pid, started in processes:
+        if pid in protected:
+            errors[pid] = "protected process"
+            continue
+        try:
+            pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+        except ProcessLookupError:
+            continue
+        except OSError:
+            pidfd = None  # kernels before 5.3
+        try:
+            if not same_process(pid, started, proc_root):
+                continue
+            if pidfd is not None:
+                signal.pidfd_send_signal(pidfd, sig)
+            else:
+                os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            errors[pid] = "permission denied"
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+    return errors
+
+
+def renice_processes(processes, increment, proc_root=PROC_ROOT):
+    # Raising priority (negative increment) needs root; lowering it does not.
+    # Takes (pid, start time) pairs like signal_processes.
+    errors = {}
+    for pid, started in processes:
+        if not same_process(pid, started, proc_root):
+            continue
+        try:
+            nice = os.getpriority(os.PRIO_PROCESS, pid)
+            os.setpriority(os.PRIO_PROCESS, pid, max(-20, min(19, nice + increment)))
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            errors[pid] = "permission denied"
+    return errors
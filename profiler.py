@@ -0,0 +1,244 @@
+import atexit
+import json
+import os
+import subprocess
+import threading
+import time
+from array import array
+
+# Main-loop stall profiler, enabled with SYS_MAIN_PROFILE=1. install() wraps
+# every signal handler connected afterwards and every timeout/idle callback
+# added afterwards, and records each call's wall time and the processes it
+# started. Calls land in fixed-size arrays indexed by a running counter.
+# Only the main loop writes them, so there is no lock. Calls over
+# FRAME_BUDGET are printed as they happen. The trace is written as Chrome
+# trace JSON at exit (open it in chrome://tracing or ui.perfetto.dev), and
+# create_overlay() shows the worst offenders in the window.
+
+FRAME_BUDGET = 0.016  # seconds
+CAPACITY = 20000
+OVERLAY_ROWS = 5
+
+
+def default_output_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "sys_main", f"profile-{os.getpid()}.json")
+
+
+def describe(callback):
+    name = getattr(callback, "__qualname__", None) or repr(callback)
+    code = getattr(callback, "__code__", None)
+    if code is None:
+        return name
+    # Wrappers such as run_on_main's callback say little; name what they wrap
+    for cell in callback.__closure__ or ():
+        try:
+            inner = cell.cell_contents
+        except ValueError:
+            continue
+        if callable(inner) and hasattr(inner, "__qualname__"):
+            name += f"({inner.__qualname__})"
+            break
+    return f"{name} [{os.path.basename(code.co_filename)}:{code.co_firstlineno}]"
+
+
+class StallProfiler:
+    def __init__(self, capacity=CAPACITY, budget=FRAME_BUDGET):
+        self.capacity = capacity
+        self.budget = budget
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.starts = array("d", bytes(8 * capacity))
+        self.durations = array("d", bytes(8 * capacity))
+        self.forks = array("L", bytes(array("L").itemsize * capacity))
+        self.name_ids = array("L", bytes(array("L").itemsize * capacity))
+        self.count = 0
+        self.names = []
+        self._name_index = {}
+        # name id -> [calls, total seconds, max seconds, stalls, forks]
+        self.totals = {}
+        self.main_forks = 0
+        self._originals = []
+
+    def install(self):
+        from gi.repository import GLib, GObject
+
+        if self.enabled:
+            return self
+        self.enabled = True
+        profiler = self
+        main_thread = threading.main_thread()
+
+        def wrap_connect(original):
+            def connect(obj, detailed_signal, handler, *args):
+                name = f"{type(obj).__name__}::{detailed_signal} → {describe(handler)}"
+                return original(obj, detailed_signal, profiler.wrap(handler, name, "signal"), *args)
+            return connect
+
+        def wrap_source(original, kind):
+            def add(*args, **kwargs):
+                # (interval, function, *data) for timeouts, (function, *data) for idle
+                position = 0 if kind == "idle" else 1
+                function = args[position]
+                label = kind if kind == "idle" else f"{kind} {args[0]}"
+                wrapped = profiler.wrap(function, f"{label} → {describe(function)}", kind)
+                return original(*args[:position], wrapped, *args[position + 1:], **kwargs)
+            return add
+
+        class CountingPopen(subprocess.Popen):
+            def __init__(self, *args, **kwargs):
+                if threading.current_thread() is main_thread:
+                    profiler.main_forks += 1
+                super().__init__(*args, **kwargs)
+
+        self._originals = [(owner, attribute, getattr(owner, attribute)) for owner, attribute in (
+            (GObject.Object, "connect"), (GObject.Object, "connect_after"),
+            (GLib, "timeout_add"), (GLib, "timeout_add_seconds"), (GLib, "idle_add"),
+            (subprocess, "Popen"),
+        )]
+        GObject.Object.connect = wrap_connect(GObject.Object.connect)
+        GObject.Object.connect_after = wrap_connect(GObject.Object.connect_after)
+        GLib.timeout_add = wrap_source(GLib.timeout_add, "timeout")
+        GLib.timeout_add_seconds = wrap_source(GLib.timeout_add_seconds, "timeout_seconds")
+        GLib.idle_add = wrap_source(GLib.idle_add, "idle")
+        subprocess.Popen = CountingPopen
+        atexit.register(self._export_at_exit)
+        print(f"Profiling main-loop callbacks; calls over {self.budget * 1000:.0f} ms are reported")
+        return self
+
+    def uninstall(self):
+        for owner, attribute, original in self._originals:
+            setattr(owner, attribute, original)
+        self._originals = []
+        self.enabled = False
+        atexit.unregister(self._export_at_exit)
+
+    def original(self, owner, attribute):
+        # The unwrapped function, for the profiler's own timers
+        for patched_owner, patched_attribute, original in self._originals:
+            if patched_owner is owner and patched_attribute == attribute:
+                return original
+        return getattr(owner, attribute)
+
+    def _name_id(self, name):
+        name_id = self._name_index.get(name)
+        if name_id is None:
+            name_id = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def wrap(self, callback, name, kind):
+        # Called on any thread (workers add idle callbacks through
+        # run_on_main), so the name id is assigned on the first call, which
+        # runs on the main loop like every other write to the tables
+        name_id = None
+
+        def profiled(*args):
+            nonlocal name_id
+            if name_id is None:
+                name_id = self._name_id(name)
+            forks = self.main_forks
+            start = time.perf_counter()
+            try:
+                return callback(*args)
+            finally:
+                self.record(name_id, start, time.perf_counter() - start, self.main_forks - forks)
+
+        profiled.__qualname__ = getattr(callback, "__qualname__", name)
+        return profiled
+
+    def record(self, name_id, start, duration, forks):
+        index = self.count % self.capacity
+        self.starts[index] = start - self.origin
+        self.durations[index] = duration
+        self.forks[index] = forks
+        self.name_ids[index] = name_id
+        self.count += 1
+
+        totals = self.totals.setdefault(name_id, [0, 0.0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += duration
+        totals[2] = max(totals[2], duration)
+        totals[4] += forks
+        if duration > self.budget:
+            totals[3] += 1
+            print(f"Stall: {duration * 1000:.1f} ms, {forks} processes in {self.names[name_id]}")
+
+    def events(self):
+        # Recorded calls, oldest first, as (name, start, duration, forks)
+        n = min(self.count, self.capacity)
+        first = self.count - n
+        return [(self.names[self.name_ids[i % self.capacity]], self.starts[i % self.capacity],
+                 self.durations[i % self.capacity], self.forks[i % self.capacity]) for i in range(first, first + n)]
+
+    def worst(self, limit=OVERLAY_ROWS):
+        # [(name, calls, total, max, stalls, forks)] by longest single call
+        ranked = sorted(self.totals.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [(self.names[name_id], *totals) for name_id, totals in ranked]
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        tid = threading.main_thread().ident
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "sys_main"}}]
+        for name, start, duration, forks in self.events():
+            events.append({
+                "name": name,
+                "cat": "stall" if duration > self.budget else "callback",
+                "ph": "X",
+                "ts": round(start * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {"processes": forks},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path=None):
+        path = path or os.environ.get("SYS_MAIN_PROFILE_OUTPUT") or default_output_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.chrome_trace(), f)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def _export_at_exit(self):
+        if not self.count:
+            return
+        try:
+            print(f"Profile written to {self.export()}")
+        except OSError as e:
+            print(f"Failed to write profile: {e}")
+
+    def format_worst(self, limit=OVERLAY_ROWS):
+        lines = [f"{'max':>8} {'avg':>8} {'calls':>6} {'over':>5} {'procs':>5}  callback"]
+        for name, calls, total, longest, stalls, forks in self.worst(limit):
+            lines.append(f"{longest * 1000:6.1f}ms {total / calls * 1000:6.1f}ms {calls:>6} {stalls:>5} {forks:>5}  {name}")
+        return "\n".join(lines)
+
+    def create_overlay(self, child):
+        # Wraps child in an overlay listing the worst callbacks, refreshed
+        # by an unprofiled timer so it does not show up in its own list
+        from gi.repository import GLib, Gtk, Pango
+
+        overlay = Gtk.Overlay()
+        overlay.set_child(child)
+        label = Gtk.Label()
+        label.add_css_class("osd")
+        label.add_css_class("monospace")
+        label.set_halign(Gtk.Align.END)
+        label.set_valign(Gtk.Align.END)
+        label.set_xalign(0)
+        label.set_margin_end(10)
+        label.set_margin_bottom(60)
+        label.set_ellipsize(Pango.EllipsizeMode.END)
+        label.set_max_width_chars(80)
+        label.set_can_target(False)
+        overlay.add_overlay(label)
+
+        def refresh():
+            label.set_text(self.format_worst())
+            return True
+
+        refresh()
+        self.original(GLib, "timeout_add_seconds")(1, refresh)
+        return overlay
@@ -0,0 +1,456 @@
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+import maintenance
+import power
+from jobs import JobCancelled
+from swap import read_pressure
+
+# Background maintenance. Due tasks are queued and a task only starts while
+# all of these hold:
+# - the machine is on AC power,
+# - the machine is lightly loaded and not stalled on CPU or I/O,
+# - the user is idle.
+# When that stops being true the running task is paused: its command is
+# stopped with SIGSTOP, or it is held between steps and download chunks. It
+# resumes once the conditions hold again. The limits for pausing are looser
+# than those for starting, so the task's own load does not stop it.
+# Everything runs at nice 19 and idle I/O priority. The queue and each
+# task's last run are kept on disk, so a task interrupted by a restart runs
+# again. The clock and the probe are parameters, so simulated time and load
+# can drive the scheduler.
+
+PROC_ROOT = "/proc"
+CHECK_INTERVAL = 30  # seconds between tick() calls
+STATE_VERSION = 1
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Start only below these, pause above the PAUSE_ ones
+MAX_LOAD = 0.5  # 1-minute load average per CPU
+MAX_PRESSURE = 10.0  # PSI "some" avg10 of CPU and I/O, percent
+MIN_IDLE = 5 * 60  # seconds since the last user input
+PAUSE_LOAD = 0.9
+PAUSE_PRESSURE = 40.0
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = HOUR
+# How the user gets a helper authenticated, for tasks deferred without one
+HELPER_HINT = "run a maintenance task once to authenticate"
+
+LOGIND = "org.freedesktop.login1"
+LOGIND_SESSION = "/org/freedesktop/login1/session/auto"
+
+Task = namedtuple("Task", ["name", "period", "steps", "description"])
+Conditions = namedtuple("Conditions", ["ok", "reasons"])
+
+
+class NeedsHelper(Exception):
+    # Privileged steps with no authenticated helper; nobody is around to
+    # type a password, so the task waits for one
+    pass
+
+
+def default_state_path():
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state_home, "sys_main", "schedule.json")
+
+
+def prefetch_updates_steps():
+    import updates
+    from capabilities import get_capabilities
+
+    family = maintenance.distro_family()
+    if family is None:
+        return []
+
+    def prefetch(on_line, cancelled):
+        # Planned when the step runs, after the package lists are refreshed
+        plan = updates.plan_updates(family, get_capabilities())
+        on_line(updates.format_plan(plan)[-1])
+        for _, (description, download) in updates.prefetch_steps(plan):
+            on_line(f"# {description}")
+            download(on_line, cancelled)
+
+    return updates.refresh_steps(family) + [("call", ("download pending updates", prefetch))]
+
+
+TASKS = (
+    Task("prefetch-updates", DAY, prefetch_updates_steps, "Download pending updates"),
+    Task("clean-tmp", DAY, maintenance.clean_tmp_steps, "Remove old temporary files"),
+    Task("clean-cache", 7 * DAY, maintenance.clean_cache_steps, "Remove old cached packages"),
+)
+
+
+def logind_idle_seconds():
+    # Seconds since the session went idle, 0 while it is in use, None when
+    # logind cannot tell (no session, no D-Bus)
+    try:
+        from controls import ControlError, Property, get_client
+    except ImportError:
+        return None
+    client = get_client()
+    try:
+        if not client.get(Property(LOGIND, LOGIND_SESSION, "org.freedesktop.login1.Session", "IdleHint", "b")):
+            return 0.0
+        since = client.get(Property(LOGIND, LOGIND_SESSION, "org.freedesktop.login1.Session", "IdleSinceHintMonotonic", "t"))
+    except (ControlError, ImportError):
+        return None
+    # CLOCK_MONOTONIC microseconds, the same clock as time.monotonic()
+    return max(time.monotonic() - since / 1e6, 0.0)
+
+
+class SystemProbe:
+    def __init__(self, proc_root=PROC_ROOT, power_root=power.POWER_SUPPLY_ROOT, idle_source=logind_idle_seconds):
+        self.proc_root = proc_root
+        self.power_root = power_root
+        self.idle_source = idle_source
+
+    def on_ac(self):
+        state = power.read_sysfs_state(self.power_root)
+        # No battery: a desktop, always on mains
+        return state is None or state.plugged
+
+    def load(self):
+        try:
+            with open(os.path.join(self.proc_root, "loadavg")) as f:
+                return float(f.read().split()[0]) / (os.cpu_count() or 1)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def pressure(self):
+        stalls = [(read_pressure(self.proc_root, resource) or {}).get("some", {}).get("avg10") for resource in ("cpu", "io")]
+        stalls = [stall for stall in stalls if stall is not None]
+        return max(stalls) if stalls else None
+
+    def idle_seconds(self):
+        return self.idle_source() if self.idle_source else None
+
+
+def check(probe, running=False):
+    reasons = []
+    if not probe.on_ac():
+        reasons.append("on battery")
+    load_limit, pressure_limit = (PAUSE_LOAD, PAUSE_PRESSURE) if running else (MAX_LOAD, MAX_PRESSURE)
+    load = probe.load()
+    if load is not None and load > load_limit:
+        reasons.append(f"load {load:.2f} per CPU")
+    pressure = probe.pressure()
+    if pressure is not None and pressure > pressure_limit:
+        reasons.append(f"{pressure:.0f}% stalled on CPU or I/O")
+    idle = probe.idle_seconds()
+    if idle is not None and idle < MIN_IDLE:
+        reasons.append("user is active")
+    return Conditions(not reasons, reasons)
+
+
+def set_idle_priority():
+    # nice and the I/O priority are per thread on Linux and inherited by
+    # every process the thread starts
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+    except OSError as e:
+        print(f"Failed to lower CPU priority: {e}")
+    try:
+        subprocess.run(["ionice", "-c", "3", "-p", str(tid)], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Failed to lower I/O priority: {e}")
+
+
+class TaskRun:
+    # One task's steps on a worker thread. pause() stops the running command
+    # and holds the task at its next step; "call" steps see the pause through
+    # their cancelled() callback, which blocks while paused.
+    def __init__(self, task, helper, on_line=print, on_finish=None, helper_hint=HELPER_HINT):
+        self.task = task
+        self.helper = helper
+        self.helper_hint = helper_hint
+        self.on_line = on_line
+        self.on_finish = on_finish
+        self.status = "running"
+        self.error = None
+        self.interrupted = False
+        self._paused = False
+        self._cancelled = False
+        self._proc = None
+        # The helper batch this task is running, once the client has sent it
+        self._request_id = None
+        self._cond = threading.Condition()
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def cancelled(self):
+        with self._cond:
+            while self._paused and not self._cancelled:
+                self._cond.wait()
+            return self._cancelled
+
+    def _signal(self, signum):
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signum)
+            except OSError:
+                pass
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+            self._signal(signal.SIGSTOP)
+            if self._request_id is not None:
+                self.helper.pause(self._request_id)
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+            self._signal(signal.SIGCONT)
+            if self._request_id is not None:
+                self.helper.resume(self._request_id)
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            self._paused = False
+            self._cond.notify_all()
+            self._signal(signal.SIGTERM)
+            # A stopped process only acts on SIGTERM once it runs again
+            self._signal(signal.SIGCONT)
+            if self._request_id is not None:
+                self.helper.cancel(self._request_id)
+
+    def run(self):
+        set_idle_priority()
+        try:
+            for kind, payload in self.task.steps():
+                if self.cancelled():
+                    raise JobCancelled(self.task.name)
+                if kind == "privileged":
+                    self._run_privileged(payload)
+                elif kind == "call":
+                    self.on_line(f"# {payload[0]}")
+                    payload[1](self.on_line, self.cancelled)
+                else:
+                    self._run_user(payload)
+            self.status = "cancelled" if self._cancelled else "done"
+        except JobCancelled:
+            self.status = "cancelled"
+        except NeedsHelper as e:
+            self.status = "deferred"
+            self.error = str(e)
+        except Exception as e:
+            self.status = "cancelled" if self._cancelled else "failed"
+            self.error = str(e)
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+    def _run_privileged(self, ops):
+        if self.helper is None or not self.helper.connected:
+            raise NeedsHelper(f"needs the privileged helper; {self.helper_hint}")
+
+        def on_request(request_id):
+            # Called once the client holds its lock, so a user's batch still
+            # waiting ahead of this one is never paused or cancelled instead
+            with self._cond:
+                self._request_id = request_id
+                if self._cancelled:
+                    self.helper.cancel(request_id)
+                elif self._paused:
+                    self.helper.pause(request_id)
+
+        try:
+            self.helper.batch(ops, self.on_line, background=True, on_request=on_request)
+        finally:
+            with self._cond:
+                self._request_id = None
+
+    def _run_user(self, args):
+        self.on_line("$ " + " ".join(args))
+        with self._cond:
+            self._proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                          text=True, bufsize=1, start_new_session=True)
+            if self._paused:
+                self._signal(signal.SIGSTOP)
+        for line in self._proc.stdout:
+            self.on_line(line.rstrip("\n"))
+        returncode = self._proc.wait()
+        with self._cond:
+            self._proc = None
+        if self._cancelled:
+            raise JobCancelled(self.task.name)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args)
+
+
+class Scheduler:
+    # helper() returns an authenticated helper or None. tick() is called
+    # every CHECK_INTERVAL seconds by the GUI's main loop or the CLI's loop.
+    def __init__(self, tasks=TASKS, probe=None, clock=time.time, helper=lambda: None, state_path=None,
+                 spawn=None, on_line=print, on_change=None, busy=lambda: False, helper_hint=HELPER_HINT):
+        self.tasks = {task.name: task for task in tasks}
+        self.probe = probe or SystemProbe()
+        self.clock = clock
+        self.helper = helper
+        self.helper_hint = helper_hint
+        self.state_path = state_path or default_state_path()
+        self.spawn = spawn or (lambda func: threading.Thread(target=func, name="scheduler", daemon=True).start())
+        self.on_line = on_line
+        self.on_change = on_change
+        # True while the user has maintenance jobs of their own running
+        self.busy = busy
+        # name -> {"time": wall clock, "status": "done" | "failed", "error": str}
+        self.last_run = {}
+        # [{"name", "queued_at", "attempts", "not_before"}], oldest first
+        self.queue = []
+        self.current = None
+        self.conditions = None
+        # Reentrant: save() and _start() also run with it held
+        self._lock = threading.RLock()
+
+    def load(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if state.get("version") != STATE_VERSION:
+            return self
+        self.last_run = {name: run for name, run in state.get("last_run", {}).items() if name in self.tasks}
+        # An entry with started_at was running when the app stopped; it runs again
+        self.queue = [entry for entry in state.get("queue", []) if entry.get("name") in self.tasks]
+        return self
+
+    def save(self):
+        with self._lock:
+            state = {"version": STATE_VERSION, "last_run": self.last_run, "queue": self.queue}
+            data = json.dumps(state, indent=2)
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(self.state_path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(self.state_path + ".tmp", self.state_path)
+        except OSError as e:
+            print(f"Failed to save the maintenance schedule: {e}")
+
+    def enqueue(self, name, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            if any(entry["name"] == name for entry in self.queue):
+                return False
+            self.queue.append({"name": name, "queued_at": now, "attempts": 0, "not_before": now})
+        self.save()
+        self._changed()
+        return True
+
+    def due(self, now=None):
+        # Names of the tasks whose period has passed; queues and saves nothing
+        now = self.clock() if now is None else now
+        with self._lock:
+            return [task.name for task in self.tasks.values()
+                    if self.last_run.get(task.name, {}).get("time") is None
+                    or now - self.last_run[task.name]["time"] >= task.period]
+
+    def enqueue_due(self, now=None):
+        now = self.clock() if now is None else now
+        for name in self.due(now):
+            self.enqueue(name, now)
+
+    def tick(self):
+        now = self.clock()
+        self.enqueue_due(now)
+        with self._lock:
+            run = self.current
+        if run is not None:
+            self.conditions = check(self.probe, running=True)
+            if not self.conditions.ok and not run.paused:
+                self.on_line(f"Pausing {run.task.name}: {', '.join(self.conditions.reasons)}")
+                run.pause()
+                self._changed()
+            elif self.conditions.ok and run.paused:
+                self.on_line(f"Resuming {run.task.name}")
+                run.resume()
+                self._changed()
+            return
+
+        with self._lock:
+            due = any(entry.get("not_before", 0) <= now for entry in self.queue)
+        # The probe may wait on D-Bus, so it runs outside the lock
+        conditions = check(self.probe) if due else None
+        if conditions is not None and self.busy():
+            conditions = Conditions(False, conditions.reasons + ["a maintenance job is running"])
+        run = None
+        with self._lock:
+            self.conditions = conditions
+            # Ticks run on their own threads; only one may start a task
+            if conditions is not None and conditions.ok and self.current is None:
+                entry = next((entry for entry in self.queue if entry.get("not_before", 0) <= now), None)
+                if entry is not None:
+                    run = self._start(entry, now)
+        if run is not None:
+            self.on_line(f"Starting {run.task.name}: {run.task.description}")
+            self.spawn(run.run)
+        self._changed()
+
+    def _start(self, entry, now):
+        # Called with the lock held; the caller spawns the run
+        entry["attempts"] = entry.get("attempts", 0) + 1
+        entry["started_at"] = now
+        self.current = TaskRun(self.tasks[entry["name"]], self.helper(), self.on_line, self._finished, self.helper_hint)
+        self.save()
+        return self.current
+
+    def _finished(self, run):
+        now = self.clock()
+        with self._lock:
+            self.current = None
+            entry = next((entry for entry in self.queue if entry["name"] == run.task.name), None)
+            if entry is not None:
+                entry.pop("started_at", None)
+                if run.status == "done" or (run.status == "failed" and entry["attempts"] >= MAX_ATTEMPTS):
+                    self.queue.remove(entry)
+                    self.last_run[run.task.name] = {"time": now, "status": run.status, "error": run.error}
+                elif run.status == "failed":
+                    entry["not_before"] = now + RETRY_DELAY
+                else:
+                    # Deferred for a helper, or interrupted: not the task's fault
+                    entry["attempts"] -= 1
+                    entry["not_before"] = now + (RETRY_DELAY if run.status == "deferred" else 0)
+        message = f"{run.task.name}: {run.status}"
+        self.on_line(f"{message} ({run.error})" if run.error else message)
+        self.save()
+        self._changed()
+
+    def interrupt(self):
+        # Gives way to work the user started; the task goes back to the queue
+        with self._lock:
+            run = self.current
+        if run is not None:
+            run.interrupted = True
+            run.cancel()
+
+    def status_text(self):
+        with self._lock:
+            run = self.current
+            waiting = [entry["name"] for entry in self.queue if not (run and entry["name"] == run.task.name)]
+        if run is not None:
+            if run.paused and self.conditions:
+                return f"{run.task.description}: paused ({', '.join(self.conditions.reasons)})"
+            return f"{run.task.description}: running in the background"
+        if not waiting:
+            return "No maintenance due"
+        text = f"Waiting to run: {', '.join(waiting)}"
+        if self.conditions and not self.conditions.ok:
+            text += f" ({', '.join(self.conditions.reasons)})"
+        return text
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
@@ -0,0 +1,152 @@
+import os
+import re
+from collections import namedtuple
+
+HWMON_ROOT = "/sys/class/hwmon"
+
+# hwmon driver names grouped by what they measure
+CPU_CHIPS = ("coretemp", "k10temp", "zenpower", "cpu_thermal")
+GPU_CHIPS = ("amdgpu", "radeon", "nouveau", "i915", "xe")
+DISK_CHIPS = ("nvme", "drivetemp")
+FAN_CHIPS = ("asus", "asus_custom_fan_curve", "asus_wmi_sensors", "asusec", "thinkpad", "dell_smm")
+
+# Preferred channel labels, best first
+CPU_TEMP_LABELS = ("Package id 0", "Tctl", "Tdie", "CPU")
+GPU_TEMP_LABELS = ("edge", "junction", "GPU")
+DISK_TEMP_LABELS = ("Composite",)
+
+INPUT_RE = re.compile(r"^(temp|fan)(\d+)_input$")
+
+Channel = namedtuple("Channel", ["chip", "kind", "label", "path"])
+Reading = namedtuple("Reading", ["chip", "kind", "label", "value"])
+SensorSnapshot = namedtuple("SensorSnapshot", ["cpu_temp", "gpu_temp", "disk_temp", "cpu_fan", "gpu_fan", "readings"])
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def chip_kind(name):
+    if name in CPU_CHIPS:
+        return "cpu"
+    if name in GPU_CHIPS:
+        return "gpu"
+    if name in DISK_CHIPS:
+        return "disk"
+    if name in FAN_CHIPS:
+        return "fan"
+    return "other"
+
+
+def discover_channels(root=HWMON_ROOT):
+    channels = []
+    try:
+        entries = sorted(os.scandir(root), key=lambda e: e.name)
+    except OSError:
+        return channels
+
+    for entry in entries:
+        chip = _read_text(os.path.join(entry.path, "name")) or entry.name
+        try:
+            files = sorted(os.listdir(entry.path))
+        except OSError:
+            continue
+        for fname in files:
+            match = INPUT_RE.match(fname)
+            if not match:
+                continue
+            kind, index = match.groups()
+            label = _read_text(os.path.join(entry.path, f"{kind}{index}_label")) or f"{kind}{index}"
+            channels.append(Channel(chip, kind, label, os.path.join(entry.path, fname)))
+    return channels
+
+
+class SensorReader:
+    # Discovers hwmon channels once and keeps their *_input files open so each
+    # refresh is a pread() per channel instead of a `sensors` process.
+    def __init__(self, root=HWMON_ROOT):
+        self.root = root
+        self.channels = []
+        self._fds = []
+        self.discover()
+
+    def discover(self):
+        self.close()
+        for channel in discover_channels(self.root):
+            try:
+                fd = os.open(channel.path, os.O_RDONLY)
+            except OSError as e:
+                print(f"Failed to open sensor {channel.path}: {e}")
+                continue
+            self.channels.append(channel)
+            self._fds.append(fd)
+
+    def close(self):
+        for fd in self._fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.channels = []
+        self._fds = []
+
+    def read(self):
+        readings = []
+        for channel, fd in zip(self.channels, self._fds):
+            try:
+                raw = int(os.pread(fd, 32, 0))
+            except (OSError, ValueError):
+                # Suspended devices (dGPU, NVMe in D3) refuse reads; skip them
+                continue
+            value = raw / 1000 if channel.kind == "temp" else raw
+            readings.append(Reading(channel.chip, channel.kind, channel.label, value))
+        return make_snapshot(readings)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pick(readings, kind, group, labels):
+    candidates = [r for r in readings if r.kind == kind and chip_kind(r.chip) == group]
+    for label in labels:
+        for reading in candidates:
+            if reading.label == label:
+                return reading.value
+    return candidates[0].value if candidates else None
+
+
+def _pick_fan(readings, name):
+    fans = [r for r in readings if r.kind == "fan"]
+    for reading in fans:
+        if name in reading.label.lower():
+            return reading.value
+    # Unlabelled fans: asus-nb-wmi and most laptop drivers expose the CPU fan first
+    index = 0 if name == "cpu" else 1
+    unlabelled = [r for r in fans if r.label.startswith("fan")]
+    return unlabelled[index].value if len(unlabelled) > index else None
+
+
+def make_snapshot(readings):
+    return SensorSnapshot(
+        cpu_temp=_pick(readings, "temp", "cpu", CPU_TEMP_LABELS),
+        gpu_temp=_pick(readings, "temp", "gpu", GPU_TEMP_LABELS),
+        disk_temp=_pick(readings, "temp", "disk", DISK_TEMP_LABELS),
+        cpu_fan=_pick_fan(readings, "cpu"),
+        gpu_fan=_pick_fan(readings, "gpu"),
+        readings=tuple(readings),
+    )
+
+
+def format_temp(value):
+    return "N/A" if value is None else f"{value:.1f}°C"
+
+
+def format_fan(value):
+    return "N/A" if value is None else f"{value} RPM"
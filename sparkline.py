@@ -0,0 +1,119 @@
+import cairo
+from gi.repository import Gtk
+
+WINDOW = 600  # seconds across the full width
+
+
+class Sparkline(Gtk.DrawingArea):
+    # Draws the last `window` seconds of a metric's history, placed by
+    # timestamp, so the width always spans the same time whatever the
+    # sampling interval. The plot is cached in an offscreen surface: a new
+    # sample scrolls it left by the time since the previous one and only the
+    # new segment is stroked. Full redraws happen on resize, re-map or rescale.
+    def __init__(self, history, lower=0, upper=None, height=36, window=WINDOW):
+        super().__init__()
+        self.history = history
+        self.window = window
+        self.lower = lower
+        self.fixed_upper = upper
+        self.upper = upper if upper is not None else 1
+        self.set_content_height(height)
+        self.set_hexpand(True)
+        self._surface = None
+        self._spare = None
+        self._size = None
+        self._dirty = True
+        self._last = None
+        # Sub-pixel scroll carried over to the next sample
+        self._residual = 0.0
+        self.set_draw_func(self._draw)
+        self.connect("map", lambda *_: self.invalidate())
+
+    def invalidate(self):
+        self._dirty = True
+        self.queue_draw()
+
+    def push(self):
+        # Call after the history received a new sample
+        latest = self.history.latest()
+        if latest is None:
+            return
+        value = latest[1]
+        if self.fixed_upper is None and value > self.upper:
+            self.upper = value * 1.2
+            self._dirty = True
+        if not self._dirty and self._surface is not None:
+            self._scroll_and_draw(*latest)
+        self.queue_draw()
+
+    def _x(self, timestamp, now, width):
+        return width - 1 - (now - timestamp) * (width - 1) / self.window
+
+    def _color(self):
+        color = self.get_color() if hasattr(self, "get_color") else None
+        if color is None:
+            return 0.2, 0.5, 0.9
+        return color.red, color.green, color.blue
+
+    def _y(self, value, height):
+        span = (self.upper - self.lower) or 1
+        fraction = min(max((value - self.lower) / span, 0), 1)
+        return height - 2 - fraction * (height - 4)
+
+    def _new_surface(self, width, height):
+        return cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+
+    def _redraw_all(self, width, height):
+        self._size = (width, height)
+        self._surface = self._new_surface(width, height)
+        self._spare = self._new_surface(width, height)
+        latest = self.history.latest()
+        # The newest sample is the right edge
+        samples = self.history.series(self.window, latest[0]) if latest else []
+        if self.fixed_upper is None and samples:
+            self.upper = max(max(value for _, value in samples) * 1.2, 1)
+
+        cr = cairo.Context(self._surface)
+        cr.set_source_rgb(*self._color())
+        cr.set_line_width(1.5)
+        for i, (timestamp, value) in enumerate(samples):
+            point = (self._x(timestamp, latest[0], width), self._y(value, height))
+            if i == 0:
+                cr.move_to(*point)
+            else:
+                cr.line_to(*point)
+        cr.stroke()
+        self._last = samples[-1] if samples else None
+        self._residual = 0.0
+        self._dirty = False
+
+    def _scroll_and_draw(self, timestamp, value):
+        width, height = self._size
+        if self._last is None or timestamp <= self._last[0]:
+            return
+        # Whole pixels only, so repeated scrolls do not blur the plot
+        shift = (timestamp - self._last[0]) * (width - 1) / self.window + self._residual
+        if shift >= width:
+            self.invalidate()
+            return
+        pixels = int(shift)
+        self._residual = shift - pixels
+
+        cr = cairo.Context(self._spare)
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        cr.set_source_surface(self._surface, -pixels, 0)
+        cr.paint()
+        cr.set_operator(cairo.OPERATOR_OVER)
+        cr.set_source_rgb(*self._color())
+        cr.set_line_width(1.5)
+        cr.move_to(width - 1 - shift, self._y(self._last[1], height))
+        cr.line_to(width - 1, self._y(value, height))
+        cr.stroke()
+        self._last = (timestamp, value)
+        self._surface, self._spare = self._spare, self._surface
+
+    def _draw(self, area, cr, width, height):
+        if self._dirty or self._surface is None or self._size != (width, height):
+            self._redraw_all(width, height)
+        cr.set_source_surface(self._surface, 0, 0)
+        cr.paint()
@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+
+PHASES = ("imports", "widgets", "probes")
+
+
+class StartupTrace:
+    # Accumulates time per startup phase until the first frame is drawn.
+    # Enabled with --trace-startup; otherwise span() is a no-op.
+    def __init__(self, origin=None):
+        self.origin = time.monotonic() if origin is None else origin
+        self.enabled = False
+        self.finished = False
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self.marks = []
+        self._open = []
+
+    def elapsed(self):
+        return time.monotonic() - self.origin
+
+    @contextmanager
+    def span(self, phase):
+        if not self.enabled or self.finished:
+            yield
+            return
+        start = time.monotonic()
+        self._open.append(phase)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            spent = time.monotonic() - start
+            self.totals[phase] = self.totals.get(phase, 0.0) + spent
+            # Nested spans count only towards the innermost phase
+            if self._open:
+                self.totals[self._open[-1]] -= spent
+
+    def add(self, phase, seconds):
+        if self.enabled and not self.finished:
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    def mark(self, name):
+        if self.enabled and not self.finished:
+            self.marks.append((name, self.elapsed()))
+
+    def finish(self):
+        # Called on the first frame; returns the time to first frame in seconds
+        first_frame = self.elapsed()
+        if self.enabled and not self.finished:
+            self.finished = True
+            print(self.report(first_frame))
+        return first_frame
+
+    def report(self, first_frame):
+        lines = ["Startup trace:"]
+        accounted = 0.0
+        for phase, seconds in self.totals.items():
+            accounted += seconds
+            lines.append(f"  {phase:<10} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'other':<10} {max(first_frame - accounted, 0) * 1000:8.1f} ms")
+        lines.append(f"  {'first frame':<10} {first_frame * 1000:7.1f} ms")
+        for name, at in self.marks:
+            lines.append(f"    @{at * 1000:8.1f} ms  {name}")
+        return "\n".join(lines)
@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import namedtuple
+
+# Swap reclaim planning. swapoff pulls every swapped page back into RAM, so
+# a device is only cycled when its used swap fits in MemAvailable minus a
+# safety margin. Devices go one at a time, highest priority first, and
+# progress comes from polling the device's used swap in /proc/swaps.
+# Everything reads from proc_root so it can run against fake procfs files.
+
+PROC_ROOT = "/proc"
+MIN_MARGIN = 256 * 1024  # kB
+MARGIN_FRACTION = 0.05
+PRESSURE_WARNING = 10.0  # "some" avg10, percent
+POLL_INTERVAL = 1.0
+
+SwapDevice = namedtuple("SwapDevice", ["path", "type", "size", "used", "priority"])
+SwapPlan = namedtuple("SwapPlan", ["devices", "skipped", "available", "margin", "pressure", "warnings"])
+
+
+def read_meminfo(proc_root=PROC_ROOT):
+    # {"MemAvailable": kB, ...}
+    meminfo = {}
+    with open(os.path.join(proc_root, "meminfo")) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields = value.split()
+            if fields:
+                meminfo[key] = int(fields[0])
+    return meminfo
+
+
+def read_swaps(proc_root=PROC_ROOT):
+    devices = []
+    with open(os.path.join(proc_root, "swaps")) as f:
+        next(f, None)  # header
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 5:
+                # Paths with spaces are escaped as \040
+                path = fields[0].replace("\\040", " ")
+                devices.append(SwapDevice(path, fields[1], int(fields[2]), int(fields[3]), int(fields[4])))
+    return devices
+
+
+def read_pressure(proc_root=PROC_ROOT, resource="memory"):
+    # {"some": {"avg10": 0.0, ...}, "full": {...}}; None without PSI support
+    pressure = {}
+    try:
+        with open(os.path.join(proc_root, "pressure", resource)) as f:
+            for line in f:
+                kind, *fields = line.split()
+                pressure[kind] = {key: float(value) for key, value in (field.split("=") for field in fields)}
+    except (OSError, ValueError):
+        return None
+    return pressure
+
+
+def plan_reclaim(proc_root=PROC_ROOT):
+    meminfo = read_meminfo(proc_root)
+    devices = sorted(read_swaps(proc_root), key=lambda device: device.priority, reverse=True)
+    pressure = read_pressure(proc_root)
+    available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+    margin = max(MIN_MARGIN, int(meminfo.get("MemTotal", 0) * MARGIN_FRACTION))
+
+    planned = []
+    skipped = []
+    warnings = []
+    budget = available - margin
+    for device in devices:
+        if device.used == 0:
+            continue
+        if device.used <= budget:
+            planned.append(device)
+            budget -= device.used
+        else:
+            skipped.append(device)
+            warnings.append(f"{device.path}: {device.used // 1024} MiB in use does not fit in {max(budget, 0) // 1024} MiB of free memory")
+
+    some = (pressure or {}).get("some", {}).get("avg10", 0.0)
+    if some >= PRESSURE_WARNING:
+        warnings.append(f"The system is already under memory pressure ({some:.0f}% stalled in the last 10 s)")
+    return SwapPlan(planned, skipped, available, margin, pressure, warnings)
+
+
+class SwapMonitor:
+    # Polls a device's used swap while swapoff runs; on_progress(fraction, text)
+    def __init__(self, device, on_progress, proc_root=PROC_ROOT, interval=POLL_INTERVAL):
+        self.device = device
+        self.on_progress = on_progress
+        self.proc_root = proc_root
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def used(self):
+        for device in read_swaps(self.proc_root):
+            if device.path == self.device.path:
+                return device.used
+        return 0  # already switched off
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            reclaimed = max(self.device.used - self.used(), 0)
+            fraction = min(reclaimed / self.device.used, 1.0) if self.device.used else 1.0
+            self.on_progress(fraction, f"{self.device.path}: {reclaimed // 1024} of {self.device.used // 1024} MiB back in RAM")
+
+
+def reclaim(helper, plan, on_line=print, on_progress=None, proc_root=PROC_ROOT):
+    # helper: anything with batch(ops, on_line), e.g. privhelper.HelperClient
+    for index, device in enumerate(plan.devices, 1):
+        on_line(f"Reclaiming {device.used // 1024} MiB from {device.path} ({index}/{len(plan.devices)})")
+        if on_progress is None:
+            helper.batch([("swap_cycle", {"device": device.path})], on_line)
+            continue
+        with SwapMonitor(device, on_progress, proc_root):
+            helper.batch([("swap_cycle", {"device": device.path})], on_line)
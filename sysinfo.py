@@ -0,0 +1,268 @@
+import json
+import os
+import pwd
+
+# System facts for the About dialog, read from procfs, sysfs and os-release
+# instead of a fetch tool. Facts that cannot change until the next boot
+# (distro, kernel, CPU, board, GPUs, installed memory) are cached on disk
+# under the boot ID; uptime, memory use and load are re-read on every call.
+
+PROC_ROOT = "/proc"
+SYS_ROOT = "/sys"
+OS_RELEASE_PATHS = ("/etc/os-release", "/usr/lib/os-release")
+PCI_IDS_PATHS = ("/usr/share/hwdata/pci.ids", "/usr/share/misc/pci.ids")
+CACHE_VERSION = 1
+
+
+def default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "sys_main", "sysinfo.json")
+
+
+def _read(path):
+    try:
+        with open(path, errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def format_duration(seconds):
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    parts = [f"{days} d"] if days else []
+    if hours or days:
+        parts.append(f"{hours} h")
+    parts.append(f"{minutes} min")
+    return " ".join(parts)
+
+
+def read_os_release(paths=OS_RELEASE_PATHS):
+    for path in paths:
+        text = _read(path)
+        if text is None:
+            continue
+        release = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition("=")
+            if sep and not key.startswith("#"):
+                release[key.strip()] = value.strip().strip("\"'")
+        return release
+    return {}
+
+
+def read_meminfo(proc_root=PROC_ROOT):
+    # {"MemTotal": bytes, ...}
+    meminfo = {}
+    for line in (_read(os.path.join(proc_root, "meminfo")) or "").splitlines():
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[key] = int(fields[0]) * (1024 if fields[1:] == ["kB"] else 1)
+    return meminfo
+
+
+def read_cpu(proc_root=PROC_ROOT, sys_root=SYS_ROOT):
+    model = None
+    threads = 0
+    cores = set()
+    physical_id = None
+    for line in (_read(os.path.join(proc_root, "cpuinfo")) or "").splitlines():
+        key, _, value = line.partition(":")
+        key = key.strip()
+        value = value.strip()
+        if key == "processor":
+            threads += 1
+        elif key in ("model name", "Hardware", "Model", "cpu model") and model is None:
+            model = value
+        elif key == "physical id":
+            physical_id = value
+        elif key == "core id":
+            cores.add((physical_id, value))
+    max_khz = _read(os.path.join(sys_root, "devices", "system", "cpu", "cpu0", "cpufreq", "cpuinfo_max_freq"))
+    return {
+        "model": model or os.uname().machine,
+        "threads": threads or os.cpu_count(),
+        "cores": len(cores) or None,
+        "max_mhz": int(max_khz) // 1000 if max_khz and max_khz.isdigit() else None,
+    }
+
+
+def read_dmi(sys_root=SYS_ROOT):
+    dmi_dir = os.path.join(sys_root, "class", "dmi", "id")
+    fields = ("sys_vendor", "product_name", "product_version", "board_vendor", "board_name", "bios_version")
+    # Placeholder strings firmware vendors leave in unused fields
+    junk = {"", "To be filled by O.E.M.", "Default string", "System Product Name", "Not Applicable", "None"}
+    return {field: value for field in fields if (value := _read(os.path.join(dmi_dir, field))) not in junk and value is not None}
+
+
+def pci_names(ids, ids_paths=PCI_IDS_PATHS):
+    # {(vendor, device): "Vendor Device"} for hex ids like ("8086", "9a49");
+    # one pass over pci.ids for all of them
+    wanted = {}
+    for vendor, device in ids:
+        wanted.setdefault(vendor, set()).add(device)
+    names = {}
+    for path in ids_paths:
+        try:
+            f = open(path, encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with f:
+            vendor = None
+            vendor_name = None
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                if not line.startswith("\t"):
+                    if line.startswith("C "):  # device classes follow the vendors
+                        break
+                    vendor, _, vendor_name = line.strip().partition("  ")
+                    if vendor not in wanted:
+                        vendor = None
+                elif vendor and not line.startswith("\t\t"):
+                    device, _, device_name = line.strip().partition("  ")
+                    if device in wanted[vendor]:
+                        names[(vendor, device)] = f"{vendor_name} {device_name}"
+        break
+    return names
+
+
+def read_gpus(sys_root=SYS_ROOT, ids_paths=PCI_IDS_PATHS):
+    drm_dir = os.path.join(sys_root, "class", "drm")
+    try:
+        # card0, card1, ...; card0-eDP-1 and friends are connectors
+        cards = sorted(name for name in os.listdir(drm_dir) if name.startswith("card") and "-" not in name)
+    except OSError:
+        return []
+    found = []
+    for card in cards:
+        device_dir = os.path.join(drm_dir, card, "device")
+        vendor = (_read(os.path.join(device_dir, "vendor")) or "").removeprefix("0x")
+        device = (_read(os.path.join(device_dir, "device")) or "").removeprefix("0x")
+        try:
+            driver = os.path.basename(os.readlink(os.path.join(device_dir, "driver")))
+        except OSError:
+            driver = None
+        found.append((card, vendor, device, driver))
+    names = pci_names([(vendor, device) for _, vendor, device, _ in found if vendor and device], ids_paths)
+    gpus = []
+    for card, vendor, device, driver in found:
+        name = names.get((vendor, device)) or (f"{vendor}:{device}" if vendor else card)
+        gpus.append(f"{name} ({driver})" if driver else name)
+    return gpus
+
+
+def boot_id(proc_root=PROC_ROOT):
+    return _read(os.path.join(proc_root, "sys", "kernel", "random", "boot_id"))
+
+
+def read_static(proc_root=PROC_ROOT, sys_root=SYS_ROOT, os_release_paths=OS_RELEASE_PATHS):
+    release = read_os_release(os_release_paths)
+    dmi = read_dmi(sys_root)
+    cpu = read_cpu(proc_root, sys_root)
+    uname = os.uname()
+    host = " ".join(dmi[field] for field in ("sys_vendor", "product_name", "product_version") if field in dmi)
+    board = " ".join(dmi[field] for field in ("board_vendor", "board_name") if field in dmi)
+    return {
+        "os": release.get("PRETTY_NAME") or release.get("NAME") or uname.sysname,
+        "kernel": f"{uname.sysname} {uname.release}",
+        "architecture": uname.machine,
+        "host": host or None,
+        "board": board or None,
+        "bios": dmi.get("bios_version"),
+        "cpu": cpu,
+        "gpus": read_gpus(sys_root),
+        "memory_total": read_meminfo(proc_root).get("MemTotal"),
+    }
+
+
+def load_static(proc_root=PROC_ROOT, sys_root=SYS_ROOT, cache_path=None):
+    # Static facts from the cache when it was written during this boot
+    cache_path = cache_path or default_cache_path()
+    current = boot_id(proc_root)
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if current and cached.get("version") == CACHE_VERSION and cached.get("boot_id") == current:
+            return cached["facts"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    facts = read_static(proc_root, sys_root)
+    if current:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path + ".tmp", "w") as f:
+                json.dump({"version": CACHE_VERSION, "boot_id": current, "facts": facts}, f)
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError as e:
+            print(f"Failed to write system information cache: {e}")
+    return facts
+
+
+def read_dynamic(proc_root=PROC_ROOT):
+    meminfo = read_meminfo(proc_root)
+    uptime = _read(os.path.join(proc_root, "uptime"))
+    loadavg = (_read(os.path.join(proc_root, "loadavg")) or "").split()[:3]
+    try:
+        user = pwd.getpwuid(os.getuid()).pw_name
+    except KeyError:
+        user = str(os.getuid())
+    return {
+        "user": user,
+        "hostname": os.uname().nodename,
+        "uptime": float(uptime.split()[0]) if uptime else None,
+        "memory_used": meminfo["MemTotal"] - meminfo.get("MemAvailable", meminfo.get("MemFree", 0)) if "MemTotal" in meminfo else None,
+        "swap_total": meminfo.get("SwapTotal"),
+        "swap_used": meminfo["SwapTotal"] - meminfo.get("SwapFree", 0) if "SwapTotal" in meminfo else None,
+        "load": " ".join(loadavg) or None,
+    }
+
+
+def collect(proc_root=PROC_ROOT, sys_root=SYS_ROOT, cache_path=None):
+    # [(label, value), ...] in display order; unknown facts are left out
+    static = load_static(proc_root, sys_root, cache_path)
+    dynamic = read_dynamic(proc_root)
+    cpu = static["cpu"]
+    cpu_text = cpu["model"]
+    if cpu["cores"] and cpu["cores"] != cpu["threads"]:
+        cpu_text += f" ({cpu['cores']} cores, {cpu['threads']} threads)"
+    elif cpu["threads"]:
+        cpu_text += f" ({cpu['threads']} threads)"
+    if cpu["max_mhz"]:
+        cpu_text += f" @ {cpu['max_mhz'] / 1000:.2f} GHz"
+
+    rows = [
+        ("User", f"{dynamic['user']}@{dynamic['hostname']}"),
+        ("OS", f"{static['os']} {static['architecture']}"),
+        ("Host", static["host"]),
+        ("Board", static["board"]),
+        ("BIOS", static["bios"]),
+        ("Kernel", static["kernel"]),
+        ("Uptime", format_duration(dynamic["uptime"]) if dynamic["uptime"] is not None else None),
+        ("CPU", cpu_text),
+    ]
+    for index, gpu in enumerate(static["gpus"], 1):
+        rows.append(("GPU" if len(static["gpus"]) == 1 else f"GPU {index}", gpu))
+    if static["memory_total"]:
+        used = dynamic["memory_used"] or 0
+        rows.append(("Memory", f"{format_bytes(used)} / {format_bytes(static['memory_total'])} ({used * 100 // static['memory_total']}%)"))
+    if dynamic["swap_total"]:
+        rows.append(("Swap", f"{format_bytes(dynamic['swap_used'])} / {format_bytes(dynamic['swap_total'])}"))
+    rows.append(("Load", dynamic["load"]))
+    return [(label, value) for label, value in rows if value]
+
+
+def format_rows(rows):
+    width = max((len(label) for label, _ in rows), default=0)
+    return "\n".join(f"{label:>{width}}: {value}" for label, value in rows)
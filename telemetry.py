@@ -0,0 +1,137 @@
+import time
+from collections import deque, namedtuple
+
+import psutil
+
+from sensors import SensorReader
+
+# Poll intervals in seconds
+FOCUSED_INTERVAL = 2
+UNFOCUSED_INTERVAL = 10
+MINIMISED_INTERVAL = 30
+
+Snapshot = namedtuple("Snapshot", [
+    "time",
+    "battery_percent",
+    "power_plugged",
+    "cpu_percent",
+    "memory_percent",
+    "memory_available",
+    "disk_percent",
+    "disk_free",
+    "sensors",
+    "tick_cost",
+])
+
+
+class Sampler:
+    # Gathers every metric the UI shows in one pass per tick and hands the
+    # immutable Snapshot to subscribers. The tick rate follows window state.
+    def __init__(self, sensor_reader=None, disk_path="/"):
+        self.sensor_reader = sensor_reader
+        self.disk_path = disk_path
+        self.snapshot = None
+        self.subscribers = []
+        self.focused = True
+        self.minimised = False
+        self.battery_saver = False
+        self.tick_costs = deque(maxlen=60)
+        self._source = None
+        self._running = False
+        # Prime psutil so the first cpu_percent() is not a meaningless 0.0
+        psutil.cpu_percent(interval=None)
+
+    def collect(self):
+        start = time.perf_counter()
+        if self.sensor_reader is None:
+            self.sensor_reader = SensorReader()
+
+        battery = psutil.sensors_battery()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        sensors = self.sensor_reader.read()
+        return Snapshot(
+            time=time.time(),
+            battery_percent=int(battery.percent) if battery else None,
+            power_plugged=battery.power_plugged if battery else None,
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory.percent,
+            memory_available=memory.available,
+            disk_percent=disk.percent,
+            disk_free=disk.free,
+            sensors=sensors,
+            tick_cost=time.perf_counter() - start,
+        )
+
+    def tick(self):
+        try:
+            snapshot = self.collect()
+        except Exception as e:
+            print(f"Failed to sample telemetry: {e}")
+            return
+        self.snapshot = snapshot
+        self.tick_costs.append(snapshot.tick_cost)
+        for callback in list(self.subscribers):
+            callback(snapshot)
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        if self.snapshot is not None:
+            callback(self.snapshot)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def interval(self):
+        if self.battery_saver:
+            return None
+        if self.minimised:
+            return MINIMISED_INTERVAL
+        if not self.focused:
+            return UNFOCUSED_INTERVAL
+        return FOCUSED_INTERVAL
+
+    def average_cost(self):
+        return sum(self.tick_costs) / len(self.tick_costs) if self.tick_costs else 0.0
+
+    def start(self):
+        self._running = True
+        self.tick()
+        self._schedule()
+
+    def stop(self):
+        self._running = False
+        self._schedule()
+
+    def set_focused(self, focused):
+        if focused != self.focused:
+            self.focused = focused
+            # Refresh straight away when the user comes back to the window
+            if focused and self._running:
+                self.tick()
+            self._schedule()
+
+    def set_minimised(self, minimised):
+        if minimised != self.minimised:
+            self.minimised = minimised
+            self._schedule()
+
+    def set_battery_saver(self, battery_saver):
+        if battery_saver != self.battery_saver:
+            self.battery_saver = battery_saver
+            self._schedule()
+
+    def _schedule(self):
+        from gi.repository import GLib
+
+        if self._source is not None:
+            GLib.source_remove(self._source)
+            self._source = None
+        interval = self.interval()
+        if self._running and interval is not None:
+            self._source = GLib.timeout_add_seconds(interval, self._on_timeout)
+
+    def _on_timeout(self):
+        self.tick()
+        return True
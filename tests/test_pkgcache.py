@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pkgcache
+
+# (a, b, expected) from pacman's test/util/vercmptest.sh
+VERCMP_CASES = [
+    ("1.5.0", "1.5.0", 0),
+    ("1.5.1", "1.5.0", 1),
+    ("1.5.1", "1.5", 1),
+    ("1.5.0-1", "1.5.0-1", 0),
+    ("1.5.0-1", "1.5.0-2", -1),
+    ("1.5.0-1", "1.5.1-1", -1),
+    ("1.5.0-2", "1.5.1-1", -1),
+    ("1.5-1", "1.5.1-1", -1),
+    ("1.5-2", "1.5.1-1", -1),
+    ("1.5-2", "1.5.1-2", -1),
+    ("1.5", "1.5-1", 0),
+    ("1.5-1", "1.5", 0),
+    ("1.1-1", "1.1", 0),
+    ("1.0-1", "1.1", -1),
+    ("1.1-1", "1.0", 1),
+    ("1.5b-1", "1.5-1", -1),
+    ("1.5b", "1.5", -1),
+    ("1.5b-1", "1.5", -1),
+    ("1.5b", "1.5.1", -1),
+    ("1.0a", "1.0alpha", -1),
+    ("1.0alpha", "1.0b", -1),
+    ("1.0b", "1.0beta", -1),
+    ("1.0beta", "1.0rc", -1),
+    ("1.0rc", "1.0", -1),
+    ("1.5.a", "1.5", 1),
+    ("1.5.b", "1.5.a", 1),
+    ("1.5.1", "1.5.b", 1),
+    ("1.5.b-1", "1.5.b", 0),
+    ("1.5-1", "1.5.b", -1),
+    ("2.0", "2_0", 0),
+    ("2.0_a", "2_0.a", 0),
+    ("2.0a", "2.0.a", -1),
+    ("2___a", "2_a", 1),
+    ("0:1.0", "0:1.0", 0),
+    ("0:1.0", "0:1.1", -1),
+    ("1:1.0", "0:1.0", 1),
+    ("1:1.0", "0:1.1", 1),
+    ("1:1.0", "2:1.1", -1),
+    ("1:1.0", "0:1.0-1", 1),
+    ("1:1.0-1", "0:1.1-1", 1),
+    ("0:1.0", "1.0", 0),
+    ("0:1.0", "1.1", -1),
+    ("0:1.1", "1.0", 1),
+    ("1:1.0", "1.0", 1),
+    ("1:1.0", "1.1", 1),
+    ("1:1.1", "1.1", 1),
+    ("2.0rc1-1", "2.0-1", -1),
+]
+
+
+class AlpmVercmpTest(unittest.TestCase):
+    def test_matches_vercmp(self):
+        for a, b, expected in VERCMP_CASES:
+            with self.subTest(a=a, b=b):
+                self.assertEqual(pkgcache.alpm_vercmp(a, b), expected)
+                self.assertEqual(pkgcache.alpm_vercmp(b, a), -expected)
+
+    def test_rc_is_pruned_before_final(self):
+        entries = [
+            pkgcache.CacheEntry("pacman", "foo", version, "x86_64", (f"foo-{version}",), 1)
+            for version in ("2.0rc1-1", "2.0-1", "1.9-1")
+        ]
+        plan = pkgcache.plan_prune(entries, {}, keep=1)
+        self.assertEqual([entry.version for entry in plan.keep], ["2.0-1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
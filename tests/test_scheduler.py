@@ -0,0 +1,158 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scheduler
+from scheduler import DAY, Scheduler, Task
+
+
+class FakeProbe:
+    def __init__(self):
+        self.ac = True
+        self.load_per_cpu = 0.1
+        self.stall = 0.0
+        self.idle = 3600.0
+
+    def on_ac(self):
+        return self.ac
+
+    def load(self):
+        return self.load_per_cpu
+
+    def pressure(self):
+        return self.stall
+
+    def idle_seconds(self):
+        return self.idle
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class BlockingStep:
+    # A "call" step that keeps checking cancelled() until released, like a
+    # download between chunks
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def steps(self):
+        return [("call", ("block", self))]
+
+    def __call__(self, on_line, cancelled):
+        self.started.set()
+        while not self.release.wait(0.01):
+            if cancelled():
+                return
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp.name, "schedule.json")
+        self.probe = FakeProbe()
+        self.clock = FakeClock()
+        self.threads = []
+        # No renicing or ionice for the test runner's threads
+        patcher = mock.patch.object(scheduler, "set_idle_priority", lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(5)
+        self.tmp.cleanup()
+
+    def spawn(self, func):
+        thread = threading.Thread(target=func, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+    def make(self, tasks, spawn=None):
+        return Scheduler(tasks, probe=self.probe, clock=self.clock, state_path=self.state_path,
+                         spawn=spawn or self.spawn, on_line=lambda line: None).load()
+
+    def test_pauses_under_load_and_resumes(self):
+        step = BlockingStep()
+        sched = self.make([Task("block", DAY, step.steps, "Block")])
+        sched.tick()
+        self.assertTrue(step.started.wait(5))
+        run = sched.current
+
+        self.probe.load_per_cpu = scheduler.PAUSE_LOAD + 0.5
+        sched.tick()
+        self.assertTrue(run.paused)
+        self.assertIn("load", sched.status_text())
+
+        self.probe.load_per_cpu = 0.1
+        sched.tick()
+        self.assertFalse(run.paused)
+        step.release.set()
+        self.threads[0].join(5)
+        self.assertIsNone(sched.current)
+        self.assertEqual(sched.last_run["block"]["status"], "done")
+
+    def test_load_between_start_and_pause_limits_keeps_running(self):
+        step = BlockingStep()
+        sched = self.make([Task("block", DAY, step.steps, "Block")])
+        sched.tick()
+        self.assertTrue(step.started.wait(5))
+        self.probe.load_per_cpu = (scheduler.MAX_LOAD + scheduler.PAUSE_LOAD) / 2
+        sched.tick()
+        self.assertFalse(sched.current.paused)
+        step.release.set()
+
+    def test_does_not_start_on_battery(self):
+        started = []
+        self.probe.ac = False
+        sched = self.make([Task("never", DAY, lambda: [], "Never")], spawn=started.append)
+        sched.tick()
+        self.assertEqual(started, [])
+        self.assertIsNone(sched.current)
+        self.assertIn("on battery", sched.conditions.reasons)
+        self.assertEqual([entry["name"] for entry in sched.queue], ["never"])
+
+        self.probe.ac = True
+        sched.tick()
+        self.assertEqual(len(started), 1)
+
+    def test_interrupted_run_is_requeued_after_restart(self):
+        ran = []
+        task = Task("once", DAY, lambda: [("call", ("once", lambda on_line, cancelled: ran.append(True)))], "Once")
+        # The first process dies before the spawned run gets to work
+        first = self.make([task], spawn=lambda func: None)
+        first.tick()
+        self.assertIsNotNone(first.current)
+
+        self.clock.now += 60
+        second = self.make([task])
+        self.assertEqual([entry["name"] for entry in second.queue], ["once"])
+        self.assertIn("started_at", second.queue[0])
+        second.tick()
+        self.threads[0].join(5)
+        self.assertEqual(ran, [True])
+        self.assertEqual(second.queue, [])
+        self.assertEqual(second.last_run["once"]["status"], "done")
+
+        third = self.make([task])
+        self.assertEqual(third.queue, [])
+        self.assertEqual(third.due(), [])
+
+    def test_due_does_not_save(self):
+        sched = self.make([Task("once", DAY, lambda: [], "Once")])
+        self.assertEqual(sched.due(), ["once"])
+        self.assertFalse(os.path.exists(self.state_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sensors import SensorReader, discover_channels
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class SensorReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chip(self, hwmon, name, channels):
+        # channels: (channel, label or None, raw value)
+        write(os.path.join(self.root, hwmon, "name"), f"{name}\n")
+        for channel, label, value in channels:
+            write(os.path.join(self.root, hwmon, f"{channel}_input"), f"{value}\n")
+            if label:
+                write(os.path.join(self.root, hwmon, f"{channel}_label"), f"{label}\n")
+
+    def test_prefers_package_label_on_cpu_chip(self):
+        self.chip("hwmon0", "acpitz", [("temp1", None, 90000)])
+        self.chip("hwmon1", "coretemp", [("temp1", "Core 0", 50000), ("temp2", "Package id 0", 54000)])
+        with SensorReader(self.root) as reader:
+            self.assertEqual(reader.read().cpu_temp, 54.0)
+
+    def test_picks_by_chip_then_label(self):
+        self.chip("hwmon0", "k10temp", [("temp1", "Tccd1", 61000), ("temp2", "Tctl", 65500)])
+        self.chip("hwmon1", "amdgpu", [("temp1", "junction", 52000), ("temp2", "edge", 47000)])
+        self.chip("hwmon2", "nvme", [("temp1", "Sensor 1", 40000), ("temp2", "Composite", 38850)])
+        with SensorReader(self.root) as reader:
+            snapshot = reader.read()
+        self.assertEqual(snapshot.cpu_temp, 65.5)
+        self.assertEqual(snapshot.gpu_temp, 47.0)
+        self.assertEqual(snapshot.disk_temp, 38.85)
+
+    def test_unknown_labels_fall_back_to_first_channel_of_the_chip(self):
+        self.chip("hwmon0", "zenpower", [("temp1", "Tccd1", 58000), ("temp2", "Tccd2", 60000)])
+        with SensorReader(self.root) as reader:
+            snapshot = reader.read()
+        self.assertEqual(snapshot.cpu_temp, 58.0)
+        self.assertIsNone(snapshot.gpu_temp)
+
+    def test_fans_by_label(self):
+        self.chip("hwmon0", "asus", [("fan1", "gpu_fan", 2100), ("fan2", "cpu_fan", 2400)])
+        with SensorReader(self.root) as reader:
+            snapshot = reader.read()
+        self.assertEqual((snapshot.cpu_fan, snapshot.gpu_fan), (2400, 2100))
+
+    def test_unlabelled_fans_by_order(self):
+        self.chip("hwmon0", "thinkpad", [("fan1", None, 3000), ("fan2", None, 2800)])
+        with SensorReader(self.root) as reader:
+            snapshot = reader.read()
+        self.assertEqual((snapshot.cpu_fan, snapshot.gpu_fan), (3000, 2800))
+
+    def test_read_sees_new_values_through_open_files(self):
+        self.chip("hwmon0", "coretemp", [("temp1", "Package id 0", 54000)])
+        path = os.path.join(self.root, "hwmon0", "temp1_input")
+        with SensorReader(self.root) as reader:
+            self.assertEqual(reader.read().cpu_temp, 54.0)
+            # Rewritten in place, like sysfs; the reader must not reopen it
+            with open(path, "r+") as f:
+                f.write("71500\n")
+            self.assertEqual(reader.read().cpu_temp, 71.5)
+            self.assertEqual(len(reader._fds), 1)
+
+    def test_unreadable_channel_is_skipped(self):
+        self.chip("hwmon0", "coretemp", [("temp1", "Package id 0", 54000)])
+        self.chip("hwmon1", "amdgpu", [("temp1", "edge", 47000)])
+        with SensorReader(self.root) as reader:
+            # A suspended dGPU answers with an error or garbage
+            with open(os.path.join(self.root, "hwmon1", "temp1_input"), "w") as f:
+                f.write("")
+            snapshot = reader.read()
+        self.assertEqual(snapshot.cpu_temp, 54.0)
+        self.assertIsNone(snapshot.gpu_temp)
+
+    def test_discover_uses_chip_name_and_default_label(self):
+        self.chip("hwmon3", "acpitz", [("temp1", None, 45000)])
+        write(os.path.join(self.root, "hwmon3", "temp1_crit"), "95000\n")
+        channels = discover_channels(self.root)
+        self.assertEqual([(c.chip, c.kind, c.label) for c in channels], [("acpitz", "temp", "temp1")])
+        self.assertEqual(discover_channels(os.path.join(self.root, "missing")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
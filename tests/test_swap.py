@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import swap
+
+GIB = 1024 * 1024  # kB
+
+
+class PlanReclaimTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.proc = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def procfs(self, total, available, swaps, pressure=None):
+        # swaps: (path, size, used, priority) in kB
+        with open(os.path.join(self.proc, "meminfo"), "w") as f:
+            f.write(f"MemTotal:       {total} kB\nMemFree:        {available // 2} kB\nMemAvailable:   {available} kB\n")
+        with open(os.path.join(self.proc, "swaps"), "w") as f:
+            f.write("Filename\t\t\t\tType\t\tSize\t\tUsed\t\tPriority\n")
+            for path, size, used, priority in swaps:
+                f.write(f"{path.replace(' ', chr(92) + '040')}\tpartition\t{size}\t{used}\t{priority}\n")
+        if pressure is not None:
+            os.makedirs(os.path.join(self.proc, "pressure"), exist_ok=True)
+            with open(os.path.join(self.proc, "pressure", "memory"), "w") as f:
+                f.write(f"some avg10={pressure:.2f} avg60=0.00 avg300=0.00 total=0\n"
+                        "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+
+    def test_margin_is_a_fraction_of_memory_with_a_floor(self):
+        self.procfs(16 * GIB, 8 * GIB, [])
+        self.assertEqual(swap.plan_reclaim(self.proc).margin, int(16 * GIB * swap.MARGIN_FRACTION))
+        self.procfs(2 * GIB, 1 * GIB, [])
+        self.assertEqual(swap.plan_reclaim(self.proc).margin, swap.MIN_MARGIN)
+
+    def test_devices_fill_the_budget_by_priority(self):
+        # 8 GiB available, 0.8 GiB margin: 7.2 GiB budget
+        self.procfs(16 * GIB, 8 * GIB, [
+            ("/swapfile", 8 * GIB, 3 * GIB, -2),
+            ("/dev/zram0", 8 * GIB, 4 * GIB, 100),
+            ("/dev/nvme0n1p3", 8 * GIB, 1 * GIB, 10),
+        ])
+        plan = swap.plan_reclaim(self.proc)
+        self.assertEqual([device.path for device in plan.devices], ["/dev/zram0", "/dev/nvme0n1p3"])
+        self.assertEqual([device.path for device in plan.skipped], ["/swapfile"])
+        self.assertEqual(len(plan.warnings), 1)
+        self.assertIn("/swapfile", plan.warnings[0])
+
+    def test_device_must_fit_after_the_margin(self):
+        margin = int(16 * GIB * swap.MARGIN_FRACTION)
+        self.procfs(16 * GIB, 4 * GIB, [("/dev/zram0", 8 * GIB, 4 * GIB - margin + 1, 100)])
+        self.assertEqual(swap.plan_reclaim(self.proc).devices, [])
+        self.procfs(16 * GIB, 4 * GIB, [("/dev/zram0", 8 * GIB, 4 * GIB - margin, 100)])
+        self.assertEqual(len(swap.plan_reclaim(self.proc).devices), 1)
+
+    def test_unused_devices_are_ignored(self):
+        self.procfs(16 * GIB, 8 * GIB, [("/dev/zram0", 8 * GIB, 0, 100), ("/swap file", 8 * GIB, GIB, -2)])
+        plan = swap.plan_reclaim(self.proc)
+        self.assertEqual([device.path for device in plan.devices], ["/swap file"])
+        self.assertEqual(plan.skipped, [])
+
+    def test_warns_under_memory_pressure(self):
+        self.procfs(16 * GIB, 8 * GIB, [("/dev/zram0", 8 * GIB, GIB, 100)], pressure=swap.PRESSURE_WARNING + 5)
+        plan = swap.plan_reclaim(self.proc)
+        self.assertEqual(len(plan.devices), 1)
+        self.assertTrue(any("memory pressure" in warning for warning in plan.warnings))
+        self.procfs(16 * GIB, 8 * GIB, [("/dev/zram0", 8 * GIB, GIB, 100)], pressure=0.5)
+        self.assertEqual(swap.plan_reclaim(self.proc).warnings, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
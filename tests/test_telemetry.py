@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import telemetry
+from sensors import make_snapshot
+from telemetry import Sampler
+
+
+class FakeReader:
+    def __init__(self):
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return make_snapshot([])
+
+
+class SamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = FakeReader()
+        self.sampler = Sampler(self.reader)
+
+    def test_interval_follows_window_state(self):
+        self.assertEqual(self.sampler.interval(), telemetry.FOCUSED_INTERVAL)
+        self.sampler.focused = False
+        self.assertEqual(self.sampler.interval(), telemetry.UNFOCUSED_INTERVAL)
+        self.sampler.minimised = True
+        self.assertEqual(self.sampler.interval(), telemetry.MINIMISED_INTERVAL)
+
+    def test_battery_saver_stops_polling(self):
+        self.sampler.battery_saver = True
+        self.assertIsNone(self.sampler.interval())
+        self.sampler.minimised = True
+        self.assertIsNone(self.sampler.interval())
+        self.sampler.battery_saver = False
+        self.assertEqual(self.sampler.interval(), telemetry.MINIMISED_INTERVAL)
+
+    def test_tick_reads_sensors_once_and_notifies(self):
+        seen = []
+        self.sampler.subscribe(seen.append)
+        self.sampler.tick()
+        self.sampler.tick()
+        self.assertEqual(self.reader.reads, 2)
+        self.assertEqual(len(seen), 2)
+        self.assertIs(seen[-1], self.sampler.snapshot)
+        self.assertEqual(len(self.sampler.tick_costs), 2)
+
+    def test_late_subscriber_gets_the_last_snapshot(self):
+        self.sampler.tick()
+        seen = []
+        self.sampler.subscribe(seen.append)
+        self.assertEqual(seen, [self.sampler.snapshot])
+        self.sampler.unsubscribe(seen.append)
+        self.sampler.tick()
+        self.assertEqual(len(seen), 1)
+
+    def test_failed_tick_keeps_the_previous_snapshot(self):
+        self.sampler.tick()
+        previous = self.sampler.snapshot
+        seen = []
+        self.sampler.subscribe(seen.append)
+        self.reader.read = lambda: 1 / 0
+        self.sampler.tick()
+        self.assertIs(self.sampler.snapshot, previous)
+        self.assertEqual(seen, [previous])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tmpclean import DAY, TempCleaner, open_files
+
+MAX_AGE = 10 * DAY
+
+
+class TempCleanerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "tmp")
+        self.proc = os.path.join(self.tmp.name, "proc")
+        os.makedirs(self.root)
+        os.makedirs(self.proc)
+        # ctime cannot be set, so the clock moves forward instead: anything
+        # created now is MAX_AGE + 1 days old
+        self.now = time.time() + MAX_AGE + DAY
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def file(self, relative, size=10, age=None):
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        if age is not None:
+            stamp = self.now - age
+            os.utime(path, (stamp, stamp))
+        return path
+
+    def hold_open(self, path, pid="4242"):
+        # A process in the fake procfs with path open
+        fd_dir = os.path.join(self.proc, pid, "fd")
+        os.makedirs(fd_dir, exist_ok=True)
+        os.symlink(path, os.path.join(fd_dir, str(len(os.listdir(fd_dir)) + 3)))
+
+    def cleaner(self, **kwargs):
+        return TempCleaner([(self.root, MAX_AGE)], now=self.now, proc_root=self.proc, workers=2, **kwargs)
+
+    def test_old_files_go_and_recent_ones_stay(self):
+        old = self.file("old.log")
+        recent = self.file("recent.log", age=DAY)
+        report = self.cleaner().clean()
+        self.assertEqual((report.files, report.recent), (1, 1))
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_scan_removes_nothing(self):
+        old = self.file("a/b/old.log", size=5000)
+        report = self.cleaner().scan()
+        self.assertEqual(report.files, 1)
+        self.assertGreater(report.bytes, 0)
+        self.assertEqual(report.directories, 2)
+        self.assertTrue(os.path.exists(old))
+
+    def test_open_files_are_kept(self):
+        held = self.file("held.log")
+        self.hold_open(held)
+        self.assertIn((os.stat(held).st_dev, os.stat(held).st_ino), open_files(self.proc))
+        report = self.cleaner().clean()
+        self.assertEqual((report.files, report.open), (0, 1))
+        self.assertTrue(os.path.exists(held))
+
+    def test_other_users_files_are_kept(self):
+        path = self.file("theirs.log")
+        report = self.cleaner(uid=os.getuid() + 1).clean()
+        self.assertEqual((report.files, report.foreign), (0, 1))
+        self.assertTrue(os.path.exists(path))
+
+    def test_sockets_and_protected_entries_are_kept(self):
+        protected = self.file(".X11-unix/X0")
+        fifo = os.path.join(self.root, "pipe")
+        os.mkfifo(fifo)
+        sock = socket.socket(socket.AF_UNIX)
+        sock_path = os.path.join(self.root, "s")
+        sock.bind(sock_path)
+        try:
+            report = self.cleaner().clean()
+        finally:
+            sock.close()
+        self.assertEqual(report.files, 0)
+        for path in (protected, fifo, sock_path):
+            self.assertTrue(os.path.lexists(path), path)
+
+    def test_emptied_old_directories_are_removed(self):
+        self.file("build/obj/a.o")
+        self.file("keep/new.txt", age=DAY)
+        report = self.cleaner().clean()
+        self.assertEqual(report.files, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "build")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "keep", "new.txt")))
+
+    def test_cancelled_clean_removes_nothing(self):
+        old = self.file("old.log")
+        report = self.cleaner().clean(cancelled=lambda: True)
+        self.assertEqual(report.files, 0)
+        self.assertTrue(os.path.exists(old))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import threading
+import time
+
+
+class Coalescer:
+    # Applies only the latest submitted value, at most once per `interval` seconds.
+    # A slider drag submits hundreds of values; the worker thread writes a handful.
+    def __init__(self, apply, interval=0.1, name="coalescer"):
+        self.apply = apply
+        self.interval = interval
+        self.name = name
+        self._pending = None
+        self._has_pending = False
+        self._last_applied = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, value):
+        with self._cond:
+            self._pending = value
+            self._has_pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        # Blocks until the pending value (if any) has been applied
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._has_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._has_pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                wait = self._last_applied + self.interval - time.monotonic()
+                if wait > 0:
+                    # Let more updates pile up; only the newest survives
+                    self._cond.wait(wait)
+                    continue
+                value = self._pending
+                self._last_applied = time.monotonic()
+
+            try:
+                self.apply(value)
+            except Exception as e:
+                print(f"Failed to apply {self.name} value {value}: {e}")
+
+            with self._cond:
+                if self._pending == value:
+                    self._has_pending = False
+                self._cond.notify_all()
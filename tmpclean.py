@@ -0,0 +1,161 @@
+import os
+import stat
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Temp cleaner. Only entries that are old enough, owned by the user and not
+# held open by any process are removed; sockets, FIFOs and device nodes are
+# never touched. Open files come from one pass over /proc/*/fd collected
+# into a set of (device, inode). The scan keeps counters only, so memory
+# does not grow with the number of files; cleaning walks the tree again and
+# each directory's files are deleted by the worker that listed them.
+
+PROC_ROOT = "/proc"
+WORKERS = 8
+DAY = 24 * 60 * 60
+
+# Matches the systemd-tmpfiles defaults for /tmp and /var/tmp
+MAX_AGES = (
+    ("/tmp", 10 * DAY),
+    ("/var/tmp", 30 * DAY),
+)
+CACHE_MAX_AGE = 30 * DAY
+
+# Session infrastructure that lives in /tmp regardless of age
+PROTECTED_PREFIXES = (".X", ".ICE-unix", ".font-unix", ".Test-unix", "systemd-private-", "tmux-", "ssh-")
+
+TempReport = namedtuple("TempReport", ["files", "bytes", "directories", "open", "recent", "foreign"])
+
+
+def default_targets():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return MAX_AGES + ((cache_home, CACHE_MAX_AGE),)
+
+
+def open_files(proc_root=PROC_ROOT):
+    # (st_dev, st_ino) of every file open in a process we can inspect, plus
+    # their working directories
+    held = set()
+    for pid in os.listdir(proc_root):
+        if not pid.isdigit():
+            continue
+        fd_dir = os.path.join(proc_root, pid, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds + ["../cwd"]:
+            try:
+                st = os.stat(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            held.add((st.st_dev, st.st_ino))
+    return held
+
+
+class TempCleaner:
+    def __init__(self, targets=None, uid=None, now=None, proc_root=PROC_ROOT, workers=WORKERS):
+        self.targets = default_targets() if targets is None else targets
+        self.uid = os.getuid() if uid is None else uid
+        self.now = now
+        self.proc_root = proc_root
+        self.workers = workers
+
+    def scan(self, on_progress=None, cancelled=lambda: False):
+        # Dry run: what clean() would remove right now
+        return self._walk(False, on_progress, cancelled)
+
+    def clean(self, on_progress=None, cancelled=lambda: False):
+        # cancelled() is checked before each directory; it may also block
+        # to hold the walk while a background run is paused
+        return self._walk(True, on_progress, cancelled)
+
+    def _walk(self, delete, on_progress, cancelled):
+        now = self.now if self.now is not None else time.time()
+        held = open_files(self.proc_root)
+        totals = dict.fromkeys(TempReport._fields, 0)
+        old_directories = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for root, max_age in self.targets:
+                try:
+                    device = os.lstat(root).st_dev
+                except OSError:
+                    continue
+                pending.add(pool.submit(self._visit, root, True, device, now - max_age, held, delete, cancelled))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    counts, subdirectories, old = future.result()
+                    for key, value in counts.items():
+                        totals[key] += value
+                    old_directories.extend(old)
+                    for path, device, cutoff in subdirectories:
+                        pending.add(pool.submit(self._visit, path, False, device, cutoff, held, delete, cancelled))
+                if on_progress is not None:
+                    on_progress(TempReport(**totals))
+
+        if not delete:
+            totals["directories"] = len(old_directories)
+        elif not cancelled():
+            # Deepest first, so parents are empty by the time we reach them
+            for path in sorted(old_directories, key=len, reverse=True):
+                try:
+                    os.rmdir(path)
+                    totals["directories"] += 1
+                except OSError:
+                    pass
+        return TempReport(**totals)
+
+    def _visit(self, path, is_root, device, cutoff, held, delete, cancelled):
+        counts = {"files": 0, "bytes": 0, "open": 0, "recent": 0, "foreign": 0}
+        subdirectories = []
+        old = []
+        if cancelled():
+            return counts, subdirectories, old
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if is_root and entry.name.startswith(PROTECTED_PREFIXES):
+                        continue
+                    verdict, st = self._classify(entry, device, cutoff, held)
+                    if verdict == "directory":
+                        subdirectories.append((entry.path, device, cutoff))
+                        # Not atime: listing a directory (as the dry run does) updates it
+                        if max(st.st_mtime, st.st_ctime) < cutoff:
+                            old.append(entry.path)
+                    elif verdict == "remove":
+                        if delete:
+                            try:
+                                os.unlink(entry.path)
+                            except OSError:
+                                continue
+                        counts["files"] += 1
+                        counts["bytes"] += st.st_blocks * 512
+                    elif verdict in counts:
+                        counts[verdict] += 1
+        except OSError:
+            pass
+        return counts, subdirectories, old
+
+    def _classify(self, entry, device, cutoff, held):
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            return None, None
+        if st.st_dev != device:
+            return None, st
+        if st.st_uid != self.uid:
+            return "foreign", st
+        if (st.st_dev, st.st_ino) in held:
+            return "open", st
+        if stat.S_ISDIR(st.st_mode):
+            return "directory", st
+        # Sockets, FIFOs and device nodes belong to running programs
+        if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+            return None, st
+        if max(st.st_atime, st.st_mtime, st.st_ctime) >= cutoff:
+            return "recent", st
+        return "remove", st
@@ -0,0 +1,302 @@
+import os
+import shutil
+import subprocess
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from maintenance import PACKAGE_MANAGERS
+
+# Builds one combined upgrade set (repo + AUR) before anything changes, then
+# runs a single package transaction fed by parallel downloads. The parse_*
+# functions only take tool output, so recorded output can be replayed.
+
+DOWNLOAD_WORKERS = 5
+DOWNLOAD_TIMEOUT = 60
+
+PackageUpdate = namedtuple("PackageUpdate", ["name", "old_version", "new_version", "source", "size", "url"])
+# previewed is False when the repo upgrades could not be listed; the plan
+# then runs a plain full upgrade rather than skip the repos
+UpdatePlan = namedtuple("UpdatePlan", ["family", "packages", "download_size", "aur_helper", "previewed"], defaults=(True,))
+
+
+def cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "sys_main")
+
+
+def parse_checkupdates(text, source="repo"):
+    # "linux 6.9.1.arch1-1 -> 6.9.2.arch1-1" (also the format of yay/paru -Qua)
+    updates = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 4 and parts[2] == "->":
+            updates.append(PackageUpdate(parts[0], parts[1], parts[3], source, None, None))
+    return updates
+
+
+def parse_pacman_print(text):
+    # pacman -Sup --print-format "%n %v %s %l"
+    targets = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 4 and parts[2].isdigit():
+            targets[parts[0]] = (parts[1], int(parts[2]), parts[3])
+    return targets
+
+
+def parse_apt_print_uris(text):
+    # 'http://deb.debian.org/.../curl_8.5.0-2_amd64.deb' curl_8.5.0-2_amd64.deb 315200 SHA256:...
+    updates = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 3 or not parts[0].startswith("'") or not parts[2].isdigit():
+            continue
+        filename = parts[1]
+        fields = filename[:-len(".deb")].split("_") if filename.endswith(".deb") else [filename]
+        name = fields[0]
+        version = fields[1].replace("%3a", ":") if len(fields) > 1 else None
+        updates.append(PackageUpdate(name, None, version, "repo", int(parts[2]), parts[0].strip("'")))
+    return updates
+
+
+def parse_dnf_check_update(text):
+    # "kernel.x86_64   6.8.9-300.fc40   updates"; obsoletes follow a header line
+    updates = []
+    for line in text.splitlines():
+        if line.startswith("Obsoleting"):
+            break
+        parts = line.split()
+        if len(parts) == 3 and "." in parts[0] and not line.startswith(" "):
+            name = parts[0].rsplit(".", 1)[0]
+            updates.append(PackageUpdate(name, None, parts[1], parts[2], None, None))
+    return updates
+
+
+def _run(args, env=None):
+    return subprocess.run(args, capture_output=True, text=True, env=env)
+
+
+def _checked(result, args, ok=(0,)):
+    # Output of a planning command; ok lists the exit statuses that still
+    # mean success (checkupdates exits 2 when there is nothing to update)
+    if result.returncode not in ok:
+        raise subprocess.CalledProcessError(result.returncode, args, result.stdout, result.stderr)
+    return result.stdout
+
+
+def plan_arch(capabilities, run=_run):
+    packages = []
+    previewed = capabilities.has("checkupdates")
+    if previewed:
+        # checkupdates syncs a private copy of the databases, so nothing
+        # on the system changes while planning
+        db_path = os.path.join(cache_dir(), "checkup-db")
+        env = dict(os.environ, CHECKUPDATES_DB=db_path)
+        args = ["checkupdates"]
+        packages = parse_checkupdates(_checked(run(args, env), args, ok=(0, 2)))
+
+        args = ["pacman", "-Sup", "--dbpath", db_path, "--print-format", "%n %v %s %l"]
+        targets = parse_pacman_print(_checked(run(args), args))
+        known = {p.name for p in packages}
+        for i, package in enumerate(packages):
+            if package.name in targets:
+                _, size, url = targets[package.name]
+                packages[i] = package._replace(size=size, url=url)
+        # New dependencies pulled in by the upgrade
+        for name, (version, size, url) in targets.items():
+            if name not in known:
+                packages.append(PackageUpdate(name, None, version, "repo", size, url))
+    else:
+        print("checkupdates (pacman-contrib) is not installed; repo upgrades will not be previewed")
+
+    aur_helper = next((name for name in ("paru", "yay") if capabilities.has(name)), None)
+    if aur_helper:
+        # Like pacman -Qu, exits 1 when nothing is out of date
+        args = [aur_helper, "-Qua"]
+        packages += parse_checkupdates(_checked(run(args), args, ok=(0, 1)), source="aur")
+    return packages, aur_helper, previewed
+
+
+def plan_updates(family, capabilities, run=_run):
+    aur_helper = None
+    previewed = True
+    if family == "arch":
+        packages, aur_helper, previewed = plan_arch(capabilities, run)
+    elif family == "debian":
+        args = ["apt-get", "-qq", "--print-uris", "-o", "Debug::NoLocking=1", "upgrade"]
+        packages = parse_apt_print_uris(_checked(run(args), args))
+    elif family == "fedora":
+        # 100: updates are available
+        args = ["dnf", "check-update", "-q"]
+        packages = parse_dnf_check_update(_checked(run(args), args, ok=(0, 100)))
+    else:
+        raise ValueError(f"Unsupported distribution family: {family}")
+
+    download_size = sum(p.size for p in packages if p.size)
+    return UpdatePlan(family, packages, download_size, aur_helper, previewed)
+
+
+def has_updates(plan):
+    return bool(plan.packages) or not plan.previewed
+
+
+def refresh_steps(family):
+    # apt plans against its package lists, so those are refreshed first
+    if family == "debian":
+        return [("privileged", [("package_transaction", {"manager": "apt", "action": "refresh"})])]
+    return []
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+        size /= 1024
+
+
+def format_plan(plan):
+    lines = []
+    for package in sorted(plan.packages, key=lambda p: (p.source, p.name)):
+        version = f"{package.old_version} -> {package.new_version}" if package.old_version else package.new_version
+        size = f"  {format_size(package.size)}" if package.size else ""
+        lines.append(f"[{package.source}] {package.name} {version}{size}")
+    if not plan.previewed:
+        lines.append("Repository upgrades could not be listed (install pacman-contrib); a full upgrade will run")
+    lines.append(f"{len(plan.packages)} packages, {format_size(plan.download_size)} to download")
+    return lines
+
+
+def download_packages(packages, destination, on_line=print, cancelled=lambda: False, workers=DOWNLOAD_WORKERS):
+    os.makedirs(os.path.join(destination, "partial"), exist_ok=True)
+    pending = [p for p in packages if p.url]
+    done = 0
+
+    def fetch(package):
+        target = os.path.join(destination, os.path.basename(package.url))
+        if package.size and os.path.exists(target) and os.path.getsize(target) == package.size:
+            return package
+        partial = os.path.join(destination, "partial", os.path.basename(package.url))
+        with urllib.request.urlopen(package.url, timeout=DOWNLOAD_TIMEOUT) as response, open(partial, "wb") as f:
+            while not cancelled():
+                chunk = response.read(1 << 16)
+                if not chunk:
+                    break
+                f.write(chunk)
+        if cancelled():
+            os.unlink(partial)
+            return package
+        if package.size and os.path.getsize(partial) != package.size:
+            os.unlink(partial)
+            raise OSError(f"size mismatch for {package.name}")
+        os.replace(partial, target)
+        return package
+
+    # The package manager verifies signatures and hashes of whatever we fetch;
+    # a failed download just falls back to its own serial download.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, package): package for package in pending}
+        for future in as_completed(futures):
+            done += 1
+            package = futures[future]
+            try:
+                future.result()
+                on_line(f"Downloaded {done}/{len(pending)}: {package.name}")
+            except OSError as e:
+                on_line(f"Failed to download {package.name}: {e}")
+
+
+def download_dir_for(manager, cache_root=None):
+    return os.path.join(cache_root or cache_dir(), "downloads", manager)
+
+
+def prefetch_steps(plan, cache_root=None):
+    # Only the download; files already there with the right size are kept,
+    # so a later upgrade (plan_steps) finds them and skips the download
+    repo_packages = [p for p in plan.packages if p.source != "aur"]
+    if plan.family not in ("arch", "debian") or not repo_packages:
+        return []
+    download_dir = download_dir_for(PACKAGE_MANAGERS[plan.family], cache_root)
+    download = lambda on_line, cancelled: download_packages(repo_packages, download_dir, on_line, cancelled)
+    return [("call", (f"download {len(repo_packages)} packages to {download_dir}", download))]
+
+
+def remove_tree(path, on_line=print):
+    # Reports what could not be removed rather than leaving it silently
+    def report(function, failed_path, excinfo):
+        on_line(f"Failed to remove {failed_path}: {excinfo[1]}")
+
+    if os.path.lexists(path):
+        shutil.rmtree(path, onerror=report)
+
+
+def _run_streamed(args, cwd, on_line, env=None):
+    on_line("$ " + " ".join(args))
+    with subprocess.Popen(args, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            on_line(line.rstrip("\n"))
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+def aur_steps(plan, cache_root=None, build_jobs=None):
+    # AUR helpers run sudo themselves, which has no terminal here. Instead
+    # the helper only fetches each PKGBUILD, makepkg builds it as the user,
+    # and the privileged helper installs the results in one transaction
+    # (install_built, which only upgrades installed foreign packages).
+    # Cancelling takes effect between packages.
+    names = [p.name for p in plan.packages if p.source == "aur"]
+    if not names or not plan.aur_helper:
+        return []
+    build_dir = os.path.join(cache_root or cache_dir(), "aur")
+    packages_dir = os.path.join(build_dir, "packages")
+    env = dict(os.environ, PKGDEST=packages_dir, MAKEFLAGS=f"-j{build_jobs or os.cpu_count() or 1}")
+
+    def build(on_line, cancelled):
+        if os.geteuid() == 0:
+            raise RuntimeError("makepkg does not run as root; update as a normal user to build AUR packages")
+        remove_tree(build_dir, on_line)
+        os.makedirs(packages_dir)
+        for name in names:
+            if cancelled():
+                return
+            source = os.path.join(build_dir, "src", name)
+            os.makedirs(source)
+            _run_streamed([plan.aur_helper, "-G", name], source, on_line)
+            # The PKGBUILD lands in a directory named after the pkgbase
+            pkgbuilds = [entry.path for entry in os.scandir(source) if entry.is_dir()]
+            if len(pkgbuilds) != 1:
+                raise RuntimeError(f"{plan.aur_helper} -G {name} did not fetch a PKGBUILD")
+            _run_streamed(["makepkg", "--noconfirm", "--cleanbuild"], pkgbuilds[0], on_line, env)
+
+    return [
+        ("call", (f"build {', '.join(names)} with makepkg", build)),
+        ("privileged", [("install_built", {"directory": packages_dir})]),
+        ("call", (f"remove {build_dir}", lambda on_line, cancelled: remove_tree(build_dir, on_line))),
+    ]
+
+
+def plan_steps(plan, cache_root=None, build_jobs=None):
+    cache_root = cache_root or cache_dir()
+    repo_packages = [p for p in plan.packages if p.source != "aur"]
+    steps = []
+
+    if plan.family in ("arch", "debian") and repo_packages:
+        manager = PACKAGE_MANAGERS[plan.family]
+        download_dir = download_dir_for(manager, cache_root)
+        steps.extend(prefetch_steps(plan, cache_root))
+        # The helper also removes what the package manager wrote into the
+        # directory as root (apt's lock and partial/)
+        steps.append(("privileged", [("package_transaction", {"manager": manager, "action": "upgrade", "cache_dirs": [download_dir]})]))
+        # The package manager does not move files out of extra cache dirs
+        steps.append(("call", (f"remove {download_dir}", lambda on_line, cancelled: remove_tree(download_dir, on_line))))
+    elif plan.family == "fedora" and repo_packages:
+        options = [f"--setopt=max_parallel_downloads={DOWNLOAD_WORKERS * 2}"]
+        steps.append(("privileged", [("package_transaction", {"manager": "dnf", "action": "upgrade", "options": options})]))
+    elif plan.family == "arch" and not plan.previewed:
+        # Unlisted repo upgrades still go first, so AUR packages never
+        # build against stale repos (a partial upgrade)
+        steps.append(("privileged", [("package_transaction", {"manager": "pacman", "action": "upgrade"})]))
+
+    return steps + aur_steps(plan, cache_root, build_jobs)